@@ -0,0 +1,165 @@
+"""Concurrent invocation of a pipeline over many states, with query embeddings coalesced into batches.
+
+Calling `pipeline.invoke` in a loop waits for each query before starting the next one, so throughput is bounded by
+single-request latency. `invoke_many` keeps up to `max_concurrency` invocations of the same pipeline in flight on one
+event loop and yields each final state as soon as it is ready, tagged with the index of its initial state.
+
+Concurrent invocations still embed their queries one request at a time. `BatchingEMInvoker` wraps the EM invoker of
+the vector data store: single-text calls arriving within `max_wait_seconds` of each other are sent as one batch
+request, and identical texts in a batch are embedded once.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/your-first-rag-pipeline
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_SECONDS = 0.005
+
+
+class BatchingEMInvoker:
+    """An EM invoker wrapper that coalesces concurrent single-text calls into batch requests.
+
+    Attributes:
+        em_invoker (Any): The wrapped EM invoker.
+        max_batch_size (int): The maximum number of texts per batch request.
+        max_wait_seconds (float): How long the first text of a batch waits for others to join it.
+        requests (int): The number of single-text calls received.
+        batches (int): The number of batch requests sent.
+    """
+
+    def __init__(
+        self,
+        em_invoker: Any,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_seconds: float = DEFAULT_MAX_WAIT_SECONDS,
+    ):
+        """Initialize the wrapper.
+
+        Args:
+            em_invoker (Any): The EM invoker to wrap. Its `invoke` must accept a list of texts.
+            max_batch_size (int, optional): The maximum number of texts per batch request. Defaults to 64.
+            max_wait_seconds (float, optional): How long the first text of a batch waits for others to join it.
+                Defaults to 0.005.
+        """
+        self.em_invoker = em_invoker
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.requests = 0
+        self.batches = 0
+        self._queue: list[tuple[str, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate other attributes to the wrapped EM invoker."""
+        return getattr(self.em_invoker, name)
+
+    async def invoke(self, content: str | list[str], *args: Any, **kwargs: Any) -> Any:
+        """Embed a text as part of the next batch request, or pass any other call through.
+
+        Args:
+            content (str | list[str]): The text or texts to embed.
+            *args (Any): Passed to the wrapped EM invoker. Calls with extra arguments are not batched.
+            **kwargs (Any): Passed to the wrapped EM invoker. Calls with extra arguments are not batched.
+
+        Returns:
+            Any: The embedding of the text, or whatever the wrapped EM invoker returns for other calls.
+        """
+        if not isinstance(content, str) or args or kwargs:
+            return await self.em_invoker.invoke(content, *args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests += 1
+        self._queue.append((content, future))
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._queue = self._queue, []
+        if batch:
+            task = asyncio.create_task(self._embed(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        try:
+            embeddings = dict(zip(texts, await self.em_invoker.invoke(texts)))
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for text, future in batch:
+            if not future.done():
+                future.set_result(embeddings[text])
+
+
+async def invoke_many(
+    pipeline: Any,
+    states: Iterable[dict[str, Any]],
+    config: dict[str, Any] | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    return_exceptions: bool = False,
+) -> AsyncIterator[tuple[int, dict[str, Any] | Exception]]:
+    """Invoke a pipeline on many states concurrently and yield the results in completion order.
+
+    The states are consumed lazily, so a generator of states never has more than `max_concurrency` of them in flight.
+
+    Args:
+        pipeline (Any): The pipeline to invoke. One instance serves all invocations.
+        states (Iterable[dict[str, Any]]): The initial states.
+        config (dict[str, Any] | None, optional): The runtime configuration shared by every invocation.
+            Defaults to None.
+        max_concurrency (int, optional): The maximum number of invocations in flight. Defaults to 8.
+        return_exceptions (bool, optional): Whether to yield the exception of a failed invocation instead of
+            raising it. Defaults to False, in which case the first failure cancels the invocations in flight.
+
+    Yields:
+        tuple[int, dict[str, Any] | Exception]: The index of the initial state, and its final state or exception.
+
+    Raises:
+        ValueError: If `max_concurrency` is lower than 1.
+    """
+    if max_concurrency < 1:
+        raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}.")
+
+    remaining = enumerate(states)
+    pending: dict[asyncio.Task, int] = {}
+    try:
+        while True:
+            for index, state in remaining:
+                pending[asyncio.create_task(pipeline.invoke(state, config))] = index
+                if len(pending) >= max_concurrency:
+                    break
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                # A cancelled task has no exception to read: `task.exception()` would raise instead
+                error = asyncio.CancelledError() if task.cancelled() else task.exception()
+                if error is not None and not return_exceptions:
+                    raise error
+                yield index, error if error is not None else task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        # Wait for the cancelled invocations to finish, so none is destroyed while still pending
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -17,10 +17,13 @@ from gllm_generation.response_synthesizer import ResponseSynthesizer
 from gllm_pipeline.steps import step
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
+from batch_invoke import BatchingEMInvoker, invoke_many
+
 load_dotenv()
 
 # Create components
-em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
+# Concurrent invocations embed their queries in shared batch requests
+em_invoker = BatchingEMInvoker(OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL")))
 data_store = ChromaVectorDataStore(
     collection_name="documents",
     client_type="persistent",
@@ -51,6 +54,17 @@ async def main():
     result = await e2e_pipeline.invoke(state, config)
     print(f"Pipeline result: {result['response']}")
 
+    # Invoke many queries concurrently, e.g. for an evaluation run
+    queries = [
+        "Which creatures live in the forest?",
+        "Which creatures can fly?",
+        "Give me aquatic creatures from the dataset",
+    ]
+    states = [{"user_query": query} for query in queries]
+    async for index, result in invoke_many(e2e_pipeline, states, config, max_concurrency=8):
+        print(f"[{index}] {queries[index]}: {result['response']}")
+    print(f"Embedded {em_invoker.requests} queries in {em_invoker.batches} batch request(s)")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,43 @@
+"""Example script to compile the route examples into precomputed embeddings for the semantic router.
+
+Run it after editing `route_examples.json`. Only new or edited examples are embedded.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/implement-semantic-routing
+"""
+
+import asyncio
+import json
+import time
+
+from dotenv import load_dotenv
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+
+from compiled_routes import DEFAULT_COMPILED_ROUTES_DIR, compile_routes
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+async def main():
+    """Compile the route examples."""
+    with open("route_examples.json", "r", encoding="utf-8") as f:
+        route_examples = json.load(f)
+
+    start_time = time.perf_counter()
+    compiled, embedded = await compile_routes(
+        route_examples,
+        OpenAIEMInvoker(EMBEDDING_MODEL),
+        EMBEDDING_MODEL,
+        DEFAULT_COMPILED_ROUTES_DIR,
+    )
+    print(
+        f"Compiled {len(compiled.examples)} examples of {len(compiled.routes)} routes into "
+        f"{DEFAULT_COMPILED_ROUTES_DIR}, embedded {embedded} new or edited examples "
+        f"in {time.perf_counter() - start_time:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,285 @@
+"""Precomputed route embeddings, so the router starts without embedding its examples.
+
+`AurelioSemanticRouter` embeds every route example when it is built, so each process start pays for those embedding
+calls before the first query can be routed. `compile_routes.py` embeds the examples once, offline, and writes to a
+versioned directory:
+    - `manifest.json`: the format version, the model name, the routes, and the examples with their text hashes.
+    - `embeddings.npy`: the normalized float32 embedding of each example, in manifest order.
+    - `centroids.npy`: the normalized mean embedding of each route.
+Recompiling reuses the embeddings of unchanged examples and only embeds new or edited ones.
+
+At startup, `CompiledRoutes.load` memory-maps the arrays, and `CompiledRoutesEMInvoker` serves the example embeddings
+from them to the router's encoder. Any other text, e.g. a query or an example added since the last compilation, is
+embedded by the wrapped EM invoker.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/implement-semantic-routing
+"""
+
+import hashlib
+import json
+import os
+from typing import Any
+
+import numpy as np
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+
+FORMAT_VERSION = 1
+DEFAULT_COMPILED_ROUTES_DIR = "data/compiled_routes"
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+CENTROIDS_FILE = "centroids.npy"
+
+
+def example_key(text: str) -> str:
+    """Compute the key identifying the embedding of a route example.
+
+    Args:
+        text (str): The route example.
+
+    Returns:
+        str: The SHA-1 hex digest of the text.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors to unit length, leaving zero vectors unchanged.
+
+    Args:
+        vectors (np.ndarray): The vectors, along the last axis.
+
+    Returns:
+        np.ndarray: The normalized float32 vectors.
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+
+class CompiledRoutes:
+    """Route example embeddings and route centroids, as compiled by `compile_routes`.
+
+    Attributes:
+        model_name (str): The embedding model the examples were embedded with.
+        routes (list[str]): The route names.
+        examples (list[str]): The route examples.
+        labels (np.ndarray): The index in `routes` of the route of each example.
+        embeddings (np.ndarray): The normalized embedding of each example, one row per example.
+        centroids (np.ndarray): The normalized mean embedding of each route, one row per route.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        routes: list[str],
+        examples: list[str],
+        labels: np.ndarray,
+        embeddings: np.ndarray,
+        centroids: np.ndarray,
+    ):
+        """Initialize the compiled routes.
+
+        Args:
+            model_name (str): The embedding model the examples were embedded with.
+            routes (list[str]): The route names.
+            examples (list[str]): The route examples.
+            labels (np.ndarray): The index in `routes` of the route of each example.
+            embeddings (np.ndarray): The normalized embedding of each example, one row per example.
+            centroids (np.ndarray): The normalized mean embedding of each route, one row per route.
+        """
+        self.model_name = model_name
+        self.routes = routes
+        self.examples = examples
+        self.labels = labels
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self._rows = {example_key(example): row for row, example in enumerate(examples)}
+
+    @classmethod
+    def load(cls, directory: str, model_name: str) -> "CompiledRoutes | None":
+        """Load compiled routes, memory-mapping their arrays.
+
+        Args:
+            directory (str): The directory written by `save`.
+            model_name (str): The embedding model the routes must have been compiled with.
+
+        Returns:
+            CompiledRoutes | None: The compiled routes, or None if they are missing, were written by another format
+                version, or were compiled with another model.
+        """
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != FORMAT_VERSION or manifest.get("model") != model_name:
+            return None
+
+        embeddings = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        centroids = np.load(os.path.join(directory, CENTROIDS_FILE), mmap_mode="r")
+        if len(embeddings) != len(manifest["examples"]) or len(centroids) != len(manifest["routes"]):
+            return None
+
+        return cls(
+            model_name=model_name,
+            routes=manifest["routes"],
+            examples=[example for example, _ in manifest["examples"]],
+            labels=np.array([label for _, label in manifest["examples"]], dtype=np.int32),
+            embeddings=embeddings,
+            centroids=centroids,
+        )
+
+    def save(self, directory: str) -> None:
+        """Write the compiled routes, replacing each file atomically. The manifest is written last.
+
+        Args:
+            directory (str): The directory to write to.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, array in ((EMBEDDINGS_FILE, self.embeddings), (CENTROIDS_FILE, self.centroids)):
+            tmp_path = os.path.join(directory, f"{name}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.asarray(array, dtype=np.float32))
+            os.replace(tmp_path, os.path.join(directory, name))
+
+        manifest = {
+            "version": FORMAT_VERSION,
+            "model": self.model_name,
+            "routes": self.routes,
+            "examples": [[example, int(label)] for example, label in zip(self.examples, self.labels)],
+        }
+        tmp_path = os.path.join(directory, f"{MANIFEST_FILE}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+    def embedding_of(self, text: str) -> np.ndarray | None:
+        """Get the compiled embedding of a route example.
+
+        Args:
+            text (str): The route example.
+
+        Returns:
+            np.ndarray | None: The normalized embedding, or None if the text is not a compiled example.
+        """
+        row = self._rows.get(example_key(text))
+        return self.embeddings[row] if row is not None else None
+
+    def is_current(self, route_examples: dict[str, list[str]]) -> bool:
+        """Check whether the compiled routes match the route examples.
+
+        Args:
+            route_examples (dict[str, list[str]]): The examples of each route.
+
+        Returns:
+            bool: True if the routes and examples are the same as when compiled, False otherwise.
+        """
+        examples, labels = _flatten(route_examples)
+        return (
+            list(route_examples) == self.routes
+            and examples == self.examples
+            and np.array_equal(labels, self.labels)
+        )
+
+
+async def compile_routes(
+    route_examples: dict[str, list[str]],
+    em_invoker: OpenAIEMInvoker,
+    model_name: str,
+    directory: str = DEFAULT_COMPILED_ROUTES_DIR,
+) -> tuple[CompiledRoutes, int]:
+    """Embed the route examples and write them with the route centroids, reusing the unchanged examples.
+
+    Args:
+        route_examples (dict[str, list[str]]): The examples of each route.
+        em_invoker (OpenAIEMInvoker): The EM invoker embedding new or edited examples.
+        model_name (str): The name of the embedding model of the EM invoker.
+        directory (str, optional): The directory to write to. Defaults to "data/compiled_routes".
+
+    Returns:
+        tuple[CompiledRoutes, int]: The compiled routes, loaded back from disk, and the number of examples embedded.
+    """
+    previous = CompiledRoutes.load(directory, model_name)
+    examples, labels = _flatten(route_examples)
+
+    vectors: dict[str, np.ndarray] = {}
+    missing: dict[str, str] = {}
+    for example in examples:
+        key = example_key(example)
+        reused = previous.embedding_of(example) if previous is not None else None
+        if reused is not None:
+            vectors[key] = np.array(reused)
+        else:
+            missing[key] = example
+    if missing:
+        embedded = await em_invoker.invoke(list(missing.values()))
+        vectors.update(zip(missing, normalize_vectors(np.asarray(embedded, dtype=np.float32))))
+
+    embeddings = np.stack([vectors[example_key(example)] for example in examples])
+    centroids = np.stack([embeddings[labels == index].mean(axis=0) for index in range(len(route_examples))])
+    centroids = normalize_vectors(centroids)
+    compiled = CompiledRoutes(model_name, list(route_examples), examples, labels, embeddings, centroids)
+    compiled.save(directory)
+    return CompiledRoutes.load(directory, model_name), len(missing)
+
+
+class CompiledRoutesEMInvoker:
+    """An EM invoker wrapper serving the embeddings of compiled route examples without calling the API.
+
+    Attributes:
+        em_invoker (OpenAIEMInvoker): The wrapped EM invoker, used for the texts that are not compiled.
+        compiled_routes (CompiledRoutes | None): The compiled routes, or None to embed every text.
+        hits (int): The number of texts served from the compiled routes.
+        misses (int): The number of texts embedded by the wrapped EM invoker.
+    """
+
+    def __init__(self, em_invoker: OpenAIEMInvoker, compiled_routes: CompiledRoutes | None):
+        """Initialize the wrapper.
+
+        Args:
+            em_invoker (OpenAIEMInvoker): The EM invoker to wrap.
+            compiled_routes (CompiledRoutes | None): The compiled routes, or None to embed every text.
+        """
+        self.em_invoker = em_invoker
+        self.compiled_routes = compiled_routes
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate unknown attributes to the wrapped invoker."""
+        return getattr(self.em_invoker, name)
+
+    async def invoke(self, content: str | list[str], **kwargs: Any) -> list[float] | list[list[float]]:
+        """Embed one or more texts, calling the wrapped invoker only for the texts that are not compiled.
+
+        Args:
+            content (str | list[str]): The text or texts to embed.
+            **kwargs: Extra keyword arguments passed to the wrapped invoker.
+
+        Returns:
+            list[float] | list[list[float]]: The embedding of `content`, or one embedding per text if a list is given.
+        """
+        texts = [content] if isinstance(content, str) else list(content)
+        results: list[list[float] | None] = [None] * len(texts)
+        missing: list[int] = []
+        for index, text in enumerate(texts):
+            vector = self.compiled_routes.embedding_of(text) if self.compiled_routes is not None else None
+            if vector is None:
+                missing.append(index)
+            else:
+                results[index] = vector.tolist()
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            embedded = await self.em_invoker.invoke([texts[index] for index in missing], **kwargs)
+            for index, vector in zip(missing, embedded):
+                results[index] = list(vector)
+        return results[0] if isinstance(content, str) else results
+
+
+def _flatten(route_examples: dict[str, list[str]]) -> tuple[list[str], np.ndarray]:
+    examples = [example for route_utterances in route_examples.values() for example in route_utterances]
+    labels = np.repeat(np.arange(len(route_examples)), [len(utterances) for utterances in route_examples.values()])
+    return examples, labels.astype(np.int32)
@@ -22,15 +22,22 @@ from gllm_pipeline.pipeline.states import RAGState
 from gllm_pipeline.steps import step, switch
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
+from compiled_routes import DEFAULT_COMPILED_ROUTES_DIR, CompiledRoutes, CompiledRoutesEMInvoker
+from route_engine import HashedNgramEncoder, NearestRouteRouter
+from speculation import SpeculativeComponent, SpeculativeRouter
+
 load_dotenv()
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+ROUTER_ENGINE = os.getenv("ROUTER_ENGINE", "aurelio")  # "aurelio", "embedding", or "hashed"
+
 class RouterState(RAGState):
     """State for the router."""
     route: str
     source: str
 
 # Create components
-em_invoker = OpenAIEMInvoker("text-embedding-3-small")
+em_invoker = OpenAIEMInvoker(EMBEDDING_MODEL)
 data_store = ChromaVectorDataStore(
     collection_name="documents",
     client_type="persistent",
@@ -53,19 +60,51 @@ response_synthesizer_general = ResponseSynthesizer.stuff(
 with open("route_examples.json", "r", encoding="utf-8") as f:
     route_examples = json.load(f)
 
-semantic_router = AurelioSemanticRouter(
-    default_route = "general",
-    valid_routes = set({"knowledge_base", "general"}),
-    encoder = EMInvokerEncoder(
-        em_invoker = em_invoker,
-        score_threshold = 0.3,
-    ),
-    routes = route_examples,
+# Serve the route example embeddings from the output of compile_routes.py instead of embedding them on every start
+compiled_routes = CompiledRoutes.load(DEFAULT_COMPILED_ROUTES_DIR, EMBEDDING_MODEL)
+routes_compiled = compiled_routes is not None and compiled_routes.is_current(route_examples)
+if not routes_compiled and ROUTER_ENGINE != "hashed":
+    print("The compiled routes are missing or outdated, run `uv run compile_routes.py` to speed up the start.")
+
+if ROUTER_ENGINE == "hashed":
+    # Route fully in-process with a hashed character n-gram encoder, without any embedding call
+    semantic_router = NearestRouteRouter.from_examples(
+        route_examples,
+        HashedNgramEncoder(),
+        default_route="general",
+        score_threshold=0.2,
+    )
+elif ROUTER_ENGINE == "embedding":
+    # Score the embedded query against all compiled route examples in one matrix product
+    if not routes_compiled:
+        raise ValueError("The embedding router engine needs up-to-date routes, run `uv run compile_routes.py`.")
+    semantic_router = NearestRouteRouter.from_compiled(
+        compiled_routes,
+        em_invoker,
+        default_route="general",
+        score_threshold=0.3,
+    )
+else:
+    semantic_router = AurelioSemanticRouter(
+        default_route = "general",
+        valid_routes = set({"knowledge_base", "general"}),
+        encoder = EMInvokerEncoder(
+            em_invoker = CompiledRoutesEMInvoker(em_invoker, compiled_routes),
+            score_threshold = 0.3,
+        ),
+        routes = route_examples,
+    )
+
+# Retrieval has no side effects, so it can start while the router is still deciding
+speculative_retriever = SpeculativeComponent(retriever)
+speculative_router = SpeculativeRouter(
+    router=semantic_router,
+    speculations={"knowledge_base": [(speculative_retriever, {"query": "source", "top_k": "top_k"})]},
 )
 
 # Create the pipeline
 retrieve_step = step(
-    component=retriever,
+    component=speculative_retriever,
     input_map={"query": "user_query", "top_k": "top_k"},
     output_state="chunks",
 )
@@ -82,13 +121,13 @@ synthesize_general_step = step(
     output_state="response",
 )
 conditional_step = switch(
-    condition = semantic_router,
+    condition = speculative_router,
     branches = {
         "knowledge_base": [retrieve_step, synthesize_step],
         "general": synthesize_general_step,
     },
     default = synthesize_general_step,
-    input_map = {"source": "user_query"},
+    input_map = {"source": "user_query", "top_k": "top_k"},
     output_state = "response",
 )
 
@@ -103,6 +142,8 @@ async def main():
     config = {"top_k": 5}
     result = await e2e_pipeline.invoke(state, config)
     print(f"Pipeline result: {result['response']}")
+    for route, stats in speculative_router.stats.items():
+        print(f"Speculation on {route!r}: {stats}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,255 @@
+"""Nearest-route router scoring a query against every route example in one matrix product.
+
+`NearestRouteRouter` keeps the normalized embeddings of all route examples in one matrix, grouped by route. Routing a
+query is one matrix-vector product followed by a per-route maximum (`nearest` scoring), or one product with the route
+centroids (`centroid` scoring). The best route is returned if its score reaches the threshold, else the default route.
+
+Queries can be embedded by:
+    - an EM invoker, with the example embeddings taken from the routes compiled by `compile_routes.py`.
+    - `HashedNgramEncoder`, a local encoder hashing character n-grams into a fixed-size vector. Routing then runs fully
+      in-process, in well under a millisecond, and no longer depends on the embedding API.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/implement-semantic-routing
+"""
+
+import inspect
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Any
+
+import numpy as np
+from gllm_core.schema import Component
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+
+from compiled_routes import CompiledRoutes, normalize_vectors
+
+DEFAULT_HASHED_DIM = 2 ** 12
+SCORING_METHODS = ("nearest", "centroid")
+
+
+class HashedNgramEncoder:
+    """A local encoder hashing the character n-grams of a text into a normalized vector.
+
+    Each n-gram of the lowercased text, padded with spaces, is hashed into one of `dim` buckets with a hash-derived
+    sign. Counts are log-scaled, so frequent n-grams do not dominate.
+
+    Attributes:
+        dim (int): The vector dimension.
+        ngram_range (tuple[int, int]): The smallest and largest n-gram sizes.
+    """
+
+    def __init__(self, dim: int = DEFAULT_HASHED_DIM, ngram_range: tuple[int, int] = (3, 5)):
+        """Initialize the encoder.
+
+        Args:
+            dim (int, optional): The vector dimension. Defaults to 4,096.
+            ngram_range (tuple[int, int], optional): The smallest and largest n-gram sizes. Defaults to (3, 5).
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Encode texts.
+
+        Args:
+            texts (list[str]): The texts to encode.
+
+        Returns:
+            np.ndarray: The normalized float32 vectors, one row per text.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = " " + re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text).lower()).strip() + " "
+            ngrams = Counter(
+                text[start:start + size]
+                for size in range(self.ngram_range[0], self.ngram_range[1] + 1)
+                for start in range(len(text) - size + 1)
+            )
+            digests = np.fromiter((zlib.crc32(ngram.encode("utf-8")) for ngram in ngrams), np.uint32, len(ngrams))
+            weights = 1.0 + np.log(np.fromiter(ngrams.values(), np.float32, len(ngrams)))
+            signs = np.where(digests & 0x80000000, 1.0, -1.0)
+            vectors[row] = np.bincount(digests % self.dim, weights=signs * weights, minlength=self.dim)
+        return normalize_vectors(vectors)
+
+
+class EMInvokerQueryEncoder:
+    """An encoder embedding texts with an EM invoker.
+
+    Attributes:
+        em_invoker (OpenAIEMInvoker): The EM invoker.
+    """
+
+    def __init__(self, em_invoker: OpenAIEMInvoker):
+        """Initialize the encoder.
+
+        Args:
+            em_invoker (OpenAIEMInvoker): The EM invoker.
+        """
+        self.em_invoker = em_invoker
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        """Encode texts.
+
+        Args:
+            texts (list[str]): The texts to encode.
+
+        Returns:
+            np.ndarray: The normalized float32 vectors, one row per text.
+        """
+        return normalize_vectors(np.asarray(await self.em_invoker.invoke(texts), dtype=np.float32))
+
+
+class NearestRouteRouter(Component):
+    """A router returning the route whose examples are most similar to the query.
+
+    Attributes:
+        routes (list[str]): The route names.
+        encoder (Any): The query encoder, whose `encode(texts)` returns normalized vectors, or a coroutine of them.
+        default_route (str): The route returned when no route reaches the threshold.
+        score_threshold (float): The minimum cosine similarity for a route to be chosen.
+        scoring (str): "nearest" to score a route by its most similar example, "centroid" by its centroid.
+        last_scores (dict[str, float]): The score of each route for the last query.
+    """
+
+    def __init__(
+        self,
+        routes: list[str],
+        embeddings: np.ndarray,
+        labels: np.ndarray,
+        encoder: Any,
+        default_route: str,
+        score_threshold: float = 0.3,
+        scoring: str = "nearest",
+        centroids: np.ndarray | None = None,
+    ):
+        """Initialize the router.
+
+        Args:
+            routes (list[str]): The route names.
+            embeddings (np.ndarray): The normalized embedding of each route example, one row per example.
+            labels (np.ndarray): The index in `routes` of the route of each example.
+            encoder (Any): The query encoder, whose `encode(texts)` returns normalized vectors, or a coroutine of them.
+                It must produce vectors comparable with `embeddings`.
+            default_route (str): The route returned when no route reaches the threshold.
+            score_threshold (float, optional): The minimum cosine similarity for a route to be chosen.
+                Defaults to 0.3.
+            scoring (str, optional): "nearest" to score a route by its most similar example, "centroid" by its
+                centroid. Defaults to "nearest".
+            centroids (np.ndarray | None, optional): The normalized centroid of each route, one row per route, e.g.
+                the compiled ones. Defaults to None, in which case they are computed from the embeddings.
+
+        Raises:
+            ValueError: If the scoring method is not supported, a route has no example, or the centroids do not
+                match the routes.
+        """
+        if scoring not in SCORING_METHODS:
+            raise ValueError(f"Unsupported scoring {scoring!r}, expected one of {SCORING_METHODS}.")
+        counts = np.bincount(labels, minlength=len(routes))
+        if not counts.all():
+            empty_routes = [routes[index] for index in np.flatnonzero(counts == 0)]
+            raise ValueError(f"Every route needs at least one example, got none for {empty_routes}.")
+        if centroids is not None and centroids.shape != (len(routes), embeddings.shape[1]):
+            raise ValueError(f"Expected one centroid per route of shape {embeddings.shape[1:]}, got {centroids.shape}.")
+
+        super().__init__()
+        self.routes = routes
+        self.encoder = encoder
+        self.default_route = default_route
+        self.score_threshold = score_threshold
+        self.scoring = scoring
+        self.last_scores: dict[str, float] = {}
+
+        order = np.argsort(labels, kind="stable")
+        self._embeddings = np.ascontiguousarray(embeddings[order], dtype=np.float32)
+        self._starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        if centroids is None:
+            centroids = normalize_vectors(np.add.reduceat(self._embeddings, self._starts, axis=0))
+        self._centroids = np.asarray(centroids, dtype=np.float32)
+
+    @classmethod
+    def from_examples(
+        cls,
+        route_examples: dict[str, list[str]],
+        encoder: HashedNgramEncoder,
+        default_route: str,
+        **kwargs: Any,
+    ) -> "NearestRouteRouter":
+        """Build a router encoding the route examples with a local encoder.
+
+        Args:
+            route_examples (dict[str, list[str]]): The examples of each route.
+            encoder (HashedNgramEncoder): The local encoder, used for both the examples and the queries.
+            default_route (str): The route returned when no route reaches the threshold.
+            **kwargs (Any): The other arguments of the router, e.g. `score_threshold`.
+
+        Returns:
+            NearestRouteRouter: The router.
+        """
+        examples = [example for utterances in route_examples.values() for example in utterances]
+        labels = np.repeat(np.arange(len(route_examples)), [len(utterances) for utterances in route_examples.values()])
+        return cls(list(route_examples), encoder.encode(examples), labels, encoder, default_route, **kwargs)
+
+    @classmethod
+    def from_compiled(
+        cls,
+        compiled_routes: CompiledRoutes,
+        em_invoker: OpenAIEMInvoker,
+        default_route: str,
+        **kwargs: Any,
+    ) -> "NearestRouteRouter":
+        """Build a router from compiled routes, embedding the queries with the same model.
+
+        The compiled centroids are used as is, so centroid scoring does not recompute them.
+
+        Args:
+            compiled_routes (CompiledRoutes): The routes compiled by `compile_routes.py`.
+            em_invoker (OpenAIEMInvoker): The EM invoker of the model the routes were compiled with.
+            default_route (str): The route returned when no route reaches the threshold.
+            **kwargs (Any): The other arguments of the router, e.g. `score_threshold`.
+
+        Returns:
+            NearestRouteRouter: The router.
+        """
+        return cls(
+            compiled_routes.routes,
+            compiled_routes.embeddings,
+            compiled_routes.labels,
+            EMInvokerQueryEncoder(em_invoker),
+            default_route,
+            centroids=compiled_routes.centroids,
+            **kwargs,
+        )
+
+    def score(self, query_vector: np.ndarray) -> np.ndarray:
+        """Score every route against an encoded query.
+
+        Args:
+            query_vector (np.ndarray): The normalized query vector.
+
+        Returns:
+            np.ndarray: The score of each route, in `routes` order.
+        """
+        if self.scoring == "centroid":
+            return self._centroids @ query_vector
+        return np.maximum.reduceat(self._embeddings @ query_vector, self._starts)
+
+    async def _run(self, source: str, **kwargs: Any) -> str:
+        """Route a query.
+
+        Args:
+            source (str): The query to route.
+            **kwargs (Any): Ignored.
+
+        Returns:
+            str: The best route, or the default route if no route reaches the threshold.
+        """
+        vectors = self.encoder.encode([source])
+        vectors = await vectors if inspect.isawaitable(vectors) else vectors
+        scores = self.score(vectors[0])
+        self.last_scores = dict(zip(self.routes, scores.tolist()))
+
+        best = int(scores.argmax())
+        return self.routes[best] if scores[best] >= self.score_threshold else self.default_route
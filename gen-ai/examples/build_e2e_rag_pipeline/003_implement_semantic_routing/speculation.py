@@ -0,0 +1,241 @@
+"""Speculative execution of the most likely branch of a `switch` or `toggle` while its condition is evaluated.
+
+Without speculation, the router latency is on the critical path of every query: the `knowledge_base` branch only
+starts retrieving once the router has answered. With speculation:
+    1. `SpeculativeRouter` predicts the route from the routes taken so far and, before calling the wrapped router,
+       starts the side-effect-free prefix steps of the predicted branch, e.g. retrieval.
+    2. If the router confirms the prediction, the branch's `SpeculativeComponent` picks up the in-flight result
+       instead of starting over (commit).
+    3. Otherwise, the speculative work of that request is cancelled and counted as wasted. Concurrent requests only
+       cancel their own speculative runs, and runs that no step picks up are dropped after `max_age_seconds`.
+
+Only wrap components without side effects, since their work may be thrown away. The same router wrapper works for
+`toggle`, whose condition returns a boolean, by using `True` and `False` as routes.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/implement-semantic-routing
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any
+
+from gllm_core.schema import Component
+
+DEFAULT_MAX_AGE_SECONDS = 30.0
+
+
+@dataclass
+class SpeculationStats:
+    """Speculation statistics of a branch.
+
+    Attributes:
+        speculations (int): The number of times the branch was predicted and a new run of its prefix started.
+        hits (int): The number of speculations confirmed by the router.
+        wasted_seconds (float): The time spent on cancelled speculative work.
+        saved_seconds (float): The speculative work done before the branch needed it, i.e. removed from the
+            critical path.
+    """
+
+    speculations: int = 0
+    hits: int = 0
+    wasted_seconds: float = 0.0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of speculations confirmed by the router."""
+        return self.hits / self.speculations if self.speculations else 0.0
+
+    def __str__(self) -> str:
+        """Summarize the statistics."""
+        return (
+            f"{self.hits}/{self.speculations} hits ({self.hit_rate:.0%}), {self.saved_seconds:.2f}s saved, "
+            f"{self.wasted_seconds:.2f}s wasted"
+        )
+
+
+@dataclass
+class _Speculation:
+    task: asyncio.Task
+    started: float
+    stats: SpeculationStats
+    claims: int = 1
+
+
+class SpeculativeComponent(Component):
+    """A side-effect-free component that can be started ahead of time by a `SpeculativeRouter`.
+
+    Speculative runs are keyed by their arguments, so each request only picks up or cancels the run started for its
+    own arguments. Concurrent requests with the same arguments share one run, which is only cancelled once none of
+    them needs it. Runs that no step picks up within `max_age_seconds` are cancelled and counted as wasted.
+
+    Attributes:
+        component (Component): The wrapped component.
+        max_age_seconds (float): How long a speculative run waits to be picked up before it is dropped.
+    """
+
+    def __init__(self, component: Component, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        """Initialize the wrapper.
+
+        Args:
+            component (Component): The component to wrap. It must not have side effects.
+            max_age_seconds (float, optional): How long a speculative run waits to be picked up before it is
+                dropped. Defaults to 30.
+        """
+        super().__init__()
+        self.component = component
+        self.max_age_seconds = max_age_seconds
+        self._pending: dict[str, _Speculation] = {}
+
+    def speculate(self, stats: SpeculationStats, **kwargs: Any) -> tuple[str, bool]:
+        """Start running the component in the background, unless a run with the same arguments is pending.
+
+        Args:
+            stats (SpeculationStats): The statistics of the branch the speculation belongs to.
+            **kwargs (Any): The arguments the branch step is expected to pass.
+
+        Returns:
+            tuple[str, bool]: The key of the speculative run, to `release` it, and whether a new run was started.
+        """
+        self._drop_expired()
+        key = _fingerprint(kwargs)
+        speculation = self._pending.get(key)
+        if speculation is not None:
+            speculation.claims += 1
+            return key, False
+
+        task = asyncio.create_task(self.component.run(**kwargs))
+        self._pending[key] = _Speculation(task, time.perf_counter(), stats)
+        return key, True
+
+    def release(self, key: str) -> None:
+        """Give up a speculative run, cancelling it and counting its time as wasted once no request needs it.
+
+        Args:
+            key (str): The key returned by `speculate`.
+        """
+        speculation = self._pending.get(key)
+        if speculation is None:
+            return
+        speculation.claims -= 1
+        if speculation.claims <= 0:
+            self._discard(key)
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Pick up the speculative run started with the same arguments, or run the component now.
+
+        Args:
+            **kwargs (Any): The arguments of the component.
+
+        Returns:
+            Any: The component result.
+        """
+        self._drop_expired()
+        key = _fingerprint(kwargs)
+        speculation = self._pending.get(key)
+        if speculation is None or speculation.task.cancelled():
+            return await self.component.run(**kwargs)
+
+        speculation.claims -= 1
+        if speculation.claims <= 0:
+            del self._pending[key]
+        speculation.stats.saved_seconds += time.perf_counter() - speculation.started
+        # Shielded, so a cancelled request does not cancel a run other requests with the same arguments wait for
+        return await asyncio.shield(speculation.task)
+
+    def _drop_expired(self) -> None:
+        deadline = time.perf_counter() - self.max_age_seconds
+        for key in [key for key, speculation in self._pending.items() if speculation.started < deadline]:
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        speculation = self._pending.pop(key)
+        speculation.task.cancel()
+        speculation.stats.wasted_seconds += time.perf_counter() - speculation.started
+
+
+class SpeculativeRouter(Component):
+    """A `switch` or `toggle` condition that starts the prefix of the predicted branch while routing.
+
+    Attributes:
+        router (Component): The wrapped router, called with the `source` argument.
+        speculations (dict[Any, list[tuple[SpeculativeComponent, dict[str, str]]]]): For each route, the prefix
+            components to start and their argument names mapped to the names of the router arguments they take.
+        stats (dict[Any, SpeculationStats]): The speculation statistics of each route with speculative components.
+    """
+
+    def __init__(
+        self,
+        router: Component,
+        speculations: dict[Any, list[tuple[SpeculativeComponent, dict[str, str]]]],
+    ):
+        """Initialize the wrapper.
+
+        Args:
+            router (Component): The router to wrap, called with the `source` argument.
+            speculations (dict[Any, list[tuple[SpeculativeComponent, dict[str, str]]]]): For each route, the
+                prefix components to start and their argument names mapped to the names of the router arguments
+                they take. The first route is predicted until a route has been taken.
+        """
+        super().__init__()
+        self.router = router
+        self.speculations = speculations
+        self.stats = {route: SpeculationStats() for route in speculations}
+        self._routes_taken: Counter = Counter()
+
+    @property
+    def predicted_route(self) -> Any:
+        """The route taken most often so far, or the first speculative route if none was taken yet."""
+        if not self._routes_taken:
+            return next(iter(self.speculations))
+        return self._routes_taken.most_common(1)[0][0]
+
+    async def _run(self, source: str, **kwargs: Any) -> Any:
+        """Route a query, speculatively starting the predicted branch meanwhile.
+
+        Args:
+            source (str): The query to route.
+            **kwargs (Any): Additional values the speculative components may take, e.g. `top_k`.
+
+        Returns:
+            Any: The route chosen by the wrapped router.
+        """
+        predicted = self.predicted_route
+        components = self.speculations.get(predicted, [])
+        arguments = {"source": source, **kwargs}
+        started: list[tuple[SpeculativeComponent, str]] = []
+        new_runs = 0
+        for component, input_map in components:
+            key, is_new = component.speculate(
+                self.stats[predicted], **{arg: arguments[name] for arg, name in input_map.items()}
+            )
+            started.append((component, key))
+            new_runs += is_new
+        if new_runs:
+            self.stats[predicted].speculations += 1
+
+        try:
+            route = await self.router.run(source=source)
+        except BaseException:
+            self._release(started)
+            raise
+
+        self._routes_taken[route] += 1
+        if route != predicted:
+            self._release(started)
+        elif new_runs:
+            self.stats[predicted].hits += 1
+        return route
+
+    @staticmethod
+    def _release(started: list[tuple[SpeculativeComponent, str]]) -> None:
+        for component, key in started:
+            component.release(key)
+
+
+def _fingerprint(kwargs: dict[str, Any]) -> str:
+    return json.dumps(kwargs, sort_keys=True, default=str)
@@ -9,6 +9,7 @@ References:
 
 import asyncio
 import os
+import time
 
 from dotenv import load_dotenv
 from gllm_datastore.vector_data_store import ChromaVectorDataStore
@@ -18,6 +19,8 @@ from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
 from gllm_pipeline.steps import step
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
+from streaming import stream, streaming_step
+
 load_dotenv()
 
 # Create components
@@ -35,7 +38,7 @@ reference_formatter = SimilarityBasedReferenceFormatter(
 )
 
 # Create the pipeline
-retrieve_step = step(
+retrieve_step = streaming_step(  # Publish the chunks as soon as they are retrieved
     component=retriever,
     input_map={"query": "user_query", "top_k": "top_k"},
     output_state="chunks",
@@ -58,9 +61,21 @@ e2e_pipeline = retrieve_step | synthesize_step | format_reference_step
 async def main():
     state = {"user_query": "Give me nocturnal creatures from the dataset"}  # Replace with your actual query
     config = {"top_k": 5}
-    result = await e2e_pipeline.invoke(state, config)
-    print(f"Pipeline result: {result['response']}")
-    print(f"References: {result['references']}")
+
+    # Stream the pipeline: the response is printed token by token as it is generated
+    start_time = time.perf_counter()
+    first_token_time = None
+    async for update in stream(e2e_pipeline, state, config):
+        if update.kind == "state":
+            print(f"Retrieved {len(update.data['chunks'])} chunks")
+        elif update.kind == "token":
+            first_token_time = first_token_time or time.perf_counter() - start_time
+            print(update.data, end="", flush=True)
+        else:
+            print(f"\nPipeline result: {update.data['response']}")
+            print(f"References: {update.data['references']}")
+    if first_token_time is not None:
+        print(f"Time to first token: {first_token_time:.2f} seconds")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+"""Streaming of state updates and response tokens while a pipeline runs.
+
+`pipeline.invoke` only returns once every step has finished, so a chat UI waits for the whole generation and the
+reference formatting before showing anything. `stream` runs the pipeline in the background with an `EventEmitter`
+using a stream handler in its config and yields updates as soon as they are available:
+    1. `token`: a response delta streamed by the language model of the synthesize step.
+    2. `state`: the output of a step created with `streaming_step`, e.g. the retrieved chunks.
+    3. `done`: the final state.
+
+The time to the first token is therefore bounded by retrieval plus the first token of the language model.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/adding-document-references
+"""
+
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from gllm_core.event import EventEmitter
+from gllm_core.schema import Component
+from gllm_pipeline.steps import step
+
+TOKEN_EVENT_TYPES = ("response",)
+
+_updates: ContextVar[asyncio.Queue | None] = ContextVar("stream_updates", default=None)
+
+
+@dataclass
+class StreamUpdate:
+    """An update yielded by `stream`.
+
+    Attributes:
+        kind (str): The kind of update, "token", "state", or "done".
+        data (Any): The response delta for "token", the step output keyed by its output state for "state", or the
+            final state for "done".
+    """
+
+    kind: str
+    data: Any
+
+
+class StateUpdateComponent(Component):
+    """A component wrapper publishing its result as a state update to the running `stream`, if any.
+
+    Attributes:
+        component (Component): The wrapped component.
+        output_state (str): The state key the step writes the result to.
+    """
+
+    def __init__(self, component: Component, output_state: str):
+        """Initialize the wrapper.
+
+        Args:
+            component (Component): The component to wrap.
+            output_state (str): The state key the step writes the result to.
+        """
+        super().__init__()
+        self.component = component
+        self.output_state = output_state
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Run the wrapped component and publish its result.
+
+        Args:
+            **kwargs (Any): The arguments of the component.
+
+        Returns:
+            Any: The component result.
+        """
+        result = await self.component.run(**kwargs)
+        updates = _updates.get()
+        if updates is not None:
+            updates.put_nowait(StreamUpdate("state", {self.output_state: result}))
+        return result
+
+
+def streaming_step(component: Component, output_state: str, **kwargs: Any) -> Any:
+    """Create a step whose output is published as a state update when the pipeline is streamed.
+
+    Args:
+        component (Component): The component run by the step.
+        output_state (str): The state key the step writes its result to.
+        **kwargs (Any): The other arguments of `step`, e.g. `input_map`.
+
+    Returns:
+        Any: The step.
+    """
+    return step(component=StateUpdateComponent(component, output_state), output_state=output_state, **kwargs)
+
+
+async def stream(
+    pipeline: Any,
+    state: dict[str, Any],
+    config: dict[str, Any] | None = None,
+) -> AsyncIterator[StreamUpdate]:
+    """Run a pipeline and yield its updates as soon as they are available.
+
+    Args:
+        pipeline (Any): The pipeline to run.
+        state (dict[str, Any]): The initial state.
+        config (dict[str, Any] | None, optional): The runtime configuration. Its `event_emitter`, if any, is replaced
+            by one streaming to this function. Defaults to None.
+
+    Yields:
+        StreamUpdate: The token deltas and state updates in arrival order, then the final state.
+    """
+    updates: asyncio.Queue = asyncio.Queue()
+    event_emitter = EventEmitter.with_stream_handler()
+
+    async def forward_tokens() -> None:
+        async for event in event_emitter.stream():
+            if getattr(event, "type", None) in TOKEN_EVENT_TYPES:
+                updates.put_nowait(StreamUpdate("token", event.value))
+
+    async def run() -> None:
+        forwarder = asyncio.create_task(forward_tokens())
+        finished = False
+        result: Any = None
+        try:
+            result = await pipeline.invoke(state, {**(config or {}), "event_emitter": event_emitter})
+            finished = True
+        except Exception as error:
+            result = error
+            finished = True
+        finally:
+            # Also runs when the consumer stops early and cancels the invocation, so the forwarder never stays
+            # blocked on the event stream, and the queue always ends with the result or an exception.
+            try:
+                await event_emitter.close()
+                if finished:
+                    await forwarder  # forward the tokens emitted before the pipeline returned
+            except Exception as error:
+                result = result if isinstance(result, Exception) else error
+            finally:
+                forwarder.cancel()
+                updates.put_nowait(result)
+
+    context_token = _updates.set(updates)
+    try:
+        invocation = asyncio.create_task(run())  # the task copies the context, so its steps see the queue
+    finally:
+        _updates.reset(context_token)
+
+    try:
+        while True:
+            update = await updates.get()
+            if isinstance(update, StreamUpdate):
+                yield update
+            elif isinstance(update, Exception):
+                raise update
+            else:
+                yield StreamUpdate("done", update)
+                return
+    finally:
+        invocation.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await invocation
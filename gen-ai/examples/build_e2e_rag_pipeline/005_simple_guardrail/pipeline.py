@@ -9,6 +9,8 @@ References:
 
 import asyncio
 import os
+import time
+from dataclasses import dataclass
 from typing import Any
 
 from dotenv import load_dotenv
@@ -17,20 +19,32 @@ from gllm_core.event import EventEmitter
 from gllm_datastore.vector_data_store import ChromaVectorDataStore
 from gllm_generation.response_synthesizer import ResponseSynthesizer
 from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
-from gllm_pipeline.pipeline import RAGState
-from gllm_pipeline.steps import guard, log, step
+from gllm_pipeline.pipeline import Pipeline, RAGState
+from gllm_pipeline.steps import guard, log, step, transform
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
 load_dotenv()
 
+@dataclass(frozen=True)
+class QueryRejection:
+    """The outcome of a query rejected by the guardrail.
+
+    Attributes:
+        reason (str): Why the query was rejected.
+        query_length (int): The length of the rejected query.
+    """
+    reason: str
+    query_length: int
+
 # Define the state class
 class GuardrailState(RAGState):
     """RAG state with guardrail validation parameters.
 
-    Extends the base RAGState to include query length validation settings.
+    Extends the base RAGState to include query length validation settings, and the rejection of an invalid query.
     """
     max_query_length: int
     min_query_length: int
+    rejection: QueryRejection | None
 
 def validate_message_length(inputs: dict[str, Any]) -> bool:
     """Validate the length of the user query.
@@ -46,6 +60,21 @@ def validate_message_length(inputs: dict[str, Any]) -> bool:
     min_query_length = inputs["min_query_length"]
     return len(user_query) <= max_query_length and len(user_query) >= min_query_length
 
+def reject_query(inputs: dict[str, Any]) -> QueryRejection:
+    """Describe why the user query was rejected.
+
+    Args:
+        inputs (dict[str, Any]): The inputs to the function.
+
+    Returns:
+        QueryRejection: The rejection, stored in the state instead of a response.
+    """
+    user_query = inputs["user_query"]
+    return QueryRejection(
+        reason=f"The query length must be between {inputs['min_query_length']} and {inputs['max_query_length']}.",
+        query_length=len(user_query),
+    )
+
 # Create components
 em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
 data_store = ChromaVectorDataStore(
@@ -70,21 +99,30 @@ synthesize_step = step(
     output_state="response",
 )
 
+reject_step = transform(
+    reject_query,
+    ["user_query", "max_query_length", "min_query_length"],
+    "rejection",
+)
+
+# The synthesis only runs in the success branch, so a rejected query ends the pipeline without any LM call
 guardrail_step = guard(
     validate_message_length,
-    success_branch=retrieve_step,
-    failure_branch=log( # for extra logging step
-        message="User query length is not valid: '{user_query}'",
-        emit_kwargs={"event_level": EventLevel.INFO},
-    ),
+    success_branch=[retrieve_step, synthesize_step],
+    failure_branch=[
+        log( # for extra logging step
+            message="User query length is not valid: '{user_query}'",
+            emit_kwargs={"event_level": EventLevel.INFO},
+        ),
+        reject_step,
+    ],
     input_map={
         "user_query": "user_query",
         "max_query_length": "max_query_length",
         "min_query_length": "min_query_length",
     },
 )
-e2e_pipeline = guardrail_step | synthesize_step
-e2e_pipeline.state_type = GuardrailState
+e2e_pipeline = Pipeline(steps=[guardrail_step], state_type=GuardrailState)
 
 # Run the pipeline
 
@@ -107,12 +145,17 @@ async def main():
         "top_k": 5,
         "event_emitter": event_emitter, # for extra logging step
     }
+    start_time = time.perf_counter()
     result = await e2e_pipeline.invoke(
         # state,
         invalid_state, # to test guardrail
         config,
     )
-    print(f"Pipeline result: {result}")
+    elapsed = time.perf_counter() - start_time
+    if result.get("rejection") is not None:
+        print(f"Query rejected in {elapsed * 1000:.2f} ms: {result['rejection']}")
+    else:
+        print(f"Pipeline result: {result['response']}")
 
 
 if __name__ == "__main__":
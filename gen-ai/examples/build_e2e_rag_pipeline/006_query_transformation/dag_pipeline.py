@@ -0,0 +1,69 @@
+"""Example script running the query transformation pipeline as a DAG, with retrieval overlapping the rewrite.
+
+`pipeline.py` retrieves with the rewritten queries, so each step needs the previous one and nothing can overlap. This
+variant splits retrieval in two branches, so `DagPipeline` has independent steps to run concurrently:
+    1. The original query is searched for while the language model rewrites it.
+    2. The rewritten queries are searched for once the rewrite is done.
+    3. Both rankings are merged with reciprocal rank fusion, and the response is synthesized from the merged chunks.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/query-transformation
+"""
+
+import asyncio
+
+from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
+
+from dag_scheduler import DagStep
+from multi_query_retriever import MultiQueryRetriever, reciprocal_rank_fusion
+from pipeline import data_store, em_invoker, query_transformer, response_synthesizer
+
+# Create the pipeline. The steps declare what they read and write, so independent steps run concurrently.
+retrieve_original_step = DagStep(
+    component=BasicVectorRetriever(data_store),
+    input_map={"query": "user_query", "top_k": "top_k"},
+    output_state="original_chunks",
+    name="retrieve_original",
+)
+transform_query_step = DagStep(
+    component=query_transformer,
+    input_map={"query": "user_query"},
+    output_state="queries",
+    name="transform_query",
+)
+retrieve_rewrites_step = DagStep(
+    component=MultiQueryRetriever(BasicVectorRetriever(data_store), em_invoker),
+    input_map={"queries": "queries", "top_k": "top_k"},
+    output_state="rewrite_chunks",
+    name="retrieve_rewrites",
+)
+fuse_step = DagStep(
+    operation=lambda x: reciprocal_rank_fusion([x["original_chunks"], x["rewrite_chunks"]], x["top_k"]),
+    input_states=["original_chunks", "rewrite_chunks", "top_k"],
+    output_state="chunks",
+    name="fuse",
+)
+synthesize_step = DagStep(
+    component=response_synthesizer,
+    input_map={"query": "user_query", "chunks": "chunks"},
+    output_state="response",
+    name="synthesize",
+)
+
+dag_pipeline = retrieve_original_step | transform_query_step | retrieve_rewrites_step | fuse_step | synthesize_step
+
+
+# Run the pipeline
+async def main():
+    state = {"user_query": "Give me nocturnal creatures from the dataset"}  # Replace with your actual query
+    config = {"top_k": 5}
+    result = await dag_pipeline.invoke(state, config)
+    print(f"Pipeline result: {result['response']}")
+
+    print(f"Inferred DAG:\n{dag_pipeline.to_mermaid()}")
+    for name, (start, end) in dag_pipeline.timings.items():
+        print(f"{name}: {start:.2f}s -> {end:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
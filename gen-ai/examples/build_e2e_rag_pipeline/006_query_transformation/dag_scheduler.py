@@ -0,0 +1,193 @@
+"""Scheduler that runs independent pipeline steps concurrently.
+
+Steps composed with `|` run strictly one after another, even when a step does not need anything the previous one
+produces. `DagPipeline` derives what each step reads (`input_map` values and `input_states`) and writes
+(`output_state`), and orders a step after an earlier one only when they conflict:
+    - read after write: the step reads a state key the earlier step writes.
+    - write after read: the step writes a state key the earlier step reads.
+    - write after write: both steps write the same state key.
+Every other pair of steps runs concurrently, so the result is the same as running the steps in sequence.
+
+The inferred DAG can be printed as a Mermaid flowchart with `to_mermaid`.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/query-transformation
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any
+
+from gllm_core.schema import Component
+
+
+class DagStep:
+    """A pipeline step with explicit reads and writes, mirroring the arguments of `step` and `transform`.
+
+    Attributes:
+        name (str): The step name.
+        output_state (str): The state key the step writes its result to.
+        component (Component | None): The component run by the step, like in `step`.
+        input_map (dict[str, str]): The component argument names mapped to the state or config keys they read.
+        operation (Callable[[dict[str, Any]], Any] | None): The function run by the step, like in `transform`.
+        input_states (list[str]): The state keys passed to the operation.
+    """
+
+    def __init__(
+        self,
+        output_state: str,
+        component: Component | None = None,
+        input_map: dict[str, str] | None = None,
+        operation: Callable[[dict[str, Any]], Any] | None = None,
+        input_states: list[str] | None = None,
+        name: str | None = None,
+    ):
+        """Initialize the step. Exactly one of `component` and `operation` must be given.
+
+        Args:
+            output_state (str): The state key the step writes its result to.
+            component (Component | None, optional): The component run by the step. Defaults to None.
+            input_map (dict[str, str] | None, optional): The component argument names mapped to the state or config
+                keys they read. Defaults to None.
+            operation (Callable[[dict[str, Any]], Any] | None, optional): The function run by the step. It receives
+                a dictionary of the `input_states` values. Defaults to None.
+            input_states (list[str] | None, optional): The state keys passed to the operation. Defaults to None.
+            name (str | None, optional): The step name. Defaults to None, in which case it is derived from the
+                component class or the output state.
+
+        Raises:
+            ValueError: If not exactly one of `component` and `operation` is given.
+        """
+        if (component is None) == (operation is None):
+            raise ValueError("Exactly one of `component` and `operation` must be given.")
+
+        self.output_state = output_state
+        self.component = component
+        self.input_map = input_map or {}
+        self.operation = operation
+        self.input_states = input_states or []
+        self.name = name or (type(component).__name__ if component is not None else f"transform_{output_state}")
+
+    @property
+    def reads(self) -> set[str]:
+        """The state or config keys the step reads."""
+        return set(self.input_map.values()) | set(self.input_states)
+
+    @property
+    def writes(self) -> set[str]:
+        """The state keys the step writes."""
+        return {self.output_state}
+
+    async def run(self, state: dict[str, Any], config: dict[str, Any]) -> Any:
+        """Run the step.
+
+        Args:
+            state (dict[str, Any]): The current state.
+            config (dict[str, Any]): The runtime configuration. Keys missing from the state are read from it.
+
+        Returns:
+            Any: The step result.
+        """
+        values = {**config, **state}
+        if self.component is not None:
+            return await self.component.run(**{arg: values[key] for arg, key in self.input_map.items()})
+
+        result = self.operation({key: values[key] for key in self.input_states})
+        return await result if asyncio.iscoroutine(result) else result
+
+    def __or__(self, other: "DagStep | DagPipeline") -> "DagPipeline":
+        """Compose this step with the following step or pipeline."""
+        return DagPipeline([self]) | other
+
+
+class DagPipeline:
+    """A sequence of steps that runs each step as soon as the earlier steps it conflicts with are done.
+
+    Attributes:
+        steps (list[DagStep]): The steps, in their sequential order.
+        dependencies (dict[str, list[str]]): The names of the earlier steps each step waits for.
+        timings (dict[str, tuple[float, float]]): The start and end time of each step of the last invocation,
+            relative to its start.
+    """
+
+    def __init__(self, steps: list[DagStep]):
+        """Initialize the pipeline and infer its DAG.
+
+        Args:
+            steps (list[DagStep]): The steps, in their sequential order.
+
+        Raises:
+            ValueError: If two steps have the same name.
+        """
+        names = [step.name for step in steps]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Step names must be unique, got {names}.")
+
+        self.steps = steps
+        self.dependencies = {step.name: [] for step in steps}
+        for index, step in enumerate(steps):
+            for earlier in steps[:index]:
+                if (
+                    step.reads & earlier.writes
+                    or step.writes & earlier.reads
+                    or step.writes & earlier.writes
+                ):
+                    self.dependencies[step.name].append(earlier.name)
+        self.timings: dict[str, tuple[float, float]] = {}
+
+    def __or__(self, other: "DagStep | DagPipeline") -> "DagPipeline":
+        """Compose this pipeline with the following step or pipeline."""
+        return DagPipeline(self.steps + (other.steps if isinstance(other, DagPipeline) else [other]))
+
+    async def invoke(self, state: dict[str, Any], config: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Run the pipeline.
+
+        Args:
+            state (dict[str, Any]): The initial state.
+            config (dict[str, Any] | None, optional): The runtime configuration. Defaults to None.
+
+        Returns:
+            dict[str, Any]: The final state.
+        """
+        state = dict(state)
+        config = config or {}
+        start = time.perf_counter()
+        timings: dict[str, tuple[float, float]] = {}
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def run(step: DagStep) -> None:
+            await asyncio.gather(*(tasks[name] for name in self.dependencies[step.name]))
+            step_start = time.perf_counter() - start
+            state[step.output_state] = await step.run(state, config)
+            timings[step.name] = (step_start, time.perf_counter() - start)
+
+        async with asyncio.TaskGroup() as group:
+            for step in self.steps:
+                tasks[step.name] = group.create_task(run(step))
+
+        self.timings = timings
+        return state
+
+    def to_mermaid(self) -> str:
+        """Render the inferred DAG as a Mermaid flowchart.
+
+        Only the direct dependencies are drawn: an edge implied by a longer path is omitted.
+
+        Returns:
+            str: The Mermaid flowchart.
+        """
+        ancestors: dict[str, set[str]] = {}
+        for step in self.steps:
+            ancestors[step.name] = set(self.dependencies[step.name])
+            for name in self.dependencies[step.name]:
+                ancestors[step.name] |= ancestors[name]
+
+        lines = ["flowchart TD"]
+        for step in self.steps:
+            lines.append(f"    {step.name}[\"{step.name} → {step.output_state}\"]")
+            indirect = set().union(*(ancestors[name] for name in self.dependencies[step.name]))
+            lines.extend(
+                f"    {name} --> {step.name}" for name in self.dependencies[step.name] if name not in indirect
+            )
+        return "\n".join(lines)
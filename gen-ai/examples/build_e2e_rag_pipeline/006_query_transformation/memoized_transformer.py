@@ -0,0 +1,206 @@
+"""Memoization of query transformations, so repeated queries skip the rewrite LM call.
+
+`OneToOneQueryTransformer` calls the language model for every query, although the same queries keep coming back.
+`MemoizedQueryTransformer` wraps a query transformer and keys each transformation by the normalized query and a hash
+of the transformer prompt, so editing the prompt or the model never serves stale rewrites. A query is answered by the
+first tier that has it:
+    1. Memory: an LRU cache of the most recent transformations, bounded by `cache_size`.
+    2. Disk: an optional SQLite file, so transformations survive restarts. It is looked up per query rather than
+       loaded into memory, and holds at most `max_persisted_entries` transformations, dropping the least recently
+       used ones beyond that.
+    3. Transformer: the wrapped transformer. Concurrent calls for the same key share one transformer call
+       (single-flight), and its result is written to both tiers. Failed calls are not cached.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/query-transformation
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any
+
+from gllm_core.schema import Component
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_MAX_PERSISTED_ENTRIES = 100_000
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so that trivially different queries share a cache entry.
+
+    Args:
+        query (str): The query to normalize.
+
+    Returns:
+        str: The NFKC-normalized, lowercased query with collapsed whitespace and without trailing punctuation.
+    """
+    query = unicodedata.normalize("NFKC", query).lower()
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ")
+
+
+def prompt_hash(*parts: str) -> str:
+    """Hash the parts of a transformer prompt, e.g. its model, system template, and user template.
+
+    Args:
+        *parts (str): The prompt parts.
+
+    Returns:
+        str: The SHA-1 hex digest of the parts.
+    """
+    return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class MemoizedQueryTransformer(Component):
+    """A query transformer wrapper serving repeated queries from an in-memory LRU cache and an optional database.
+
+    Attributes:
+        transformer (Component): The wrapped query transformer, called with `query`.
+        prompt_key (str): The hash of the transformer prompt, part of every cache key.
+        cache_size (int): The maximum number of transformations kept in memory.
+        persist_path (str | None): The SQLite file persisting the transformations, or None to keep them in memory
+            only.
+        max_persisted_entries (int): The maximum number of transformations kept in the SQLite file.
+        memory_hits (int): The number of queries served from memory.
+        disk_hits (int): The number of queries served from the persisted transformations.
+        coalesced (int): The number of queries that waited for an identical in-flight transformation.
+        misses (int): The number of queries transformed by the wrapped transformer.
+    """
+
+    def __init__(
+        self,
+        transformer: Component,
+        prompt_key: str,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        persist_path: str | None = None,
+        max_persisted_entries: int = DEFAULT_MAX_PERSISTED_ENTRIES,
+    ):
+        """Initialize the wrapper, opening the persisted transformations if any.
+
+        Args:
+            transformer (Component): The query transformer to wrap, e.g. a `OneToOneQueryTransformer`.
+            prompt_key (str): The hash of the transformer prompt, e.g. from `prompt_hash`. Transformations cached
+                with another prompt key are never served.
+            cache_size (int, optional): The maximum number of transformations kept in memory. Defaults to 1,024.
+            persist_path (str | None, optional): The SQLite file persisting the transformations. Defaults to None,
+                in which case they are kept in memory only.
+            max_persisted_entries (int, optional): The maximum number of transformations kept in the SQLite file.
+                Defaults to 100,000.
+        """
+        super().__init__()
+        self.transformer = transformer
+        self.prompt_key = prompt_key
+        self.cache_size = cache_size
+        self.persist_path = persist_path
+        self.max_persisted_entries = max_persisted_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, list[str]] = OrderedDict()
+        self._persisted_entries = 0
+        self._db = self._open() if persist_path else None
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    def key(self, query: str) -> str:
+        """Compute the cache key of a query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            str: The SHA-1 hex digest of the prompt key and the normalized query.
+        """
+        return hashlib.sha1(f"{self.prompt_key}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    async def _run(self, query: str, **kwargs: Any) -> list[str]:
+        """Transform a query, calling the wrapped transformer only if no tier has the transformation.
+
+        Args:
+            query (str): The query to transform.
+            **kwargs (Any): Passed to the wrapped transformer. They are not part of the cache key.
+
+        Returns:
+            list[str]: The transformed queries.
+        """
+        key = self.key(query)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.memory_hits += 1
+            return list(self._cache[key])
+
+        persisted = self._read(key)
+        if persisted is not None:
+            self.disk_hits += 1
+            self._remember(key, persisted)
+            return list(persisted)
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._transform(key, query, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded, so a cancelled caller does not cancel the transformation the other callers wait for.
+        return list(await asyncio.shield(task))
+
+    async def _transform(self, key: str, query: str, **kwargs: Any) -> list[str]:
+        result = await self.transformer.run(query=query, **kwargs)
+        queries = [result] if isinstance(result, str) else list(result)
+        self._remember(key, queries)
+        self._write(key, queries)
+        return queries
+
+    def _remember(self, key: str, queries: list[str]) -> None:
+        self._cache[key] = queries
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+        db = sqlite3.connect(self.persist_path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS transformations (key TEXT PRIMARY KEY, queries TEXT NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS transformations_last_access ON transformations (last_access)")
+        db.commit()
+        self._persisted_entries = db.execute("SELECT COUNT(*) FROM transformations").fetchone()[0]
+        return db
+
+    def _read(self, key: str) -> list[str] | None:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT queries FROM transformations WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE transformations SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return json.loads(row[0])
+
+    def _write(self, key: str, queries: list[str]) -> None:
+        if self._db is None:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO transformations (key, queries, last_access) VALUES (?, ?, ?)",
+            (key, json.dumps(queries, ensure_ascii=False), time.time()),
+        )
+        self._persisted_entries += 1  # The key was just looked up and missing
+        if self._persisted_entries > self.max_persisted_entries:
+            # Drop the least recently used transformations beyond the limit
+            self._db.execute(
+                "DELETE FROM transformations WHERE key IN "
+                "(SELECT key FROM transformations ORDER BY last_access LIMIT ?)",
+                (self._persisted_entries - self.max_persisted_entries,),
+            )
+            self._persisted_entries = self._db.execute("SELECT COUNT(*) FROM transformations").fetchone()[0]
+        self._db.commit()
@@ -0,0 +1,190 @@
+"""Fan-out retrieval over the transformed queries, merged with reciprocal rank fusion.
+
+Joining the transformed queries into one string and retrieving with the original query wastes the rewrite: chunks
+that only match one rewording are never searched for. `MultiQueryRetriever` searches for every query instead:
+    1. The original query and the transformed queries are deduplicated and embedded in one batch request, through
+       `PrefetchingEMInvoker`, the EM invoker of the vector data store.
+    2. The searches run concurrently. Each one gets its query embedding from the prefetched batch, so no search waits
+       for an embedding request of its own. The batch is only visible to the searches of the same call, through a
+       context variable, and is dropped when they finish, whether or not they used it.
+    3. The rankings are merged with reciprocal rank fusion (RRF), which only uses ranks and thus needs no score
+       calibration. A chunk found by several queries appears once, ranked by its fused score.
+
+The latency is therefore one embedding request and the slowest search, whatever the number of query variants.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/query-transformation
+    [2] Cormack, G. V., Clarke, C. L. A., & Buettcher, S. (2009). Reciprocal rank fusion outperforms Condorcet and
+        individual rank learning methods. https://dl.acm.org/doi/10.1145/1571941.1572114
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from gllm_core.schema import Chunk, Component
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+
+DEFAULT_TOP_K = 5
+DEFAULT_RRF_K = 60
+DEFAULT_CANDIDATE_FACTOR = 2
+
+_prefetched: ContextVar[dict[str, list[float]] | None] = ContextVar("prefetched_embeddings", default=None)
+
+
+def reciprocal_rank_fusion(rankings: list[list[Chunk]], top_k: int, k: int = DEFAULT_RRF_K) -> list[Chunk]:
+    """Merge rankings of chunks by summing `1 / (k + rank)` over the rankings each chunk appears in.
+
+    Args:
+        rankings (list[list[Chunk]]): The rankings to merge, best first.
+        top_k (int): The number of chunks to return.
+        k (int, optional): The rank offset, which dampens the weight of the top ranks. Defaults to 60.
+
+    Returns:
+        list[Chunk]: The merged ranking, with the fused scores.
+    """
+    scores: dict[str, float] = {}
+    chunks: dict[str, Chunk] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.id] = scores.get(chunk.id, 0.0) + 1 / (k + rank)
+            chunks.setdefault(chunk.id, chunk)
+
+    fused = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [
+        Chunk(id=chunk_id, content=chunks[chunk_id].content, metadata=chunks[chunk_id].metadata, score=scores[chunk_id])
+        for chunk_id in fused
+    ]
+
+
+class PrefetchingEMInvoker:
+    """An EM invoker wrapper serving embeddings computed ahead of time in one batch request.
+
+    Attributes:
+        em_invoker (OpenAIEMInvoker): The wrapped EM invoker.
+        hits (int): The number of texts served from prefetched embeddings.
+        misses (int): The number of texts embedded on demand.
+    """
+
+    def __init__(self, em_invoker: OpenAIEMInvoker):
+        """Initialize the wrapper.
+
+        Args:
+            em_invoker (OpenAIEMInvoker): The EM invoker to wrap.
+        """
+        self.em_invoker = em_invoker
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate unknown attributes to the wrapped invoker."""
+        return getattr(self.em_invoker, name)
+
+    @asynccontextmanager
+    async def prefetched(self, texts: list[str]) -> AsyncIterator[None]:
+        """Embed texts in one batch request, and serve their embeddings to the calls made inside the block.
+
+        The embeddings are only visible to the current task and the tasks it starts inside the block, so concurrent
+        requests never see each other's. They are dropped when the block exits.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Yields:
+            None: Control, while the embeddings are served.
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        embedded = await self.em_invoker.invoke(unique_texts)
+        prefetched = dict(zip(unique_texts, (list(vector) for vector in embedded)))
+        token = _prefetched.set(prefetched)
+        try:
+            yield
+        finally:
+            _prefetched.reset(token)
+            prefetched.clear()
+
+    async def invoke(self, content: str | list[str], **kwargs: Any) -> list[float] | list[list[float]]:
+        """Embed one or more texts, serving the texts prefetched for the current call and embedding the others.
+
+        Args:
+            content (str | list[str]): The text or texts to embed.
+            **kwargs: Extra keyword arguments passed to the wrapped invoker.
+
+        Returns:
+            list[float] | list[list[float]]: The embedding of `content`, or one embedding per text if a list is given.
+        """
+        texts = [content] if isinstance(content, str) else list(content)
+        prefetched = _prefetched.get() or {}
+        results = [prefetched.get(text) for text in texts]
+        missing = [index for index, vector in enumerate(results) if vector is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            embedded = await self.em_invoker.invoke([texts[index] for index in missing], **kwargs)
+            for index, vector in zip(missing, embedded):
+                results[index] = list(vector)
+        return results[0] if isinstance(content, str) else results
+
+
+class MultiQueryRetriever(Component):
+    """A retriever searching for several queries concurrently and fusing their rankings.
+
+    Attributes:
+        retriever (Component): The retriever run for each query, with `query` and `top_k`.
+        em_invoker (PrefetchingEMInvoker): The EM invoker of the retriever's vector data store.
+        rrf_k (int): The rank offset of the reciprocal rank fusion.
+        candidate_factor (int): The number of candidates per requested chunk fetched for each query before fusion.
+    """
+
+    def __init__(
+        self,
+        retriever: Component,
+        em_invoker: PrefetchingEMInvoker,
+        rrf_k: int = DEFAULT_RRF_K,
+        candidate_factor: int = DEFAULT_CANDIDATE_FACTOR,
+    ):
+        """Initialize the retriever.
+
+        Args:
+            retriever (Component): The retriever run for each query, e.g. a `BasicVectorRetriever`.
+            em_invoker (PrefetchingEMInvoker): The EM invoker of the retriever's vector data store.
+            rrf_k (int, optional): The rank offset of the reciprocal rank fusion. Defaults to 60.
+            candidate_factor (int, optional): The number of candidates per requested chunk fetched for each query
+                before fusion. Defaults to 2.
+        """
+        super().__init__()
+        self.retriever = retriever
+        self.em_invoker = em_invoker
+        self.rrf_k = rrf_k
+        self.candidate_factor = candidate_factor
+
+    async def _run(
+        self,
+        queries: list[str],
+        query: str | None = None,
+        top_k: int = DEFAULT_TOP_K,
+        **kwargs: Any,
+    ) -> list[Chunk]:
+        """Retrieve the chunks most relevant to a set of queries.
+
+        Args:
+            queries (list[str]): The transformed queries.
+            query (str | None, optional): The original query, searched for as well. Defaults to None.
+            top_k (int, optional): The number of chunks to retrieve. Defaults to 5.
+            **kwargs (Any): Ignored, accepted for compatibility with other retrievers.
+
+        Returns:
+            list[Chunk]: The retrieved chunks, most relevant first, with their fused scores.
+        """
+        texts = list(dict.fromkeys(text.strip() for text in [query or "", *queries] if text and text.strip()))
+        if not texts:
+            return []
+
+        async with self.em_invoker.prefetched(texts):
+            rankings = await asyncio.gather(
+                *(self.retriever.run(query=text, top_k=top_k * self.candidate_factor) for text in texts)
+            )
+        return reciprocal_rank_fusion(list(rankings), top_k, self.rrf_k)
@@ -16,10 +16,13 @@ from gllm_generation.response_synthesizer import ResponseSynthesizer
 from gllm_inference.builder import build_lm_request_processor
 from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
 from gllm_pipeline.pipeline import RAGState
-from gllm_pipeline.steps import step, transform
+from gllm_pipeline.steps import step
 from gllm_retrieval.query_transformer.one_to_one_query_transformer import OneToOneQueryTransformer
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
+from memoized_transformer import MemoizedQueryTransformer, prompt_hash
+from multi_query_retriever import MultiQueryRetriever, PrefetchingEMInvoker
+
 load_dotenv()
 
 class RAGStateWithQT(RAGState):
@@ -27,39 +30,44 @@ class RAGStateWithQT(RAGState):
 
     Extends the base RAGState to include transformed queries.
     """
-    query: str
+    queries: list[str]
+
+TRANSFORM_MODEL_ID = "openai/gpt-4o-mini"
+TRANSFORM_SYSTEM_TEMPLATE = "You are a helpful assistant that rewrites queries for better retrieval. Rewrite the following query. Only output the transformed query."
+TRANSFORM_USER_TEMPLATE = "Query: {query}"
+QUERY_TRANSFORMATIONS_FILE = "data/query_transformations.sqlite3"
 
 # Create components
-em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
+em_invoker = PrefetchingEMInvoker(OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL")))
 data_store = ChromaVectorDataStore(
     collection_name="documents",
     client_type="persistent",
     persist_directory="data",
     embedding=em_invoker,
 )
-retriever = BasicVectorRetriever(data_store)
+query_transformer = MemoizedQueryTransformer(
+    OneToOneQueryTransformer(
+        lm_request_processor=build_lm_request_processor(
+            model_id=TRANSFORM_MODEL_ID,
+            system_template=TRANSFORM_SYSTEM_TEMPLATE,
+            user_template=TRANSFORM_USER_TEMPLATE,
+        )
+    ),
+    prompt_key=prompt_hash(TRANSFORM_MODEL_ID, TRANSFORM_SYSTEM_TEMPLATE, TRANSFORM_USER_TEMPLATE),
+    persist_path=QUERY_TRANSFORMATIONS_FILE,
+)
+retriever = MultiQueryRetriever(BasicVectorRetriever(data_store), em_invoker)
 response_synthesizer = ResponseSynthesizer.stuff_preset(os.getenv("LANGUAGE_MODEL"))
 
 # Create the pipeline
 transform_query_step = step(
-    component=OneToOneQueryTransformer(
-        lm_request_processor=build_lm_request_processor(
-            model_id="openai/gpt-4o-mini",
-            system_template="You are a helpful assistant that rewrites queries for better retrieval. Rewrite the following query. Only output the transformed query.",
-            user_template="Query: {query}",
-        )
-    ),
+    component=query_transformer,
     input_map={"query": "user_query"},
     output_state="queries",
 )
-flatten_query = transform(
-    operation=lambda x: "\n".join(x["queries"]),
-    input_states=["queries"],
-    output_state="query",
-)
 retrieve_step = step(
     component=retriever,
-    input_map={"query": "user_query", "top_k": "top_k"},
+    input_map={"queries": "queries", "query": "user_query", "top_k": "top_k"},
     output_state="chunks",
 )
 synthesize_step = step(
@@ -68,7 +76,7 @@ synthesize_step = step(
     output_state="response",
 )
 
-e2e_pipeline = transform_query_step | flatten_query | retrieve_step | synthesize_step
+e2e_pipeline = transform_query_step | retrieve_step | synthesize_step
 e2e_pipeline.state_type = RAGStateWithQT
 
 
@@ -79,6 +87,15 @@ async def main():
     result = await e2e_pipeline.invoke(state, config)
     print(f"Pipeline result: {result['response']}")
 
+    # A repeated query, written differently, reuses the transformation of the first one
+    repeated_state = {"user_query": "give me nocturnal creatures from the dataset?"}
+    await e2e_pipeline.invoke(repeated_state, config)
+    print(
+        f"Query transformations: {query_transformer.memory_hits} from memory, {query_transformer.disk_hits} from disk, "
+        f"{query_transformer.coalesced} coalesced, {query_transformer.misses} transformed"
+    )
+    print(f"Query embeddings: {em_invoker.hits} prefetched, {em_invoker.misses} embedded on demand")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,159 @@
+"""Benchmark the per-step overhead of `Pipeline.invoke` with and without `SharedOutputComponent`.
+
+Both pipelines mirror `pipeline.py` without any API call: the attachments are read from disk, a stub retriever
+returns fixed chunks, and several steps read the chunks and write the response. The only difference is whether the
+retriever is wrapped in `SharedOutputComponent`. Every component does next to no work, so the invocation time is the
+overhead of the executor passing the state between steps. The script reports the average time per invocation and per
+step of each pipeline.
+
+Usage:
+    uv run benchmark_state.py --chunks 100 --attachment-mb 10
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any
+
+from gllm_core.schema import Chunk, Component
+from gllm_inference.schema import Attachment
+from gllm_pipeline.steps import step, transform
+
+from pipeline import MultimodalRAGState, format_extra_contents
+from state_sharing import SharedOutputComponent
+
+ATTACHMENT_FILES = 10
+
+
+class StaticRetriever(Component):
+    """A retriever stand-in returning the same chunks for every query.
+
+    Attributes:
+        chunks (list[Chunk]): The chunks returned.
+    """
+
+    def __init__(self, chunks: list[Chunk]):
+        """Initialize the retriever.
+
+        Args:
+            chunks (list[Chunk]): The chunks returned.
+        """
+        super().__init__()
+        self.chunks = chunks
+
+    async def _run(self, query: str, top_k: int, **kwargs: Any) -> list[Chunk]:
+        """Return the first `top_k` chunks.
+
+        Args:
+            query (str): Ignored.
+            top_k (int): The number of chunks to return.
+            **kwargs (Any): Ignored.
+
+        Returns:
+            list[Chunk]: The chunks.
+        """
+        return self.chunks[:top_k]
+
+
+def make_inputs(directory: str, num_chunks: int, attachment_mb: float) -> tuple[list[Chunk], list[str]]:
+    """Create the chunks and the attachment files.
+
+    Args:
+        directory (str): The directory to write the attachment files to.
+        num_chunks (int): The number of chunks.
+        attachment_mb (float): The total size of the attachments in megabytes.
+
+    Returns:
+        tuple[list[Chunk], list[str]]: The chunks and the attachment paths.
+    """
+    chunks = [
+        Chunk(
+            content=f"Creature {index} lives in a glowing forest and hunts at night. " * 16,
+            metadata={"name": f"Creature {index}", "source": "imaginary_animals.csv", "row": index},
+            score=1 / (index + 1),
+        )
+        for index in range(num_chunks)
+    ]
+
+    file_size = int(attachment_mb * 1024 * 1024 / ATTACHMENT_FILES)
+    paths = []
+    for index in range(ATTACHMENT_FILES):
+        path = os.path.join(directory, f"attachment_{index}.png")
+        with open(path, "wb") as file:
+            file.write(os.urandom(file_size))
+        paths.append(path)
+    return chunks, paths
+
+
+def build_pipeline(retriever: Component, reading_steps: int) -> Any:
+    """Build a pipeline formatting the attachments, retrieving, then reading the chunks in several steps.
+
+    Args:
+        retriever (Component): The retriever component.
+        reading_steps (int): The number of steps reading the chunks after retrieval.
+
+    Returns:
+        Any: The pipeline.
+    """
+    pipeline = transform(format_extra_contents, ["attachments"], "extra_contents") | step(
+        component=retriever,
+        input_map={"query": "user_query", "top_k": "top_k"},
+        output_state="chunks",
+    )
+    for _ in range(reading_steps):
+        pipeline = pipeline | transform(lambda inputs: f"{len(inputs['chunks'])} chunks", ["chunks"], "response")
+    pipeline.state_type = MultimodalRAGState
+    return pipeline
+
+
+async def measure(pipeline: Any, state: dict[str, Any], config: dict[str, Any], repeats: int) -> float:
+    """Measure the average invocation time of a pipeline.
+
+    Args:
+        pipeline (Any): The pipeline.
+        state (dict[str, Any]): The initial state.
+        config (dict[str, Any]): The runtime configuration.
+        repeats (int): The number of invocations.
+
+    Returns:
+        float: The average time per invocation in milliseconds.
+    """
+    await pipeline.invoke(dict(state), config)  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        await pipeline.invoke(dict(state), config)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+async def main():
+    """Compare the pipeline with and without the shared chunks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100, help="number of retrieved chunks")
+    parser.add_argument("--attachment-mb", type=float, default=10.0, help="total size of the attachments")
+    parser.add_argument("--steps", type=int, default=5, help="number of steps reading the chunks")
+    parser.add_argument("--repeats", type=int, default=20, help="number of invocations per pipeline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        chunks, paths = make_inputs(directory, args.chunks, args.attachment_mb)
+        state = {"user_query": "Aquatic animals", "attachments": paths}
+        config = {"top_k": args.chunks}
+        pipelines = {
+            "plain": build_pipeline(StaticRetriever(chunks), args.steps),
+            "SharedOutputComponent": build_pipeline(SharedOutputComponent(StaticRetriever(chunks)), args.steps),
+        }
+
+        total_steps = args.steps + 2
+        print(f"{args.chunks} chunks, {args.attachment_mb:g} MB of attachments, {total_steps} steps")
+        for name, pipeline in pipelines.items():
+            milliseconds = await measure(pipeline, state, config, args.repeats)
+            print(
+                f"{name:>21}: {milliseconds:8.2f} ms per invocation, "
+                f"{milliseconds * 1000 / total_steps:8.1f} us per step"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -21,8 +21,12 @@ from gllm_pipeline.pipeline.states import RAGState
 from gllm_pipeline.steps import step, transform
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
+from state_sharing import SharedOutputComponent
+
 load_dotenv()
 
+SHARE_RETRIEVED_CHUNKS = os.getenv("SHARE_RETRIEVED_CHUNKS", "false").lower() == "true"
+
 class MultimodalRAGState(RAGState):
     """RAG state with multimodal input support.
 
@@ -70,7 +74,8 @@ format_extra_contents_step = transform(
     "extra_contents",
 )
 retrieve_step = step(
-    component=retriever,
+    # Share the chunks instead of copying them with the state, if benchmark_state.py shows that it helps
+    component=SharedOutputComponent(retriever) if SHARE_RETRIEVED_CHUNKS else retriever,
     input_map={"query": "user_query", "top_k": "top_k"},
     output_state="chunks",
 )
@@ -0,0 +1,64 @@
+"""Copy-free propagation of the retrieved chunks through pipeline state.
+
+If the pipeline executor, or a checkpointer, deep-copies the whole state between steps, the retrieved chunks are
+duplicated at every step although each later step only reads them. `SharedTuple` avoids that: it is immutable, so
+`copy.copy` and `copy.deepcopy` can safely return it as is. `SharedOutputComponent` wraps a component and returns its
+list results as `SharedTuple`s, so a deep copy of the state copies a reference to the chunks instead of every chunk.
+The chunks themselves are shared too, so later steps must not modify them.
+
+Whether this saves anything depends on how the executor passes the state, which is up to the SDK. Serializing the
+state, e.g. with `pickle`, still writes out every chunk. `benchmark_state.py` times `Pipeline.invoke` with and
+without the wrapper, and `pipeline.py` only uses it when `SHARE_RETRIEVED_CHUNKS` is set.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/multimodal-input-handling
+"""
+
+from typing import Any
+
+from gllm_core.schema import Component
+
+
+class SharedTuple(tuple):
+    """A tuple that is shared instead of copied by `copy.copy` and `copy.deepcopy`.
+
+    Being a tuple, it cannot be modified through any of the states holding it. Its items are shared as well.
+    """
+
+    def __copy__(self) -> "SharedTuple":
+        """Return the tuple itself."""
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "SharedTuple":
+        """Return the tuple itself."""
+        return self
+
+
+class SharedOutputComponent(Component):
+    """A component wrapper returning list results as `SharedTuple`s.
+
+    Attributes:
+        component (Component): The wrapped component.
+    """
+
+    def __init__(self, component: Component):
+        """Initialize the wrapper.
+
+        Args:
+            component (Component): The component to wrap. The items of its results must not be modified by later
+                steps.
+        """
+        super().__init__()
+        self.component = component
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Run the wrapped component.
+
+        Args:
+            **kwargs (Any): The arguments of the component.
+
+        Returns:
+            Any: The component result, as a `SharedTuple` if it is a list.
+        """
+        result = await self.component.run(**kwargs)
+        return SharedTuple(result) if isinstance(result, list) else result
@@ -0,0 +1,428 @@
+"""Size-bounded cache store with TTL, LRU or LFU eviction, and per-step counters.
+
+`BoundedCache` wraps the cache store returned by `data_store.as_cache()` and keeps an in-memory index of the entries
+written through it: their size, expiry time, access count, and last access. After every write, the least recently
+used (LRU) or least frequently used (LFU) entries are evicted from the underlying store until both `max_entries` and
+`max_bytes` hold again. Expired entries are treated as misses when read, and removed by a background compaction task.
+
+Steps share one budget but can count their traffic separately through `scope`. A miss followed by a write of the same
+key measures how long computing the value took, so every later hit also adds to an estimate of the time saved.
+
+With `index_path` set, the index is also kept in an append-only JSON lines journal next to the persistent store, so
+a restarted process keeps serving, and evicting, the entries written before it. The journal is replayed and
+compacted on the first cache operation, and entries beyond the limits or expired are removed then. Without a
+journal, e.g. on the first run, the index starts empty and the store is left untouched, since it may be shared:
+untracked entries are never served, are replaced when their key is written again, and are only removed by an explicit
+`clear()`. Journal records are written before the store is, so a crash can at worst leave an indexed key without a
+value, which reads as a miss.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/caching
+"""
+
+import asyncio
+import json
+import os
+import pickle
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_COMPACTION_INTERVAL = 60.0
+EVICTION_POLICIES = ("lru", "lfu")
+GLOBAL_SCOPE = "pipeline"
+
+
+@dataclass
+class CacheCounters:
+    """Traffic counters of a cache scope.
+
+    Attributes:
+        hits (int): The number of reads that found a live entry.
+        misses (int): The number of reads that found no entry or an expired one.
+        evictions (int): The number of entries evicted to respect the size limits.
+        expirations (int): The number of entries removed because their TTL elapsed.
+        saved_seconds (float): The estimated compute time saved by hits.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of reads that were hits."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        """Summarize the counters."""
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), {self.evictions} evictions, "
+            f"{self.expirations} expirations, ~{self.saved_seconds:.2f}s saved"
+        )
+
+
+@dataclass
+class _Entry:
+    scope: str
+    size: int
+    expires_at: float | None
+    compute_seconds: float = 0.0
+    accesses: int = 0
+    last_access: float = 0.0
+
+
+class BoundedCache:
+    """A cache store wrapper enforcing entry count, byte size, and TTL limits.
+
+    Attributes:
+        cache_store (Any): The wrapped cache store.
+        max_entries (int): The maximum number of entries.
+        max_bytes (int): The maximum total size of the pickled values.
+        ttl (float | None): The default time to live of an entry in seconds, or None for no expiry.
+        policy (str): The eviction policy, "lru" or "lfu".
+        index_path (str | None): The journal file persisting the index, or None to keep it in memory only.
+        counters (dict[str, CacheCounters]): The traffic counters of each scope.
+    """
+
+    def __init__(
+        self,
+        cache_store: Any,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float | None = None,
+        policy: str = "lru",
+        index_path: str | None = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            cache_store (Any): The cache store to wrap, e.g. the result of `data_store.as_cache()`.
+            max_entries (int, optional): The maximum number of entries. Defaults to 10,000.
+            max_bytes (int, optional): The maximum total size of the pickled values. Defaults to 256 MiB.
+            ttl (float | None, optional): The default time to live of an entry in seconds. Defaults to None, in
+                which case entries only leave the cache when evicted.
+            policy (str, optional): The eviction policy, "lru" or "lfu". Defaults to "lru".
+            index_path (str | None, optional): The journal file persisting the index across restarts. Defaults to
+                None, in which case the index only lives in memory.
+
+        Raises:
+            ValueError: If the eviction policy is not supported.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unsupported eviction policy {policy!r}, expected one of {EVICTION_POLICIES}.")
+
+        self.cache_store = cache_store
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self.index_path = index_path
+        self.counters: dict[str, CacheCounters] = {}
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._miss_started: dict[str, float] = {}
+        self._compaction_task: asyncio.Task | None = None
+        self._restoring: asyncio.Future | None = None
+        self._journal_records = 0
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate other attributes to the wrapped cache store."""
+        return getattr(self.cache_store, name)
+
+    def __len__(self) -> int:
+        """The number of tracked entries."""
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """The total size of the tracked values."""
+        return self._bytes
+
+    def scope(self, name: str) -> "CacheScope":
+        """Get a view of the cache that counts its traffic under a name, e.g. for one pipeline step.
+
+        Args:
+            name (str): The scope name.
+
+        Returns:
+            CacheScope: The view, sharing entries and limits with this cache.
+        """
+        return CacheScope(self, name)
+
+    async def retrieve(self, key: str, *args: Any, scope: str = GLOBAL_SCOPE, **kwargs: Any) -> Any:
+        """Read an entry.
+
+        Args:
+            key (str): The cache key.
+            *args (Any): Passed to the wrapped cache store.
+            scope (str, optional): The scope to count the read under. Defaults to "pipeline".
+            **kwargs (Any): Passed to the wrapped cache store.
+
+        Returns:
+            Any: The cached value, or None on a miss.
+        """
+        await self._restore()
+        counters = self.counters.setdefault(scope, CacheCounters())
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= time.time():
+            await self._drop(key, expired=True)
+            entry = None
+
+        value = await self.cache_store.retrieve(key, *args, **kwargs) if entry is not None else None
+        if value is None:
+            if entry is not None:
+                self._forget(key)
+                self._journal({"op": "delete", "key": key})
+            counters.misses += 1
+            self._miss_started[key] = time.perf_counter()
+            if len(self._miss_started) > self.max_entries:
+                del self._miss_started[next(iter(self._miss_started))]
+            return None
+
+        counters.hits += 1
+        counters.saved_seconds += entry.compute_seconds
+        entry.accesses += 1
+        entry.last_access = time.time()
+        self._entries.move_to_end(key)
+        self._journal({"op": "touch", "key": key, "accesses": entry.accesses, "last_access": entry.last_access})
+        return value
+
+    async def store(
+        self,
+        key: str,
+        value: Any,
+        *args: Any,
+        ttl: float | None = None,
+        scope: str = GLOBAL_SCOPE,
+        **kwargs: Any,
+    ) -> None:
+        """Write an entry, then evict entries until the limits hold.
+
+        Args:
+            key (str): The cache key.
+            value (Any): The value to cache.
+            *args (Any): Passed to the wrapped cache store.
+            ttl (float | None, optional): The time to live of this entry in seconds. Defaults to None, in which case
+                the cache's default TTL is used.
+            scope (str, optional): The scope to count the write under. Defaults to "pipeline".
+            **kwargs (Any): Passed to the wrapped cache store.
+        """
+        await self._restore()
+        ttl = ttl if ttl is not None else self.ttl
+        if key in self._entries:
+            self._forget(key)
+
+        started = self._miss_started.pop(key, None)
+        entry = _Entry(
+            scope=scope,
+            size=_size_of(value),
+            expires_at=time.time() + ttl if ttl is not None else None,
+            compute_seconds=time.perf_counter() - started if started is not None else 0.0,
+            last_access=time.time(),
+        )
+        self._journal({"op": "store", "key": key, **asdict(entry)})
+        await self.cache_store.store(key, value, *args, **kwargs)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self.counters.setdefault(scope, CacheCounters())
+        await self._evict(protected=key)
+
+    async def delete(self, key: str, *args: Any, **kwargs: Any) -> None:
+        """Delete an entry.
+
+        Args:
+            key (str): The cache key.
+            *args (Any): Passed to the wrapped cache store.
+            **kwargs (Any): Passed to the wrapped cache store.
+        """
+        await self._restore()
+        if key in self._entries:
+            self._forget(key)
+        await self.cache_store.delete(key, *args, **kwargs)
+        self._journal({"op": "delete", "key": key})
+
+    async def clear(self) -> None:
+        """Delete every entry of the wrapped cache store, including the entries this cache does not track."""
+        await self.cache_store.clear()
+        self._entries.clear()
+        self._bytes = 0
+        self._rewrite_journal()
+
+    async def compact(self) -> int:
+        """Remove the expired entries and evict entries beyond the limits.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        await self._restore()
+        return await self._compact()
+
+    def start_compaction(self, interval: float = DEFAULT_COMPACTION_INTERVAL) -> None:
+        """Start compacting the cache periodically in the background of the running event loop.
+
+        Args:
+            interval (float, optional): The number of seconds between compactions. Defaults to 60.
+        """
+        if self._compaction_task is None or self._compaction_task.done():
+            self._compaction_task = asyncio.create_task(self._compact_periodically(interval))
+
+    async def stop_compaction(self) -> None:
+        """Stop the background compaction."""
+        if self._compaction_task is not None:
+            self._compaction_task.cancel()
+            try:
+                await self._compaction_task
+            except asyncio.CancelledError:
+                pass
+            self._compaction_task = None
+
+    async def _compact_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.compact()
+
+    async def _evict(self, protected: str | None = None) -> int:
+        evicted = 0
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            candidates = (key for key in self._entries if key != protected)
+            if self.policy == "lru":
+                victim = next(candidates, None)
+            else:
+                victim = min(
+                    candidates,
+                    key=lambda key: (self._entries[key].accesses, self._entries[key].last_access),
+                    default=None,
+                )
+            if victim is None:
+                break
+            await self._drop(victim, expired=False)
+            evicted += 1
+        return evicted
+
+    async def _drop(self, key: str, expired: bool) -> None:
+        counters = self.counters.setdefault(self._entries[key].scope, CacheCounters())
+        if expired:
+            counters.expirations += 1
+        else:
+            counters.evictions += 1
+        self._forget(key)
+        await self.cache_store.delete(key)
+        self._journal({"op": "delete", "key": key})
+
+    async def _compact(self) -> int:
+        now = time.time()
+        expired = [
+            key for key, entry in self._entries.items() if entry.expires_at is not None and entry.expires_at <= now
+        ]
+        for key in expired:
+            await self._drop(key, expired=True)
+        removed = len(expired) + await self._evict()
+        if self._journal_records > 2 * len(self._entries) + self.max_entries:
+            self._rewrite_journal()
+        return removed
+
+    async def _restore(self) -> None:
+        if self.index_path is None:
+            return
+        if self._restoring is None:
+            self._restoring = asyncio.ensure_future(self._load_journal())
+        await asyncio.shield(self._restoring)
+
+    async def _load_journal(self) -> None:
+        if not os.path.exists(self.index_path):
+            self._rewrite_journal()  # Start with an empty index, leaving the possibly shared store untouched
+            return
+
+        entries: dict[str, _Entry] = {}
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short by a crash while appending
+                key = record.pop("key")
+                operation = record.pop("op")
+                if operation == "store":
+                    entries[key] = _Entry(**record)
+                elif operation == "touch" and key in entries:
+                    entries[key].accesses = record["accesses"]
+                    entries[key].last_access = record["last_access"]
+                elif operation == "delete":
+                    entries.pop(key, None)
+
+        for key, entry in sorted(entries.items(), key=lambda item: item[1].last_access):
+            self._entries[key] = entry
+            self._bytes += entry.size
+        self._rewrite_journal()
+        await self._compact()
+
+    def _journal(self, record: dict[str, Any]) -> None:
+        if self.index_path is None:
+            return
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self._journal_records += 1
+
+    def _rewrite_journal(self) -> None:
+        if self.index_path is None:
+            return
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, entry in self._entries.items():
+                f.write(json.dumps({"op": "store", "key": key, **asdict(entry)}) + "\n")
+        os.replace(tmp_path, self.index_path)
+        self._journal_records = len(self._entries)
+
+    def _forget(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key).size
+
+
+class CacheScope:
+    """A view of a `BoundedCache` that counts its traffic under its own name.
+
+    Attributes:
+        cache (BoundedCache): The shared cache.
+        name (str): The scope name.
+    """
+
+    def __init__(self, cache: BoundedCache, name: str):
+        """Initialize the view.
+
+        Args:
+            cache (BoundedCache): The shared cache.
+            name (str): The scope name.
+        """
+        self.cache = cache
+        self.name = name
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate other attributes to the shared cache."""
+        return getattr(self.cache, name)
+
+    @property
+    def counters(self) -> CacheCounters:
+        """The traffic counters of this scope."""
+        return self.cache.counters.setdefault(self.name, CacheCounters())
+
+    async def retrieve(self, key: str, *args: Any, **kwargs: Any) -> Any:
+        """Read an entry, counting the read under this scope."""
+        return await self.cache.retrieve(key, *args, scope=self.name, **kwargs)
+
+    async def store(self, key: str, value: Any, *args: Any, **kwargs: Any) -> None:
+        """Write an entry, counting the write under this scope."""
+        await self.cache.store(key, value, *args, scope=self.name, **kwargs)
+
+
+def _size_of(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value))
+    except Exception:
+        return len(repr(value).encode("utf-8"))
@@ -8,8 +8,10 @@ References:
 """
 
 import asyncio
+import hashlib
 import os
-from time import time
+from functools import partial
+from typing import Any
 
 from dotenv import load_dotenv
 from gllm_datastore.vector_data_store import ChromaVectorDataStore
@@ -19,55 +21,163 @@ from gllm_pipeline.pipeline import Pipeline
 from gllm_pipeline.steps import step
 from gllm_retrieval.retriever.vector_retriever import BasicVectorRetriever
 
+from bounded_cache import GLOBAL_SCOPE, BoundedCache
+from pipeline_registry import PipelineRegistry
+from semantic_cache import SemanticResponseCache
+from tracing import Tracer
+
 load_dotenv()
 
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+CACHE_POLICY = os.getenv("CACHE_POLICY", "lru")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+TRACE_FILE = os.getenv("TRACE_FILE") or None
+
+# Record the latency of every request, step, and cache lookup
+tracer = Tracer(jsonl_path=TRACE_FILE)
+
+# The bounded cache of each build configuration, to inspect its counters
+caches: dict[tuple[str, str, str], BoundedCache] = {}
+
 
-def build_pipeline() -> Pipeline:
+def build_pipeline(embedding_model: str, language_model: str, persist_directory: str = "data") -> Pipeline:
     """Build a pipeline with caching enabled.
 
+    Args:
+        embedding_model (str): The name of the embedding model.
+        language_model (str): The name of the language model.
+        persist_directory (str, optional): The directory of the persistent vector data store. Defaults to "data".
+
     Returns:
         Pipeline: A pipeline with caching enabled.
+
+    Raises:
+        ValueError: If a model name is missing.
     """
-    em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
+    if not embedding_model or not language_model:
+        raise ValueError("Set EMBEDDING_MODEL and LANGUAGE_MODEL in the .env file.")
+
+    em_invoker = OpenAIEMInvoker(embedding_model)
     data_store = ChromaVectorDataStore(
         collection_name="documents",
         client_type="persistent",
-        persist_directory="data",
+        persist_directory=persist_directory,
         embedding=em_invoker,
     )
-    cache_store = data_store.as_cache()
+    # One index journal per build configuration, so pipelines sharing the persist directory keep separate journals
+    config_key = hashlib.sha1(f"{embedding_model}\0{language_model}".encode("utf-8")).hexdigest()[:16]
+    cache_store = BoundedCache(
+        data_store.as_cache(),
+        max_entries=CACHE_MAX_ENTRIES,
+        max_bytes=CACHE_MAX_BYTES,
+        ttl=CACHE_TTL_SECONDS,
+        policy=CACHE_POLICY,
+        index_path=os.path.join(persist_directory, f"cache_index_{config_key}.jsonl"),  # Track entries across restarts
+    )
+    cache_store.start_compaction()  # Remove expired entries in the background
+    caches[(embedding_model, language_model, persist_directory)] = cache_store
 
     e2e_pipeline_with_cache = Pipeline(
         [
             step(
-                component=BasicVectorRetriever(data_store),
+                component=tracer.wrap(BasicVectorRetriever(data_store), "retrieve"),
                 input_map={"query": "user_query", "top_k": "top_k"},
                 output_state="chunks",
-                cache_store=cache_store,  # Enable step-level caching
+                cache_store=tracer.wrap_cache(cache_store.scope("retrieve"), "retrieve"),  # Enable step-level caching
             ),
             step(
-                component=ResponseSynthesizer.stuff_preset(os.getenv("LANGUAGE_MODEL")),
+                component=tracer.wrap(ResponseSynthesizer.stuff_preset(language_model), "synthesize"),
                 input_map={"query": "user_query", "chunks": "chunks"},
                 output_state="response",
             ),
         ],
-        cache_store=cache_store,  # Enable pipeline-level caching
+        cache_store=tracer.wrap_cache(cache_store, "pipeline"),  # Enable pipeline-level caching
     )
     return e2e_pipeline_with_cache
 
 
+# Build each pipeline once per configuration and share it across requests
+registry = PipelineRegistry(build_pipeline)
+
+
+def build_query_em_invoker(embedding_model: str, **kwargs: Any) -> OpenAIEMInvoker:
+    """Build the EM invoker embedding the queries of a build configuration for the semantic cache.
+
+    Args:
+        embedding_model (str): The name of the embedding model.
+        **kwargs (Any): The other build arguments, ignored.
+
+    Returns:
+        OpenAIEMInvoker: The EM invoker of the embedding model.
+    """
+    return OpenAIEMInvoker(embedding_model)
+
+
+# Serve paraphrases of answered queries, separately for each build configuration and top_k
+semantic_cache = SemanticResponseCache(
+    build_query_em_invoker,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    partition_keys=("top_k",),
+)
+
+
+def pipeline_cache_hits() -> int:
+    """Count the pipeline-level cache hits of every build configuration.
+
+    Returns:
+        int: The number of hits.
+    """
+    return sum(cache.counters[GLOBAL_SCOPE].hits for cache in caches.values() if GLOBAL_SCOPE in cache.counters)
+
+
 async def main():
     """Main function to run the pipeline."""
+    build_config = {
+        "embedding_model": os.getenv("EMBEDDING_MODEL"),
+        "language_model": os.getenv("LANGUAGE_MODEL"),
+    }
+
+    # Each query, and whether it goes through the semantic cache first
+    requests = [
+        ("Give me nocturnal creatures from the dataset", True),  # runs the pipeline
+        ("Give me nocturnal creatures from the dataset", False),  # skips the semantic cache, hits the pipeline cache
+        ("Give me nocturnal creatures from the dataset", True),  # hits the semantic cache
+        ("Which creatures in the dataset are active at night?", True),  # a paraphrase
+    ]
+    try:
+        for query, use_semantic_cache in requests:
+            state = {"user_query": query}
+            config = {"top_k": 5}
+            if use_semantic_cache:
+                invoke = partial(semantic_cache.invoke, registry.invoke, **build_config)
+            else:
+                invoke = partial(registry.invoke, **build_config)
+            semantic_hits, pipeline_hits = semantic_cache.hits, pipeline_cache_hits()
+            result = await tracer.invoke(invoke, state, config)
+            if semantic_cache.hits > semantic_hits:
+                tier = "semantic cache"
+            elif pipeline_cache_hits() > pipeline_hits:
+                tier = "pipeline cache"
+            else:
+                tier = "pipeline run"
+            print(f"Pipeline result: {result['response']}")
+            print(f"Answered by: {tier}")
+            print(f"Registry: {registry.stats}")
+
+        print(f"Semantic cache: {semantic_cache.hits} hits, {semantic_cache.misses} misses")
+
+        for cache in caches.values():
+            for scope, counters in cache.counters.items():
+                print(f"Cache [{scope}]: {counters}")
 
-    for _ in range(2):
-        start_time = time()
-        state = {"user_query": "Give me nocturnal creatures from the dataset"}
-        config = {"top_k": 5}
-        pipeline = build_pipeline()
-        result = await pipeline.invoke(state, config)
-        print(f"Pipeline result: {result['response']}")
-        end_time = time()
-        print(f"Time taken: {end_time - start_time} seconds")
+        for name, stats in tracer.stats.items():
+            print(f"Trace [{name}]: {stats}")
+    finally:
+        for cache in caches.values():
+            await cache.stop_compaction()  # Stop the background compaction before the event loop closes
+        tracer.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+"""Registry that builds each pipeline once per build configuration and shares it across requests.
+
+Building a pipeline creates its EM invoker, opens its persistent vector data store, and instantiates its response
+synthesizer. `PipelineRegistry` fingerprints the configuration passed to the builder, builds the pipeline the first
+time a fingerprint is requested, and returns the same instance afterwards. Concurrent requests for a fingerprint that
+is still being built wait for that single build instead of starting their own.
+
+A `Pipeline` keeps no per-request data on the instance, so one instance can serve concurrent `invoke` calls.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/caching
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from gllm_pipeline.pipeline import Pipeline
+
+
+def fingerprint(build_config: dict[str, Any]) -> str:
+    """Compute a stable fingerprint of a build configuration.
+
+    Args:
+        build_config (dict[str, Any]): The keyword arguments passed to the pipeline builder.
+
+    Returns:
+        str: The SHA-256 hex digest of the configuration serialized with sorted keys.
+    """
+    serialized = json.dumps(build_config, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RegistryStats:
+    """Timing statistics of a pipeline registry.
+
+    Attributes:
+        builds (int): The number of pipelines built.
+        construction_seconds (float): The total time spent building pipelines.
+        executions (int): The number of pipeline invocations.
+        execution_seconds (float): The total time spent invoking pipelines.
+    """
+
+    builds: int = 0
+    construction_seconds: float = 0.0
+    executions: int = 0
+    execution_seconds: float = 0.0
+
+    def __str__(self) -> str:
+        """Summarize the statistics."""
+        average = self.execution_seconds / self.executions if self.executions else 0.0
+        return (
+            f"{self.builds} build(s) in {self.construction_seconds:.3f}s, "
+            f"{self.executions} execution(s) in {self.execution_seconds:.3f}s ({average:.3f}s on average)"
+        )
+
+
+class PipelineRegistry:
+    """Builds pipelines once per configuration fingerprint and shares them.
+
+    Attributes:
+        builder (Callable[..., Pipeline]): The function building a pipeline from keyword arguments.
+        stats (RegistryStats): The construction and execution timing statistics.
+    """
+
+    def __init__(self, builder: Callable[..., Pipeline]):
+        """Initialize the registry.
+
+        Args:
+            builder (Callable[..., Pipeline]): The function building a pipeline from keyword arguments. It should
+                raise if the configuration is invalid, so that invalid pipelines are never registered.
+        """
+        self.builder = builder
+        self.stats = RegistryStats()
+        self._pipelines: dict[str, Pipeline] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get(self, **build_config: Any) -> Pipeline:
+        """Get the pipeline of a build configuration, building it on the first request.
+
+        Args:
+            **build_config (Any): The keyword arguments passed to the builder. They must be JSON serializable or
+                have a stable string representation.
+
+        Returns:
+            Pipeline: The shared pipeline.
+
+        Raises:
+            TypeError: If the builder does not return a `Pipeline`.
+        """
+        key = fingerprint(build_config)
+        if key in self._pipelines:
+            return self._pipelines[key]
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if key not in self._pipelines:
+                start = time.perf_counter()
+                pipeline = self.builder(**build_config)
+                if not isinstance(pipeline, Pipeline):
+                    raise TypeError(f"The builder returned {type(pipeline).__name__}, expected Pipeline.")
+                self.stats.construction_seconds += time.perf_counter() - start
+                self.stats.builds += 1
+                self._pipelines[key] = pipeline
+        return self._pipelines[key]
+
+    async def invoke(
+        self,
+        state: dict[str, Any],
+        config: dict[str, Any] | None = None,
+        **build_config: Any,
+    ) -> dict[str, Any]:
+        """Invoke the pipeline of a build configuration.
+
+        Args:
+            state (dict[str, Any]): The initial state of the pipeline.
+            config (dict[str, Any] | None, optional): The runtime configuration of the invocation. Defaults to None.
+            **build_config (Any): The keyword arguments passed to the builder.
+
+        Returns:
+            dict[str, Any]: The final state of the pipeline.
+        """
+        pipeline = await self.get(**build_config)
+        start = time.perf_counter()
+        try:
+            return await pipeline.invoke(state, config)
+        finally:
+            self.stats.execution_seconds += time.perf_counter() - start
+            self.stats.executions += 1
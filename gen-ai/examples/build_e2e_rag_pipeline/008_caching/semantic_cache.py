@@ -0,0 +1,155 @@
+"""Semantic response cache that also serves paraphrases of previously answered queries.
+
+The pipeline-level cache only hits when a request repeats exactly. `SemanticResponseCache` embeds the user query and
+compares it with the embeddings of the queries answered so far. If the most similar one reaches the similarity
+threshold, its response is returned without running retrieval and synthesis.
+
+Responses also depend on how the pipeline is built and run, so entries are partitioned by the build configuration,
+e.g. the embedding and language models, and by the runtime config values of `partition_keys`, e.g. `top_k`: a query
+is only compared with queries answered under the same values. Queries are embedded with an EM invoker built for the
+build configuration, e.g. with its embedding model, so a partition never mixes embeddings of different models.
+
+The embeddings of a partition live in one preallocated matrix that grows by `EMBEDDING_BLOCK_SIZE` rows at a time.
+Once a partition is full, each new entry overwrites the oldest one in place.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/caching
+"""
+
+import json
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+from gllm_inference.em_invoker import OpenAIEMInvoker
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.9
+DEFAULT_MAX_ENTRIES = 1_000
+EMBEDDING_BLOCK_SIZE = 256
+
+
+@dataclass
+class _Partition:
+    queries: list[str] = field(default_factory=list)
+    responses: list[Any] = field(default_factory=list)
+    embeddings: np.ndarray | None = None
+    size: int = 0
+    oldest: int = 0
+
+
+class SemanticResponseCache:
+    """A response cache keyed by query embedding similarity.
+
+    Attributes:
+        build_em_invoker (Callable[..., OpenAIEMInvoker]): The function building the EM invoker that embeds the
+            queries of a build configuration, called with the build configuration.
+        threshold (float): The minimum cosine similarity for a cached response to be served.
+        partition_keys (tuple[str, ...]): The config keys whose values partition the cache.
+        query_key (str): The state key holding the user query.
+        response_key (str): The state key holding the response.
+        max_entries (int): The maximum number of entries per partition. The oldest entries are dropped first.
+        hits (int): The number of requests served from the cache.
+        misses (int): The number of requests that ran the pipeline.
+    """
+
+    def __init__(
+        self,
+        build_em_invoker: Callable[..., OpenAIEMInvoker],
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        partition_keys: tuple[str, ...] = ("top_k",),
+        query_key: str = "user_query",
+        response_key: str = "response",
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """Initialize the cache.
+
+        Args:
+            build_em_invoker (Callable[..., OpenAIEMInvoker]): The function building the EM invoker that embeds the
+                queries of a build configuration, called with the build configuration as keyword arguments. It is
+                called once per build configuration.
+            threshold (float, optional): The minimum cosine similarity for a cached response to be served.
+                Defaults to 0.9.
+            partition_keys (tuple[str, ...], optional): The config keys whose values partition the cache.
+                Defaults to ("top_k",).
+            query_key (str, optional): The state key holding the user query. Defaults to "user_query".
+            response_key (str, optional): The state key holding the response. Defaults to "response".
+            max_entries (int, optional): The maximum number of entries per partition. Defaults to 1,000.
+        """
+        self.build_em_invoker = build_em_invoker
+        self.threshold = threshold
+        self.partition_keys = partition_keys
+        self.query_key = query_key
+        self.response_key = response_key
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._partitions: dict[str, _Partition] = {}
+        self._em_invokers: dict[str, OpenAIEMInvoker] = {}
+
+    async def invoke(
+        self,
+        invoke: Callable[..., Awaitable[dict[str, Any]]],
+        state: dict[str, Any],
+        config: dict[str, Any] | None = None,
+        **build_config: Any,
+    ) -> dict[str, Any]:
+        """Serve a request from the cache, or run the pipeline and cache its response.
+
+        Args:
+            invoke (Callable[..., Awaitable[dict[str, Any]]]): The function running the pipeline, called with the
+                state, the config, and the build configuration, e.g. `PipelineRegistry.invoke`.
+            state (dict[str, Any]): The initial state of the pipeline.
+            config (dict[str, Any] | None, optional): The runtime configuration of the invocation. Defaults to None.
+            **build_config (Any): The build configuration of the pipeline, passed to `invoke`. Its values partition
+                the cache.
+
+        Returns:
+            dict[str, Any]: The final state of the pipeline, or the initial state with the cached response.
+        """
+        query = state[self.query_key]
+        partition = self._partitions.setdefault(self._partition_key(config or {}, build_config), _Partition())
+        embedding = np.asarray(await self._em_invoker(build_config).invoke(query), dtype=np.float32)
+        embedding /= np.linalg.norm(embedding) or 1.0
+
+        if partition.size:
+            similarities = partition.embeddings[: partition.size] @ embedding
+            best = int(similarities.argmax())
+            if similarities[best] >= self.threshold:
+                self.hits += 1
+                return {**state, self.response_key: partition.responses[best]}
+
+        self.misses += 1
+        result = await invoke(state, config, **build_config)
+        self._add(partition, query, embedding, result[self.response_key])
+        return result
+
+    def _em_invoker(self, build_config: dict[str, Any]) -> OpenAIEMInvoker:
+        key = json.dumps(build_config, sort_keys=True, default=str)
+        if key not in self._em_invokers:
+            self._em_invokers[key] = self.build_em_invoker(**build_config)
+        return self._em_invokers[key]
+
+    def _partition_key(self, config: dict[str, Any], build_config: dict[str, Any]) -> str:
+        values = {"build": build_config, "config": {key: config.get(key) for key in self.partition_keys}}
+        return json.dumps(values, sort_keys=True, default=str)
+
+    def _add(self, partition: _Partition, query: str, embedding: np.ndarray, response: Any) -> None:
+        if partition.size < self.max_entries:
+            if partition.embeddings is None or partition.size == len(partition.embeddings):
+                rows = min(self.max_entries, partition.size + EMBEDDING_BLOCK_SIZE)
+                embeddings = np.empty((rows, embedding.shape[0]), dtype=np.float32)
+                if partition.embeddings is not None:
+                    embeddings[: partition.size] = partition.embeddings
+                partition.embeddings = embeddings
+            slot = partition.size
+            partition.queries.append(query)
+            partition.responses.append(response)
+            partition.size += 1
+        else:
+            # Full: overwrite the oldest entry in place
+            slot = partition.oldest
+            partition.queries[slot] = query
+            partition.responses[slot] = response
+            partition.oldest = (slot + 1) % self.max_entries
+        partition.embeddings[slot] = embedding
@@ -0,0 +1,363 @@
+"""Lightweight tracing of pipeline requests, steps, and cache lookups.
+
+`Tracer` records a span for every traced unit of work: the whole request, each wrapped step component, and each
+lookup in a wrapped cache store. Every span records its wall time and its queue wait, i.e. the time between the end
+of the previous span of the same request, or the start of the request, and its own start. Cache lookup spans record
+whether they hit, and component spans record the token usage of results that report it.
+
+Spans are aggregated per name in `Tracer.stats`, kept in a bounded buffer of recent spans, and optionally exported:
+    - as JSON lines, one OpenTelemetry (OTLP JSON) span per line, to `jsonl_path`.
+    - as events through an `EventEmitter`.
+
+Recording a span takes microseconds, negligible next to embedding, search, and LM calls, so tracing can stay on in
+production. The current span is tracked with a context variable, so spans of concurrent requests are never mixed up.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/caching
+"""
+
+import json
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from gllm_core.constants import EventLevel
+from gllm_core.event import EventEmitter
+from gllm_core.schema import Component
+
+DEFAULT_MAX_SPANS = 10_000
+
+
+@dataclass
+class Span:
+    """A traced unit of work.
+
+    Attributes:
+        name (str): The span name, e.g. the step name.
+        trace_id (str): The ID shared by the spans of a request.
+        span_id (str): The ID of the span.
+        parent_id (str | None): The ID of the enclosing span, or None for the request span.
+        start_ns (int): The start time in nanoseconds since the epoch.
+        end_ns (int): The end time in nanoseconds since the epoch, or 0 while the span is open.
+        queue_wait_ns (int): The time between the end of the previous span of the request and the start of this one.
+        attributes (dict[str, Any]): Additional data, e.g. `cache.hit` or `llm.output_tokens`.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    queue_wait_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_seconds(self) -> float:
+        """The wall time of the span."""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Convert the span to the OpenTelemetry (OTLP JSON) span format.
+
+        Returns:
+            dict[str, Any]: The span, with the queue wait as the `queue.wait_ns` attribute.
+        """
+        attributes = {**self.attributes, "queue.wait_ns": self.queue_wait_ns}
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+        }
+
+
+@dataclass
+class SpanStats:
+    """Aggregated statistics of the spans sharing a name.
+
+    Attributes:
+        count (int): The number of spans.
+        total_seconds (float): The total wall time.
+        queue_wait_seconds (float): The total queue wait.
+        errors (int): The number of spans that raised.
+        cache_hits (int): The number of cache lookups that hit.
+        cache_misses (int): The number of cache lookups that missed.
+        input_tokens (int): The total input tokens reported by the results.
+        output_tokens (int): The total output tokens reported by the results.
+    """
+
+    count: int = 0
+    total_seconds: float = 0.0
+    queue_wait_seconds: float = 0.0
+    errors: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def __str__(self) -> str:
+        """Summarize the statistics."""
+        average = self.total_seconds / self.count if self.count else 0.0
+        summary = f"{self.count} span(s), {average * 1000:.1f}ms avg, {self.queue_wait_seconds * 1000:.1f}ms queued"
+        if self.errors:
+            summary += f", {self.errors} error(s)"
+        if self.cache_hits or self.cache_misses:
+            summary += f", {self.cache_hits} hits / {self.cache_misses} misses"
+        if self.input_tokens or self.output_tokens:
+            summary += f", {self.input_tokens} input / {self.output_tokens} output tokens"
+        return summary
+
+
+@dataclass
+class _Trace:
+    trace_id: str
+    ready_ns: int
+
+
+_current: ContextVar[tuple[_Trace, Span] | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Records, aggregates, and exports spans.
+
+    Attributes:
+        jsonl_path (str | None): The file spans are appended to as JSON lines, or None to not write them.
+        event_emitter (EventEmitter | None): The emitter spans are sent through, or None to not emit them.
+        spans (deque[Span]): The most recent spans.
+        stats (dict[str, SpanStats]): The aggregated statistics of each span name.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: str | None = None,
+        event_emitter: EventEmitter | None = None,
+        max_spans: int = DEFAULT_MAX_SPANS,
+    ):
+        """Initialize the tracer.
+
+        Args:
+            jsonl_path (str | None, optional): The file spans are appended to as JSON lines. Defaults to None.
+            event_emitter (EventEmitter | None, optional): The emitter spans are sent through. Defaults to None.
+            max_spans (int, optional): The number of recent spans kept in memory. Defaults to 10,000.
+        """
+        self.jsonl_path = jsonl_path
+        self.event_emitter = event_emitter
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self.stats: dict[str, SpanStats] = {}
+        self._file = None
+
+    @asynccontextmanager
+    async def span(self, name: str, **attributes: Any) -> AsyncIterator[Span]:
+        """Trace the enclosed work as a span, nested in the current span if any.
+
+        Args:
+            name (str): The span name.
+            **attributes (Any): The initial span attributes.
+
+        Yields:
+            Span: The open span, whose attributes can still be updated.
+        """
+        current = _current.get()
+        start_ns = time.time_ns()
+        if current is None:
+            trace, parent_id = _Trace(f"{random.getrandbits(128):032x}", start_ns), None
+        else:
+            trace, parent_id = current[0], current[1].span_id
+
+        span = Span(
+            name=name,
+            trace_id=trace.trace_id,
+            span_id=f"{random.getrandbits(64):016x}",
+            parent_id=parent_id,
+            start_ns=start_ns,
+            queue_wait_ns=start_ns - trace.ready_ns,
+            attributes=attributes,
+        )
+        token = _current.set((trace, span))
+        try:
+            yield span
+        except BaseException as error:
+            span.attributes["error"] = type(error).__name__
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+            trace.ready_ns = max(trace.ready_ns, span.end_ns)
+            await self._record(span)
+
+    async def invoke(
+        self,
+        invoke: Callable[[dict[str, Any], dict[str, Any] | None], Awaitable[dict[str, Any]]],
+        state: dict[str, Any],
+        config: dict[str, Any] | None = None,
+        name: str = "request",
+    ) -> dict[str, Any]:
+        """Run a request in a new span, which the spans recorded meanwhile are nested in.
+
+        Args:
+            invoke (Callable[[dict[str, Any], dict[str, Any] | None], Awaitable[dict[str, Any]]]): The function
+                running the request, e.g. `pipeline.invoke`.
+            state (dict[str, Any]): The initial state.
+            config (dict[str, Any] | None, optional): The runtime configuration. Defaults to None.
+            name (str, optional): The span name. Defaults to "request".
+
+        Returns:
+            dict[str, Any]: The final state.
+        """
+        async with self.span(name):
+            return await invoke(state, config)
+
+    def wrap(self, component: Component, name: str | None = None) -> "TracedComponent":
+        """Trace every run of a component.
+
+        Args:
+            component (Component): The component, e.g. of a pipeline step.
+            name (str | None, optional): The span name. Defaults to None, in which case the class name is used.
+
+        Returns:
+            TracedComponent: The traced component, to use in place of the original one.
+        """
+        return TracedComponent(self, component, name or type(component).__name__)
+
+    def wrap_cache(self, cache_store: Any, name: str) -> "TracedCache":
+        """Trace every lookup in a cache store.
+
+        Args:
+            cache_store (Any): The cache store, e.g. a `BoundedCache` or one of its scopes.
+            name (str): The name of the cache, used in the span name `cache.<name>`.
+
+        Returns:
+            TracedCache: The traced cache store, to use in place of the original one.
+        """
+        return TracedCache(self, cache_store, name)
+
+    def close(self) -> None:
+        """Flush and close the JSON lines file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def _record(self, span: Span) -> None:
+        self.spans.append(span)
+        stats = self.stats.setdefault(span.name, SpanStats())
+        stats.count += 1
+        stats.total_seconds += span.duration_seconds
+        stats.queue_wait_seconds += span.queue_wait_ns / 1e9
+        stats.errors += "error" in span.attributes
+        if "cache.hit" in span.attributes:
+            stats.cache_hits += span.attributes["cache.hit"]
+            stats.cache_misses += not span.attributes["cache.hit"]
+        stats.input_tokens += span.attributes.get("llm.input_tokens", 0)
+        stats.output_tokens += span.attributes.get("llm.output_tokens", 0)
+
+        if self.jsonl_path is None and self.event_emitter is None:
+            return
+        line = json.dumps(span.to_otlp(), default=str)
+        if self.jsonl_path is not None:
+            if self._file is None:
+                self._file = open(self.jsonl_path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+        if self.event_emitter is not None:
+            await self.event_emitter.emit(line, event_level=EventLevel.INFO)
+
+
+class TracedComponent(Component):
+    """A component wrapper recording a span for every run.
+
+    Attributes:
+        tracer (Tracer): The tracer recording the spans.
+        component (Component): The wrapped component.
+        name (str): The span name.
+    """
+
+    def __init__(self, tracer: Tracer, component: Component, name: str):
+        """Initialize the wrapper.
+
+        Args:
+            tracer (Tracer): The tracer recording the spans.
+            component (Component): The component to wrap.
+            name (str): The span name.
+        """
+        super().__init__()
+        self.tracer = tracer
+        self.component = component
+        self.name = name
+
+    async def _run(self, **kwargs: Any) -> Any:
+        """Run the wrapped component in a span.
+
+        Args:
+            **kwargs (Any): The arguments of the component.
+
+        Returns:
+            Any: The component result.
+        """
+        async with self.tracer.span(self.name) as span:
+            result = await self.component.run(**kwargs)
+            if isinstance(result, list):
+                span.attributes["output.items"] = len(result)
+            span.attributes.update(_token_usage(result))
+            return result
+
+
+class TracedCache:
+    """A cache store wrapper recording a span for every lookup.
+
+    Attributes:
+        tracer (Tracer): The tracer recording the spans.
+        cache_store (Any): The wrapped cache store.
+        name (str): The cache name.
+    """
+
+    def __init__(self, tracer: Tracer, cache_store: Any, name: str):
+        """Initialize the wrapper.
+
+        Args:
+            tracer (Tracer): The tracer recording the spans.
+            cache_store (Any): The cache store to wrap.
+            name (str): The cache name.
+        """
+        self.tracer = tracer
+        self.cache_store = cache_store
+        self.name = name
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate other attributes to the wrapped cache store."""
+        return getattr(self.cache_store, name)
+
+    async def retrieve(self, key: str, *args: Any, **kwargs: Any) -> Any:
+        """Read an entry in a span recording whether it hit."""
+        async with self.tracer.span(f"cache.{self.name}") as span:
+            value = await self.cache_store.retrieve(key, *args, **kwargs)
+            span.attributes["cache.hit"] = value is not None
+            return value
+
+
+def _token_usage(result: Any) -> dict[str, int]:
+    usage = result.get("token_usage") if isinstance(result, dict) else getattr(result, "token_usage", None)
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = vars(usage) if hasattr(usage, "__dict__") else {}
+    return {
+        f"llm.{key}": int(usage[key]) for key in ("input_tokens", "output_tokens") if usage.get(key) is not None
+    }
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
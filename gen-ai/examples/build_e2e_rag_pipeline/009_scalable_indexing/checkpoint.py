@@ -0,0 +1,143 @@
+"""Checkpoint journal for resumable indexing jobs.
+
+After each batch is written to the vector store, the journal records the source offset right after the batch and the
+content hashes of its rows. A restarted job skips every row before that offset, after checking that the rows of the
+last committed batch still hash the same, so nothing that was already written is embedded or inserted again.
+
+The content hashes of every committed row are also appended to `{path}.hashes`. Incremental indexing, where rows
+before the offset may have changed since the interruption, skips a row only if its current hash was written.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import json
+import os
+from collections.abc import Iterable, Iterator
+
+from gllm_core.schema import Chunk
+
+from ingestion import content_hash
+
+
+class IndexCheckpoint:
+    """The on-disk record of the last committed batch of an indexing job.
+
+    Attributes:
+        path (str): The path of the JSON checkpoint file.
+        offset (int): The number of source rows committed so far.
+        batch_hashes (dict[int, str]): The content hash of each row of the last committed batch, by source position.
+        written_hashes (set[str]): The content hashes of every row committed so far.
+    """
+
+    def __init__(self, path: str):
+        """Initialize the checkpoint, loading it from disk if it exists.
+
+        Args:
+            path (str): The path of the JSON checkpoint file.
+        """
+        self.path = path
+        self.offset = 0
+        self.batch_hashes: dict[int, str] = {}
+        self.written_hashes: set[str] = set()
+        self._hashes_path = f"{path}.hashes"
+        self._positions: dict[int, int] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                journal = json.load(f)
+            self.offset = journal["offset"]
+            self.batch_hashes = {position: digest for position, digest in journal["batch"]}
+        if os.path.exists(self._hashes_path):
+            with open(self._hashes_path, "r", encoding="utf-8") as f:
+                self.written_hashes = {line.strip() for line in f if line.strip()}
+
+    def is_committed(self, position: int, chunk: Chunk) -> bool:
+        """Check whether a source row was already written by a previous run.
+
+        Args:
+            position (int): The position of the row in the source.
+            chunk (Chunk): The chunk built from the row.
+
+        Returns:
+            bool: True if the row was already written, False otherwise.
+
+        Raises:
+            ValueError: If a row of the last committed batch no longer matches its recorded content hash.
+        """
+        if position >= self.offset:
+            return False
+
+        expected = self.batch_hashes.get(position)
+        if expected is not None and expected != content_hash(chunk):
+            raise ValueError(
+                f"Row {position} of the source changed since the checkpoint was written. "
+                f"Delete '{self.path}' to index from the beginning."
+            )
+        return True
+
+    def is_written(self, chunk: Chunk) -> bool:
+        """Check whether a chunk with the same content and metadata was already written by a previous run.
+
+        Unlike `is_committed`, this holds wherever the row is in the source and whatever changed since the
+        interruption, so it is the check to use when earlier rows may have been edited.
+
+        Args:
+            chunk (Chunk): The chunk built from the row.
+
+        Returns:
+            bool: True if the chunk was already written, False otherwise.
+        """
+        return content_hash(chunk) in self.written_hashes
+
+    def track(self, position: int, chunk: Chunk) -> None:
+        """Remember the source position of a chunk that is about to be written.
+
+        Args:
+            position (int): The position of the row in the source.
+            chunk (Chunk): The chunk built from the row.
+        """
+        self._positions[id(chunk)] = position
+
+    def resume(self, chunks: Iterable[Chunk]) -> Iterator[Chunk]:
+        """Skip the rows committed by a previous run and track the positions of the remaining ones.
+
+        Args:
+            chunks (Iterable[Chunk]): The full set of source chunks, in source order.
+
+        Yields:
+            Chunk: The next chunk that has not been written yet.
+        """
+        for position, chunk in enumerate(chunks):
+            if self.is_committed(position, chunk):
+                continue
+            self.track(position, chunk)
+            yield chunk
+
+    def commit(self, batch: list[Chunk]) -> None:
+        """Record a batch as written and atomically persist the journal.
+
+        Args:
+            batch (list[Chunk]): The batch that was just written, whose chunks were tracked by this checkpoint.
+        """
+        positions = [self._positions.pop(id(chunk)) for chunk in batch]
+        self.offset = positions[-1] + 1
+        self.batch_hashes = {position: content_hash(chunk) for position, chunk in zip(positions, batch)}
+        self.written_hashes.update(self.batch_hashes.values())
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Appended before the offset is written, so a hash is never missing for a row before the offset
+        with open(self._hashes_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{digest}\n" for digest in self.batch_hashes.values())
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"offset": self.offset, "batch": list(self.batch_hashes.items())}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Delete the journal once the job has completed."""
+        self.offset = 0
+        self.batch_hashes = {}
+        self.written_hashes = set()
+        for path in (self.path, self._hashes_path):
+            if os.path.exists(path):
+                os.remove(path)
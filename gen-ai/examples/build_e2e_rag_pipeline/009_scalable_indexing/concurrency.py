@@ -0,0 +1,172 @@
+"""Adaptive concurrency control for bulk embedding requests.
+
+`AdaptiveConcurrencyLimiter` bounds the number of in-flight embedding requests and tunes that bound as requests
+complete: it grows additively while latency stays close to the best observed latency, shrinks gently when latency
+degrades, and halves on rate limit (HTTP 429) responses.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import asyncio
+import random
+import time
+from typing import Any
+
+DEFAULT_INITIAL_CONCURRENCY = 4
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_DELAY = 1.0
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an error is a rate limit (HTTP 429) response.
+
+    The status code is read from the error or its HTTP response. Errors without one are recognized by their type,
+    e.g. `openai.RateLimitError` or any other exception class whose name contains "RateLimit".
+
+    Args:
+        error (Exception): The error raised by the embedding request.
+
+    Returns:
+        bool: True if the error is a rate limit response, False otherwise.
+    """
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return status_code == 429
+    return any("RateLimit" in cls.__name__ for cls in type(error).__mro__)
+
+
+class AdaptiveConcurrencyLimiter:
+    """An async context manager that bounds and adapts the number of concurrent requests.
+
+    Attributes:
+        concurrency (float): The current concurrency limit. Only its integer part is enforced.
+        min_concurrency (int): The lowest allowed concurrency limit.
+        max_concurrency (int): The highest allowed concurrency limit.
+        latency_tolerance (float): How many times slower than the best observed latency a request may be before the
+            limit is reduced.
+        rate_limited (int): The number of rate limit responses observed.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: int = DEFAULT_INITIAL_CONCURRENCY,
+        min_concurrency: int = 1,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            initial_concurrency (int, optional): The starting concurrency limit. Defaults to 4.
+            min_concurrency (int, optional): The lowest allowed concurrency limit. Defaults to 1.
+            max_concurrency (int, optional): The highest allowed concurrency limit. Defaults to 32.
+            latency_tolerance (float, optional): How many times slower than the best observed latency a request may
+                be before the limit is reduced. Defaults to 2.0.
+            smoothing (float, optional): The weight of the newest sample in the latency moving average.
+                Defaults to 0.2.
+        """
+        self.concurrency = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.rate_limited = 0
+        self._busy_seconds = 0.0
+        self._in_flight = 0
+        self._busy_since = 0.0
+        self._latency: float | None = None
+        self._best_latency: float | None = None
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The number of requests currently allowed in flight."""
+        return max(self.min_concurrency, int(self.concurrency))
+
+    @property
+    def busy_seconds(self) -> float:
+        """The wall time during which at least one request was in flight, including the current busy period."""
+        if self._in_flight:
+            return self._busy_seconds + time.perf_counter() - self._busy_since
+        return self._busy_seconds
+
+    async def __aenter__(self) -> "AdaptiveConcurrencyLimiter":
+        """Wait for a free slot and occupy it."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            if self._in_flight == 0:
+                self._busy_since = time.perf_counter()
+            self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Release the occupied slot."""
+        async with self._condition:
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self._busy_seconds += time.perf_counter() - self._busy_since
+            self._condition.notify_all()
+
+    def record_success(self, latency: float) -> None:
+        """Adapt the limit after a successful request.
+
+        Args:
+            latency (float): The latency of the request, in seconds.
+        """
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency = self.smoothing * latency + (1 - self.smoothing) * self._latency
+        self._best_latency = min(self._best_latency or self._latency, self._latency)
+
+        if self._latency > self._best_latency * self.latency_tolerance:
+            self.concurrency = max(self.min_concurrency, self.concurrency * 0.9)
+        else:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def record_rate_limit(self) -> None:
+        """Halve the limit after a rate limit response."""
+        self.rate_limited += 1
+        self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+
+
+async def call_with_retry(
+    limiter: AdaptiveConcurrencyLimiter,
+    func: Any,
+    *args: Any,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    retry_delay: float = DEFAULT_RETRY_DELAY,
+) -> Any:
+    """Call an async function under the limiter, retrying with jittered exponential backoff on failure.
+
+    Args:
+        limiter (AdaptiveConcurrencyLimiter): The limiter that bounds the call and learns from its outcome.
+        func (Any): The async function to call.
+        *args (Any): The positional arguments passed to `func`.
+        max_retries (int, optional): The maximum number of retries after the first attempt. Defaults to 5.
+        retry_delay (float, optional): The base delay between retries, in seconds. Defaults to 1.0.
+
+    Returns:
+        Any: The result of `func`.
+
+    Raises:
+        Exception: The last error raised by `func` once the retries are exhausted.
+    """
+    for attempt in range(max_retries + 1):
+        async with limiter:
+            start = time.perf_counter()
+            try:
+                result = await func(*args)
+            except Exception as error:
+                if is_rate_limit_error(error):
+                    limiter.record_rate_limit()
+                if attempt == max_retries:
+                    raise
+            else:
+                limiter.record_success(time.perf_counter() - start)
+                return result
+
+        await asyncio.sleep(retry_delay * 2**attempt * random.uniform(0.5, 1.5))
@@ -0,0 +1,208 @@
+"""Persistent on-disk embedding cache in front of an EM invoker.
+
+Embeddings are keyed by the model name and the normalized text. Vectors are stored as float32 rows of a memory-mapped
+file, while a small JSON index maps each key to its row in least-recently-used order. When the cache is full, the
+least recently used entry is evicted and its row is reused. Texts that are all cached never reach the wrapped invoker.
+
+The index is only persisted every `flush_every` new entries, so after a crash it may map a key to a row that was
+reused since. Each row therefore also stores the SHA-1 digest of its key in a second memory-mapped file, cleared
+before the row is overwritten and written after it. On load, the index entries whose row holds another digest are
+dropped, so a stale index entry is a miss rather than a wrong embedding.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+from gllm_inference.em_invoker import OpenAIEMInvoker
+
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_FLUSH_EVERY = 1_024
+DIGEST_SIZE = 20
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a text so that trivially different inputs share a cache entry.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The NFKC-normalized text with collapsed and stripped whitespace.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class CachedEMInvoker:
+    """An EM invoker wrapper that serves repeated texts from a persistent on-disk cache.
+
+    The wrapper exposes the same `invoke` method as the wrapped invoker and delegates every other attribute to it,
+    so it can be passed wherever an EM invoker is expected.
+
+    Attributes:
+        em_invoker (OpenAIEMInvoker): The wrapped EM invoker.
+        model_name (str): The model name used in the cache keys.
+        max_entries (int): The maximum number of cached vectors.
+        hits (int): The number of texts served from the cache.
+        misses (int): The number of texts embedded by the wrapped invoker.
+        evictions (int): The number of entries evicted to make room for new ones.
+    """
+
+    def __init__(
+        self,
+        em_invoker: OpenAIEMInvoker,
+        cache_dir: str,
+        model_name: str | None = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+    ):
+        """Initialize the cache, loading the existing index and vectors from `cache_dir` if any.
+
+        Args:
+            em_invoker (OpenAIEMInvoker): The EM invoker to wrap.
+            cache_dir (str): The directory where the cache files are stored.
+            model_name (str | None, optional): The model name used in the cache keys. Defaults to None, in which case
+                the `model_id` of the wrapped invoker is used.
+            max_entries (int, optional): The maximum number of cached vectors. Defaults to 100,000.
+            flush_every (int, optional): Persist the index after this many new entries. Defaults to 1,024.
+        """
+        self.em_invoker = em_invoker
+        self.model_name = model_name or getattr(em_invoker, "model_id", type(em_invoker).__name__)
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        file_stem = re.sub(r"[^A-Za-z0-9_.-]", "_", self.model_name)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, f"{file_stem}.json")
+        self._vectors_path = os.path.join(cache_dir, f"{file_stem}.f32")
+        self._digests_path = os.path.join(cache_dir, f"{file_stem}.keys")
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._free_slots: list[int] = []
+        self._dim: int | None = None
+        self._vectors: np.memmap | None = None
+        self._digests: np.memmap | None = None
+        self._pending = 0
+        self._load()
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate unknown attributes to the wrapped invoker."""
+        return getattr(self.em_invoker, name)
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of texts served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def invoke(self, content: str | list[str], **kwargs: Any) -> list[float] | list[list[float]]:
+        """Embed one or more texts, calling the wrapped invoker only for the texts that are not cached.
+
+        Args:
+            content (str | list[str]): The text or texts to embed.
+            **kwargs: Extra keyword arguments passed to the wrapped invoker on a cache miss.
+
+        Returns:
+            list[float] | list[list[float]]: The embedding of `content`, or one embedding per text if a list is given.
+        """
+        texts = [content] if isinstance(content, str) else list(content)
+        keys = [self._key(text) for text in texts]
+
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in self._slots:
+                self._slots.move_to_end(key)
+                self.hits += 1
+            elif key in missing:
+                self.hits += 1
+            else:
+                missing[key] = text
+        self.misses += len(missing)
+
+        vectors = {key: self._vectors[self._slots[key]].tolist() for key in keys if key in self._slots}
+        if missing:
+            embedded = await self.em_invoker.invoke(list(missing.values()), **kwargs)
+            for key, vector in zip(missing, embedded):
+                self._put(key, vector)
+                vectors[key] = list(vector)
+
+        results = [vectors[key] for key in keys]
+        return results[0] if isinstance(content, str) else results
+
+    def flush(self) -> None:
+        """Persist the vectors and the index to disk."""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._digests.flush()
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self._dim, "entries": list(self._slots.items())}, f)
+        os.replace(tmp_path, self._index_path)
+        self._pending = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._index_path):
+            return
+
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["dim"] is None or not os.path.exists(self._vectors_path) or not os.path.exists(self._digests_path):
+            return
+
+        self._dim = index["dim"]
+        self._vectors, self._digests = self._open_vectors("r+")
+        entries = [(key, slot) for key, slot in index["entries"] if slot < self.max_entries]
+        if entries:
+            expected = np.frombuffer(b"".join(bytes.fromhex(key) for key, _ in entries), dtype=np.uint8)
+            stored = self._digests[[slot for _, slot in entries]]
+            valid = (stored == expected.reshape(len(entries), DIGEST_SIZE)).all(axis=1)
+            entries = [entry for entry, is_valid in zip(entries, valid) if is_valid]
+        self._slots = OrderedDict(entries)
+        used = set(self._slots.values())
+        self._free_slots = [slot for slot in range(self.max_entries - 1, -1, -1) if slot not in used]
+
+    def _open_vectors(self, mode: str) -> tuple[np.memmap, np.memmap]:
+        for path, row_size in ((self._vectors_path, self._dim * 4), (self._digests_path, DIGEST_SIZE)):
+            if mode == "r+" and os.path.getsize(path) < self.max_entries * row_size:
+                with open(path, "r+b") as f:
+                    f.truncate(self.max_entries * row_size)
+        vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self.max_entries, self._dim))
+        digests = np.memmap(self._digests_path, dtype=np.uint8, mode=mode, shape=(self.max_entries, DIGEST_SIZE))
+        return vectors, digests
+
+    def _put(self, key: str, vector: list[float]) -> None:
+        if self._vectors is None:
+            self._dim = len(vector)
+            self._vectors, self._digests = self._open_vectors("w+")
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+        if key in self._slots:
+            # Another miss for the same key was stored first: overwrite its row instead of leaking a slot
+            slot = self._slots[key]
+            self._slots.move_to_end(key)
+        elif self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self.evictions += 1
+
+        self._digests[slot] = 0  # Invalidate the row before overwriting it, in case the process dies in between
+        self._vectors[slot] = vector
+        self._digests[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+        self._slots[key] = slot
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
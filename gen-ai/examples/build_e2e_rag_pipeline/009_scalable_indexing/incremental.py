@@ -0,0 +1,183 @@
+"""Content-hash incremental re-indexing helpers.
+
+Each chunk is keyed by a stable hash of its content and metadata, which is also used as the chunk ID in the vector
+store. A small JSON manifest next to the persisted collection remembers which hash is currently indexed for each
+source row, so a re-index only embeds rows that are new or changed and deletes rows that disappeared from the source.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import json
+import os
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from gllm_core.schema import Chunk
+from gllm_datastore.vector_data_store import ChromaVectorDataStore
+
+from checkpoint import IndexCheckpoint
+from ingestion import CONTENT_HASH_KEY, IngestionStats, content_hash, stream_index
+
+
+class IndexManifest:
+    """The record of which content hash is indexed for each source row.
+
+    Attributes:
+        path (str): The path of the JSON manifest file.
+        entries (dict[str, str]): The mapping from row key to indexed content hash.
+    """
+
+    def __init__(self, path: str):
+        """Initialize the manifest, loading it from disk if it exists.
+
+        Args:
+            path (str): The path of the JSON manifest file.
+        """
+        self.path = path
+        self.entries: dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class IncrementalStats:
+    """Counters of an incremental indexing run.
+
+    Attributes:
+        added (int): The number of rows that were not indexed before.
+        updated (int): The number of rows whose content or metadata changed.
+        unchanged (int): The number of rows skipped because they are already indexed.
+        duplicates (int): The number of rows skipped because an identical row appeared earlier in the source.
+        deleted (int): The number of rows removed because they disappeared from the source.
+        ingestion (IngestionStats): The throughput counters of the rows that were embedded.
+    """
+
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    deleted: int = 0
+    ingestion: IngestionStats = field(default_factory=IngestionStats)
+
+    def __str__(self) -> str:
+        """Format the counters as a single summary line."""
+        return (
+            f"{self.added} added, {self.updated} updated, {self.unchanged} unchanged, {self.duplicates} duplicates, "
+            f"{self.deleted} deleted; "
+            f"{self.ingestion}"
+        )
+
+
+def row_key(value: str, occurrences: Counter[str]) -> str:
+    """Build the manifest key of a source row from its key field value and the number of earlier rows sharing it.
+
+    Args:
+        value (str): The key field value of the row.
+        occurrences (Counter[str]): The number of rows seen so far for each key field value, updated in place.
+
+    Returns:
+        str: The value itself for its first row, else the value suffixed with the row's occurrence number.
+    """
+    occurrences[value] += 1
+    return value if occurrences[value] == 1 else f"{value}#{occurrences[value]}"
+
+
+async def incremental_index(
+    vector_store: ChromaVectorDataStore,
+    chunks: Iterable[Chunk],
+    manifest: IndexManifest,
+    key_field: str = "name",
+    checkpoint: IndexCheckpoint | None = None,
+    **stream_kwargs,
+) -> IncrementalStats:
+    """Index only the new and changed chunks, then delete the stale ones.
+
+    Rows sharing a `key_field` value are told apart by their order: the second distinct row named "Glowhopper" is
+    keyed "Glowhopper#2". Rows identical in content and metadata would get the same chunk ID, so only the first one is
+    indexed and the others are counted as duplicates.
+
+    New and changed chunks are written before stale chunks are deleted, so queries never observe a missing row.
+    The manifest is saved only after both steps succeed. When a checkpoint is given, chunks written by an interrupted
+    previous run are not written again if their content is unchanged, but still count towards the manifest. Chunks
+    that run wrote for rows that have changed or disappeared since are deleted with the stale chunks.
+
+    Args:
+        vector_store (ChromaVectorDataStore): The vector store to write to.
+        chunks (Iterable[Chunk]): The full, current set of source chunks, preferably a lazy iterator.
+        manifest (IndexManifest): The manifest of the previous run.
+        key_field (str, optional): The metadata field that identifies a source row. Defaults to "name".
+        checkpoint (IndexCheckpoint | None, optional): The checkpoint used to resume an interrupted run and cleared
+            once this run completes. Defaults to None.
+        **stream_kwargs: Extra keyword arguments passed to `stream_index`.
+
+    Returns:
+        IncrementalStats: The counters of the run.
+    """
+    stats = IncrementalStats()
+    previous = manifest.entries
+    current: dict[str, str] = {}
+    occurrences: Counter[str] = Counter()
+    stale_hashes: list[str] = []
+    seen_digests: set[str] = set()
+    indexed_digests = set(previous.values())
+
+    def changed_chunks() -> Iterator[Chunk]:
+        for position, chunk in enumerate(chunks):
+            digest = content_hash(chunk)
+            if digest in seen_digests:
+                stats.duplicates += 1
+                continue
+            seen_digests.add(digest)
+            key = row_key(str(chunk.metadata[key_field]), occurrences)
+            current[key] = digest
+            old_digest = previous.get(key)
+            if old_digest == digest:
+                stats.unchanged += 1
+                continue
+
+            if old_digest is None:
+                stats.added += 1
+            else:
+                stats.updated += 1
+                stale_hashes.append(old_digest)
+            if digest in indexed_digests:
+                continue  # Already indexed for another row, e.g. one sharing its name that moved
+            if checkpoint is not None:
+                if checkpoint.is_written(chunk):
+                    continue
+                checkpoint.track(position, chunk)
+            chunk.id = digest
+            chunk.metadata[CONTENT_HASH_KEY] = digest
+            yield chunk
+
+    if checkpoint is not None:
+        stream_kwargs["on_commit"] = checkpoint.commit
+    stats.ingestion = await stream_index(vector_store, changed_chunks(), **stream_kwargs)
+
+    removed_keys = previous.keys() - current.keys()
+    stale_hashes.extend(previous[key] for key in removed_keys)
+    stats.deleted = len(removed_keys)
+    if checkpoint is not None:
+        # Written by the interrupted run for rows that have changed or disappeared since
+        stale_hashes.extend(checkpoint.written_hashes)
+    # A hash may be stale for one row but current for another, e.g. when rows sharing a name swap places
+    stale_hashes = list(set(stale_hashes) - set(current.values()))
+    if stale_hashes:
+        await vector_store.delete_chunks(where={CONTENT_HASH_KEY: {"$in": stale_hashes}})
+
+    manifest.entries = current
+    manifest.save()
+    if checkpoint is not None:
+        checkpoint.clear()
+    return stats
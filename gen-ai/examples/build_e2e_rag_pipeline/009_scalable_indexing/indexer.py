@@ -0,0 +1,80 @@
+"""Example script to index a large CSV file into a vector store in streaming batches.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from gllm_datastore.vector_data_store import ChromaVectorDataStore
+from gllm_inference.em_invoker import OpenAIEMInvoker
+
+from checkpoint import IndexCheckpoint
+from concurrency import AdaptiveConcurrencyLimiter
+from embedding_cache import CachedEMInvoker
+from incremental import IndexManifest, incremental_index
+from ingestion import iter_csv_chunks, stream_index
+
+load_dotenv()
+
+CSV_PATH = "data/imaginary_animals.csv"
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "128"))
+MAX_BATCH_TOKENS = int(os.getenv("MAX_BATCH_TOKENS", "100000"))
+INCREMENTAL = os.getenv("INCREMENTAL", "true").lower() == "true"
+MANIFEST_PATH = "data/index_manifest.json"
+CHECKPOINT_PATH = "data/index_checkpoint.json"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+MAX_EMBEDDING_CONCURRENCY = int(os.getenv("MAX_EMBEDDING_CONCURRENCY", "32"))
+
+# Serve repeated texts from a persistent on-disk cache instead of re-embedding them
+em_invoker = CachedEMInvoker(
+    OpenAIEMInvoker(model_name=os.getenv("EMBEDDING_MODEL")),
+    cache_dir=EMBEDDING_CACHE_DIR,
+    model_name=os.getenv("EMBEDDING_MODEL"),
+)
+
+# Initialize vector store with persistent storage
+vector_store = ChromaVectorDataStore(
+    collection_name="documents",
+    client_type="persistent",  # use a Persistent Chroma DB
+    persist_directory="data",  # 👈 where the data is located
+    embedding=em_invoker,
+)
+
+
+# Stream documents from CSV file, embedding and writing them batch by batch
+async def load_csv_data():
+    chunks = iter_csv_chunks(CSV_PATH)
+    # Embed batches concurrently, adapting the concurrency to latency and rate limits, while writing them in order
+    limiter = AdaptiveConcurrencyLimiter(max_concurrency=MAX_EMBEDDING_CONCURRENCY)
+    stream_kwargs = {
+        "max_batch_size": MAX_BATCH_SIZE,
+        "max_batch_tokens": MAX_BATCH_TOKENS,
+        "em_invoker": em_invoker,
+        "limiter": limiter,
+    }
+    # Resume after the last committed batch if a previous run was interrupted
+    checkpoint = IndexCheckpoint(CHECKPOINT_PATH)
+    if checkpoint.offset:
+        print(f"Resuming after row {checkpoint.offset} from '{CHECKPOINT_PATH}'")
+
+    if INCREMENTAL:
+        # Only embed new or changed rows, and delete rows that disappeared from the CSV file
+        stats = await incremental_index(
+            vector_store, chunks, IndexManifest(MANIFEST_PATH), checkpoint=checkpoint, **stream_kwargs
+        )
+    else:
+        stats = await stream_index(
+            vector_store, checkpoint.resume(chunks), on_commit=checkpoint.commit, **stream_kwargs
+        )
+        checkpoint.clear()
+    em_invoker.flush()
+    print(f"Successfully indexed {stats}")
+    print(f"Embedding concurrency: {limiter.limit} (rate limited {limiter.rate_limited} times)")
+    print(f"Embedding cache: {em_invoker.hits} hits, {em_invoker.misses} misses, {em_invoker.evictions} evictions")
+
+
+if __name__ == "__main__":
+    asyncio.run(load_csv_data())
@@ -0,0 +1,254 @@
+"""Streaming, batched ingestion helpers for indexing large CSV files.
+
+Rows are read lazily from the CSV file and grouped into batches bounded both by the number of chunks and by an
+estimated token budget. Each batch is embedded and written as soon as it fills, so peak memory stays proportional
+to a single batch instead of the whole file.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import asyncio
+import csv
+import hashlib
+import json
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+
+from gllm_core.schema import Chunk
+from gllm_datastore.vector_data_store import ChromaVectorDataStore
+
+from concurrency import AdaptiveConcurrencyLimiter, call_with_retry
+from embedding_cache import CachedEMInvoker
+
+DEFAULT_MAX_BATCH_SIZE = 128
+DEFAULT_MAX_BATCH_TOKENS = 100_000
+CHARS_PER_TOKEN = 4
+CONTENT_HASH_KEY = "content_hash"
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in a text.
+
+    Args:
+        text (str): The text to estimate.
+
+    Returns:
+        int: The estimated number of tokens, assuming ~4 characters per token.
+    """
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def content_hash(chunk: Chunk) -> str:
+    """Compute a stable hash of a chunk content and metadata.
+
+    Args:
+        chunk (Chunk): The chunk to hash.
+
+    Returns:
+        str: The hex SHA-256 digest of the chunk content and metadata.
+    """
+    metadata = {key: value for key, value in chunk.metadata.items() if key != CONTENT_HASH_KEY}
+    payload = json.dumps({"content": chunk.content, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def iter_csv_chunks(
+    path: str,
+    content_column: str = "description",
+    metadata_columns: tuple[str, ...] = ("name",),
+) -> Iterator[Chunk]:
+    """Lazily read a CSV file and yield one chunk per row.
+
+    Args:
+        path (str): The path to the CSV file.
+        content_column (str, optional): The column used as the chunk content. Defaults to "description".
+        metadata_columns (tuple[str, ...], optional): The columns copied into the chunk metadata.
+            Defaults to ("name",).
+
+    Yields:
+        Chunk: The chunk built from the current row.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield Chunk(content=row[content_column], metadata={column: row[column] for column in metadata_columns})
+
+
+def iter_batches(
+    chunks: Iterable[Chunk],
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    token_counter: Callable[[str], int] = estimate_tokens,
+) -> Iterator[list[Chunk]]:
+    """Group chunks into batches bounded by size and by token budget.
+
+    A chunk that exceeds the token budget on its own is emitted as a single-element batch.
+
+    Args:
+        chunks (Iterable[Chunk]): The chunks to group.
+        max_batch_size (int, optional): The maximum number of chunks per batch. Defaults to 128.
+        max_batch_tokens (int, optional): The maximum estimated tokens per batch. Defaults to 100,000.
+        token_counter (Callable[[str], int], optional): The function used to count tokens of a chunk content.
+            Defaults to `estimate_tokens`.
+
+    Yields:
+        list[Chunk]: The next full batch.
+    """
+    batch: list[Chunk] = []
+    batch_tokens = 0
+    for chunk in chunks:
+        tokens = token_counter(chunk.content)
+        if batch and (len(batch) >= max_batch_size or batch_tokens + tokens > max_batch_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(chunk)
+        batch_tokens += tokens
+
+    if batch:
+        yield batch
+
+
+@dataclass
+class IngestionStats:
+    """Throughput counters of a streaming ingestion run.
+
+    Attributes:
+        rows (int): The number of rows read from the source.
+        embeddings (int): The number of chunks embedded and written to the vector store.
+        batches (int): The number of batches written to the vector store.
+        embed_seconds (float): The time spent inside the vector store calls (embedding and writing), or the wall time
+            during which at least one embedding request was in flight when embedding concurrently.
+        started_at (float): The `time.perf_counter` value when the run started.
+    """
+
+    rows: int = 0
+    embeddings: int = 0
+    batches: int = 0
+    embed_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        """The wall time since the run started, in seconds."""
+        return time.perf_counter() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        """The number of rows processed per wall-clock second."""
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def embeddings_per_second(self) -> float:
+        """The number of chunks embedded per second spent embedding."""
+        return self.embeddings / self.embed_seconds if self.embed_seconds else 0.0
+
+    def __str__(self) -> str:
+        """Format the counters as a single progress line."""
+        return (
+            f"{self.rows} rows, {self.embeddings} embeddings in {self.batches} batches "
+            f"({self.rows_per_second:.1f} rows/s, {self.embeddings_per_second:.1f} embeddings/s)"
+        )
+
+
+async def stream_index(
+    vector_store: ChromaVectorDataStore,
+    chunks: Iterable[Chunk],
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    token_counter: Callable[[str], int] = estimate_tokens,
+    log_every: int = 10,
+    em_invoker: CachedEMInvoker | None = None,
+    limiter: AdaptiveConcurrencyLimiter | None = None,
+    on_commit: Callable[[list[Chunk]], None] | None = None,
+) -> IngestionStats:
+    """Embed and write chunks batch by batch as they are read.
+
+    When `em_invoker` is given, batches are embedded concurrently through it under an adaptive concurrency limit,
+    while writes still happen one batch at a time in source order. `em_invoker` must be the cached invoker used by
+    `vector_store`, so that each write finds its embeddings in the cache. A failed batch is retried on its own,
+    without re-sending the batches that already succeeded.
+
+    Args:
+        vector_store (ChromaVectorDataStore): The vector store to write to.
+        chunks (Iterable[Chunk]): The chunks to index, preferably a lazy iterator.
+        max_batch_size (int, optional): The maximum number of chunks per batch. Defaults to 128.
+        max_batch_tokens (int, optional): The maximum estimated tokens per batch. Defaults to 100,000.
+        token_counter (Callable[[str], int], optional): The function used to count tokens of a chunk content.
+            Defaults to `estimate_tokens`.
+        log_every (int, optional): Print the throughput every `log_every` batches. Set to 0 to disable.
+            Defaults to 10.
+        em_invoker (CachedEMInvoker | None, optional): The cached invoker used to embed batches concurrently.
+            Defaults to None, in which case batches are embedded sequentially by the vector store.
+        limiter (AdaptiveConcurrencyLimiter | None, optional): The limiter of the concurrent embedding requests.
+            Defaults to None, in which case a limiter with the default settings is used.
+        on_commit (Callable[[list[Chunk]], None] | None, optional): A callback invoked with each batch once it is
+            written, e.g. `IndexCheckpoint.commit`. Defaults to None.
+
+    Returns:
+        IngestionStats: The throughput counters of the run.
+    """
+    stats = IngestionStats()
+    batches = iter_batches(chunks, max_batch_size, max_batch_tokens, token_counter)
+    if em_invoker is None:
+        for batch in batches:
+            stats.rows += len(batch)
+            await _write_batch(vector_store, batch, stats, log_every, on_commit)
+        return stats
+
+    limiter = limiter or AdaptiveConcurrencyLimiter()
+    pending: deque[tuple[list[Chunk], asyncio.Task]] = deque()
+    try:
+        for batch in batches:
+            stats.rows += len(batch)
+            texts = [chunk.content for chunk in batch]
+            pending.append((batch, asyncio.create_task(call_with_retry(limiter, em_invoker.invoke, texts))))
+            # Bound the backlog by the adaptive limit, so it shrinks when the limiter backs off
+            while pending and (len(pending) > limiter.limit or pending[0][1].done()):
+                await _write_pending(vector_store, pending, stats, log_every, on_commit, limiter)
+
+        while pending:
+            await _write_pending(vector_store, pending, stats, log_every, on_commit, limiter)
+    finally:
+        for _, task in pending:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+
+    return stats
+
+
+async def _write_pending(
+    vector_store: ChromaVectorDataStore,
+    pending: deque[tuple[list[Chunk], asyncio.Task]],
+    stats: IngestionStats,
+    log_every: int,
+    on_commit: Callable[[list[Chunk]], None] | None,
+    limiter: AdaptiveConcurrencyLimiter,
+) -> None:
+    batch, task = pending[0]
+    await task
+    pending.popleft()
+    await _write_batch(vector_store, batch, stats, log_every, on_commit, limiter)
+
+
+async def _write_batch(
+    vector_store: ChromaVectorDataStore,
+    batch: list[Chunk],
+    stats: IngestionStats,
+    log_every: int,
+    on_commit: Callable[[list[Chunk]], None] | None,
+    limiter: AdaptiveConcurrencyLimiter | None = None,
+) -> None:
+    start = time.perf_counter()
+    await vector_store.add_chunks(batch)
+    if on_commit is not None:
+        on_commit(batch)
+    if limiter is None:
+        stats.embed_seconds += time.perf_counter() - start
+    else:
+        stats.embed_seconds = limiter.busy_seconds
+    stats.embeddings += len(batch)
+    stats.batches += 1
+    if log_every and stats.batches % log_every == 0:
+        print(f"Indexed {stats}")
@@ -0,0 +1,192 @@
+"""Benchmark query latency, recall, and memory of the local vector store search backends.
+
+By default, the corpus is made of random clustered vectors, so no embedding API calls are made. With `--csv`, the
+descriptions of a CSV file are embedded once with the OpenAI EM invoker and queried with "Tell me about the <name>".
+
+The exact backend is also timed with all queries scored in one batch. Recall@5 is measured against exact float32
+search. The script exits with a non-zero status if the batch results differ from the one-at-a-time results, or if a
+quantized backend falls more than `--recall-tolerance` below exact search.
+
+Usage:
+    uv run benchmark.py --size 50000 --dim 256 --queries 200
+    uv run benchmark.py --csv data/imaginary_animals.csv --backends exact,int8,pq
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from gllm_core.schema import Chunk
+
+from local_vector_store import LocalVectorDataStore
+
+TOP_K = 5
+BATCH_SIZE = 1_000
+BACKENDS = {
+    "exact": {"exact_search_threshold": sys.maxsize},
+    "hnsw": {"exact_search_threshold": 0},
+    "int8": {"quantization": "int8"},
+    "pq": {"quantization": "pq"},
+}
+
+
+class SyntheticEMInvoker:
+    """An EM invoker stand-in that returns precomputed vectors for the corpus."""
+
+    def __init__(self, vectors: np.ndarray):
+        """Initialize the invoker.
+
+        Args:
+            vectors (np.ndarray): The corpus vectors. The content of chunk `i` is `str(i)`.
+        """
+        self.vectors = vectors
+
+    async def invoke(self, content: str | list[str]) -> list[float] | list[list[float]]:
+        """Return the precomputed vector of each content."""
+        if isinstance(content, str):
+            return self.vectors[int(content)].tolist()
+        return self.vectors[[int(text) for text in content]].tolist()
+
+
+def make_corpus(size: int, dim: int, clusters: int = 100, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Generate clustered corpus vectors and query vectors.
+
+    Args:
+        size (int): The number of corpus vectors.
+        dim (int): The vector dimension.
+        clusters (int, optional): The number of clusters. Defaults to 100.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The corpus vectors and a generator of matching query vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    corpus = centers[rng.integers(0, clusters, size)] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+    return corpus, centers
+
+
+async def embed_csv(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Embed the descriptions of a CSV file and one query per row.
+
+    Args:
+        path (str): The path of a CSV file with "name" and "description" columns.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The description vectors and the query vectors.
+    """
+    from gllm_inference.em_invoker import OpenAIEMInvoker
+
+    load_dotenv()
+    with open(path, "r") as f:
+        rows = list(csv.DictReader(f))
+
+    em_invoker = OpenAIEMInvoker(model_name=os.getenv("EMBEDDING_MODEL"))
+    corpus = await em_invoker.invoke([row["description"] for row in rows])
+    queries = await em_invoker.invoke([f"Tell me about the {row['name']}" for row in rows])
+    return np.array(corpus, dtype=np.float32), np.array(queries, dtype=np.float32)
+
+
+async def build_store(directory: str, corpus: np.ndarray, **kwargs) -> LocalVectorDataStore:
+    """Index the corpus into a fresh local vector store.
+
+    Args:
+        directory (str): The persist directory.
+        corpus (np.ndarray): The corpus vectors.
+        **kwargs: The search backend parameters of the store.
+
+    Returns:
+        LocalVectorDataStore: The populated store.
+    """
+    store = LocalVectorDataStore(
+        collection_name="benchmark",
+        persist_directory=directory,
+        embedding=SyntheticEMInvoker(corpus),
+        **kwargs,
+    )
+    for start in range(0, len(corpus), BATCH_SIZE):
+        await store.add_chunks([Chunk(content=str(i)) for i in range(start, min(start + BATCH_SIZE, len(corpus)))])
+    store.train_quantizer()
+    return store
+
+
+def measure(store: LocalVectorDataStore, queries: np.ndarray) -> tuple[list[set[str]], np.ndarray]:
+    """Run every query and measure its latency.
+
+    Args:
+        store (LocalVectorDataStore): The store to query.
+        queries (np.ndarray): The query vectors.
+
+    Returns:
+        tuple[list[set[str]], np.ndarray]: The retrieved contents and the latency in milliseconds of each query.
+    """
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        chunks = store.query_by_vector(query, TOP_K)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({chunk.content for chunk in chunks})
+    return results, np.array(latencies)
+
+
+async def main():
+    """Compare the search backends."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=20_000, help="number of synthetic corpus vectors")
+    parser.add_argument("--dim", type=int, default=256, help="synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="number of synthetic queries")
+    parser.add_argument("--csv", help="embed this CSV file instead of generating a synthetic corpus")
+    parser.add_argument("--backends", default="exact,hnsw,int8,pq", help="comma-separated backends to compare")
+    parser.add_argument("--recall-tolerance", type=float, default=0.05, help="maximum recall@5 loss of quantization")
+    args = parser.parse_args()
+
+    if args.csv:
+        corpus, queries = await embed_csv(args.csv)
+    else:
+        corpus, centers = make_corpus(args.size, args.dim)
+        rng = np.random.default_rng(1)
+        queries = centers[rng.integers(0, len(centers), args.queries)] + rng.normal(size=(args.queries, args.dim))
+
+    backends = ["exact", *(name for name in args.backends.split(",") if name != "exact")]
+    results = {}
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for name in backends:
+            start = time.perf_counter()
+            store = await build_store(f"{directory}/{name}", corpus, **BACKENDS[name])
+            build_seconds = time.perf_counter() - start
+            results[name], latencies = measure(store, queries)
+
+            p50, p99 = np.percentile(latencies, [50, 99])
+            recall = np.mean([len(exact & found) / TOP_K for exact, found in zip(results["exact"], results[name])])
+            size = store.bytes_per_vector
+            print(
+                f"{name:>5}: build {build_seconds:.1f}s, p50 {p50:.2f} ms, p99 {p99:.2f} ms, "
+                f"recall@{TOP_K} {recall:.3f}, {size} bytes/vector ({4 * corpus.shape[1] / size:.0f}x smaller)"
+            )
+            if name == "exact":
+                start = time.perf_counter()
+                batch_results = store.query_by_vectors(queries, TOP_K)
+                batch_seconds = time.perf_counter() - start
+                if [{chunk.content for chunk in chunks} for chunks in batch_results] != results[name]:
+                    print(f"{name:>5}: batch results differ from the one-at-a-time results")
+                    failed = True
+                print(
+                    f"{name:>5}: batch of {len(queries)} queries in {batch_seconds * 1000:.1f} ms, "
+                    f"{latencies.sum() / 1000 / batch_seconds:.1f}x the throughput of one query at a time"
+                )
+            if store.quantization is not None and recall < 1 - args.recall_tolerance:
+                print(f"{name:>5}: recall@{TOP_K} is below the tolerance of {args.recall_tolerance}")
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""In-memory inverted index with BM25 scoring for keyword search.
+
+References:
+    [1] Robertson, S., & Zaragoza, H. (2009). The Probabilistic Relevance Framework: BM25 and Beyond.
+        https://www.staff.city.ac.uk/~sbrp622/papers/foundations_bm25_review.pdf
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split a text into lowercase word tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list[str]: The tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """An inverted index that supports incremental additions and removals.
+
+    Attributes:
+        k1 (float): The term frequency saturation parameter.
+        b (float): The document length normalization parameter.
+        postings (dict[str, dict[int, int]]): The term frequency of each term in each document that contains it.
+    """
+
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B):
+        """Initialize an empty index.
+
+        Args:
+            k1 (float, optional): The term frequency saturation parameter. Defaults to 1.2.
+            b (float, optional): The document length normalization parameter. Defaults to 0.75.
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, dict[int, int]] = {}
+        self._lengths: dict[int, int] = {}
+        self._terms: dict[int, list[str]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        """The number of indexed documents."""
+        return len(self._lengths)
+
+    def add(self, doc_id: int, text: str) -> None:
+        """Index a document. An existing document with the same ID is replaced.
+
+        Args:
+            doc_id (int): The document ID.
+            text (str): The document text.
+        """
+        self.remove(doc_id)
+        tokens = tokenize(text)
+        frequencies = Counter(tokens)
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        self._lengths[doc_id] = len(tokens)
+        self._terms[doc_id] = list(frequencies)
+        self._total_length += len(tokens)
+
+    def remove(self, doc_id: int) -> None:
+        """Remove a document from the index. Unknown IDs are ignored.
+
+        Args:
+            doc_id (int): The document ID.
+        """
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+
+        self._total_length -= length
+        for term in self._terms.pop(doc_id):
+            del self.postings[term][doc_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def search(self, query: str, top_k: int) -> list[tuple[float, int]]:
+        """Rank the documents containing at least one query term.
+
+        Args:
+            query (str): The query text.
+            top_k (int): The number of documents to return.
+
+        Returns:
+            list[tuple[float, int]]: The (score, document ID) pairs, best first.
+        """
+        if not self._lengths:
+            return []
+
+        average_length = self._total_length / len(self._lengths)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+
+            idf = math.log(1 + (len(self._lengths) - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, frequency in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        return heapq.nlargest(top_k, ((score, doc_id) for doc_id, score in scores.items()))
@@ -0,0 +1,224 @@
+"""In-process HNSW (Hierarchical Navigable Small World) graph for approximate nearest-neighbor search.
+
+The graph works on L2-normalized float32 vectors and ranks neighbors by inner product, i.e. cosine similarity. The
+bottom layer, which holds every node, is a fixed-width int32 adjacency matrix that can be memory-mapped. The sparse
+upper layers only hold a logarithmic fraction of the nodes and are kept as plain dictionaries.
+
+References:
+    [1] Malkov, Y. A., & Yashunin, D. A. (2018). Efficient and robust approximate nearest neighbor search using
+        Hierarchical Navigable Small World graphs. https://arxiv.org/abs/1603.09320
+"""
+
+import heapq
+import math
+import random
+from collections.abc import Callable
+
+import numpy as np
+
+DEFAULT_M = 16
+DEFAULT_EF_CONSTRUCTION = 100
+DEFAULT_EF_SEARCH = 64
+
+
+class HNSWIndex:
+    """A Hierarchical Navigable Small World graph over externally stored vectors.
+
+    The vectors themselves are not owned by the index: every method receives the vector matrix, whose row `i` is the
+    vector of node `i`.
+
+    Attributes:
+        m (int): The number of neighbors per node on the upper layers.
+        m0 (int): The number of neighbors per node on the bottom layer.
+        ef_construction (int): The size of the candidate list while inserting.
+        ef_search (int): The default size of the candidate list while searching.
+        neighbors (np.ndarray): The bottom layer adjacency matrix, padded with -1.
+        upper_layers (list[dict[int, list[int]]]): The adjacency lists of layers 1 and above.
+        entry_point (int): The node every search starts from, or -1 if the graph is empty.
+    """
+
+    def __init__(
+        self,
+        neighbors: np.ndarray,
+        m: int = DEFAULT_M,
+        ef_construction: int = DEFAULT_EF_CONSTRUCTION,
+        ef_search: int = DEFAULT_EF_SEARCH,
+        upper_layers: list[dict[int, list[int]]] | None = None,
+        entry_point: int = -1,
+        seed: int = 0,
+    ):
+        """Initialize the graph.
+
+        Args:
+            neighbors (np.ndarray): The bottom layer adjacency matrix of shape (capacity, 2 * m), padded with -1.
+            m (int, optional): The number of neighbors per node on the upper layers. Defaults to 16.
+            ef_construction (int, optional): The size of the candidate list while inserting. Defaults to 100.
+            ef_search (int, optional): The default size of the candidate list while searching. Defaults to 64.
+            upper_layers (list[dict[int, list[int]]] | None, optional): The adjacency lists of layers 1 and above of
+                a previously built graph. Defaults to None.
+            entry_point (int, optional): The entry point of a previously built graph. Defaults to -1.
+            seed (int, optional): The seed of the random layer assignment. Defaults to 0.
+        """
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.neighbors = neighbors
+        self.upper_layers = upper_layers or []
+        self.entry_point = entry_point
+        self._level_multiplier = 1 / math.log(m)
+        self._random = random.Random(seed)
+
+    @property
+    def max_level(self) -> int:
+        """The highest layer of the graph, or -1 if the graph is empty."""
+        return len(self.upper_layers) if self.entry_point >= 0 else -1
+
+    def add(self, node: int, vectors: np.ndarray) -> None:
+        """Insert a node into the graph.
+
+        Args:
+            node (int): The node to insert, i.e. its row in `vectors`.
+            vectors (np.ndarray): The vector matrix.
+        """
+        query = vectors[node]
+        level = int(-math.log(1.0 - self._random.random()) * self._level_multiplier)
+        if self.entry_point < 0:
+            self.entry_point = node
+            self.upper_layers = [{node: []} for _ in range(level)]
+            return
+
+        max_level = self.max_level
+        entry_points = [self.entry_point]
+        for layer in range(max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer, vectors)[0][1]]
+
+        for layer in range(min(level, max_level), -1, -1):
+            candidates = self._search_layer(query, entry_points, self.ef_construction, layer, vectors)
+            max_neighbors = self.m0 if layer == 0 else self.m
+            selected = self._select_neighbors(candidates, max_neighbors, vectors)
+            self._set_neighbors(node, layer, selected)
+            for neighbor in selected:
+                self._connect(neighbor, node, layer, max_neighbors, vectors)
+            entry_points = [candidate for _, candidate in candidates]
+
+        if level > max_level:
+            self.upper_layers.extend({node: []} for _ in range(max_level, level))
+            self.entry_point = node
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        vectors: np.ndarray,
+        ef: int | None = None,
+        accept: Callable[[np.ndarray], np.ndarray] | None = None,
+    ) -> list[tuple[float, int]]:
+        """Find the approximate nearest neighbors of a query vector.
+
+        Args:
+            query (np.ndarray): The L2-normalized query vector.
+            top_k (int): The number of neighbors to return.
+            vectors (np.ndarray): The vector matrix.
+            ef (int | None, optional): The size of the candidate list. Defaults to None, in which case
+                `max(ef_search, top_k)` is used.
+            accept (Callable[[np.ndarray], np.ndarray] | None, optional): A function mapping node IDs to a boolean
+                mask of the nodes allowed in the result, e.g. to skip deleted nodes. Defaults to None.
+
+        Returns:
+            list[tuple[float, int]]: The (similarity, node) pairs, best first.
+        """
+        if self.entry_point < 0:
+            return []
+
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer, vectors)[0][1]]
+
+        candidates = self._search_layer(query, entry_points, max(ef or self.ef_search, top_k), 0, vectors)
+        if accept is not None:
+            nodes = np.fromiter((node for _, node in candidates), dtype=np.int64, count=len(candidates))
+            mask = accept(nodes)
+            candidates = [candidate for candidate, keep in zip(candidates, mask) if keep]
+        return candidates[:top_k]
+
+    def _neighbors_of(self, node: int, layer: int) -> np.ndarray | list[int]:
+        if layer == 0:
+            row = self.neighbors[node]
+            return row[row >= 0]
+        return self.upper_layers[layer - 1][node]
+
+    def _set_neighbors(self, node: int, layer: int, neighbors: list[int]) -> None:
+        if layer == 0:
+            self.neighbors[node] = -1
+            self.neighbors[node, : len(neighbors)] = neighbors
+        else:
+            self.upper_layers[layer - 1][node] = list(neighbors)
+
+    def _connect(self, node: int, new_neighbor: int, layer: int, max_neighbors: int, vectors: np.ndarray) -> None:
+        neighbors = [int(neighbor) for neighbor in self._neighbors_of(node, layer)]
+        neighbors.append(new_neighbor)
+        if len(neighbors) > max_neighbors:
+            similarities = (vectors[neighbors] @ vectors[node]).tolist()
+            candidates = sorted(zip(similarities, neighbors), reverse=True)
+            neighbors = self._select_neighbors(candidates, max_neighbors, vectors)
+        self._set_neighbors(node, layer, neighbors)
+
+    def _select_neighbors(
+        self,
+        candidates: list[tuple[float, int]],
+        max_neighbors: int,
+        vectors: np.ndarray,
+    ) -> list[int]:
+        # Keep a candidate only if it is closer to the base node than to every neighbor kept so far, so that the
+        # links spread in different directions instead of all pointing into the same cluster. Pruned candidates
+        # fill the remaining slots.
+        nodes = [candidate for _, candidate in candidates]
+        pairwise = vectors[nodes] @ vectors[nodes].T
+        closest_selected = np.full(len(nodes), -np.inf, dtype=np.float32)
+        selected: list[int] = []
+        pruned: list[int] = []
+        for index, (similarity, _) in enumerate(candidates):
+            if len(selected) >= max_neighbors:
+                break
+            if closest_selected[index] > similarity:
+                pruned.append(index)
+            else:
+                selected.append(index)
+                np.maximum(closest_selected, pairwise[index], out=closest_selected)
+        return [nodes[index] for index in selected + pruned[: max_neighbors - len(selected)]]
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entry_points: list[int],
+        ef: int,
+        layer: int,
+        vectors: np.ndarray,
+    ) -> list[tuple[float, int]]:
+        similarities = vectors[entry_points] @ query
+        visited = set(entry_points)
+        candidates = [(-float(similarity), node) for similarity, node in zip(similarities, entry_points)]
+        results = [(float(similarity), node) for similarity, node in zip(similarities, entry_points)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            negative_similarity, node = heapq.heappop(candidates)
+            if -negative_similarity < results[0][0] and len(results) >= ef:
+                break
+
+            unvisited = [neighbor for neighbor in self._neighbors_of(node, layer) if neighbor not in visited]
+            if not unvisited:
+                continue
+            visited.update(unvisited)
+            for similarity, neighbor in zip((vectors[unvisited] @ query).tolist(), unvisited):
+                if len(results) < ef or similarity > results[0][0]:
+                    heapq.heappush(candidates, (-similarity, int(neighbor)))
+                    heapq.heappush(results, (similarity, int(neighbor)))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, reverse=True)
@@ -0,0 +1,150 @@
+"""Hybrid retriever combining BM25 keyword search and vector search over a local vector store.
+
+Queries that name chunks exactly, e.g. "Tell me about the Glimmerfox" when chunks carry a `name` metadata field, are
+answered from the keyword index alone, without an embedding request: the named chunks come first, and the remaining
+slots up to `top_k` are filled with the next best keyword matches. Other queries run both searches and merge the
+rankings with reciprocal rank fusion (RRF), which only uses ranks and thus needs no score calibration.
+
+References:
+    [1] Cormack, G. V., Clarke, C. L. A., & Buettcher, S. (2009). Reciprocal rank fusion outperforms Condorcet and
+        individual rank learning methods. https://dl.acm.org/doi/10.1145/1571941.1572114
+"""
+
+from gllm_core.schema import Chunk, Component
+
+from bm25 import tokenize
+from local_vector_store import DEFAULT_TOP_K, LocalVectorDataStore
+
+DEFAULT_RRF_K = 60
+DEFAULT_CANDIDATE_FACTOR = 4
+
+
+def reciprocal_rank_fusion(rankings: list[list[Chunk]], top_k: int, k: int = DEFAULT_RRF_K) -> list[Chunk]:
+    """Merge rankings of chunks by summing `1 / (k + rank)` over the rankings each chunk appears in.
+
+    Args:
+        rankings (list[list[Chunk]]): The rankings to merge, best first.
+        top_k (int): The number of chunks to return.
+        k (int, optional): The rank offset, which dampens the weight of the top ranks. Defaults to 60.
+
+    Returns:
+        list[Chunk]: The merged ranking, with the fused scores.
+    """
+    scores: dict[str, float] = {}
+    chunks: dict[str, Chunk] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.id] = scores.get(chunk.id, 0.0) + 1 / (k + rank)
+            chunks.setdefault(chunk.id, chunk)
+
+    fused = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [
+        Chunk(id=chunk_id, content=chunks[chunk_id].content, metadata=chunks[chunk_id].metadata, score=scores[chunk_id])
+        for chunk_id in fused
+    ]
+
+
+class HybridRetriever(Component):
+    """A retriever that answers exact name matches lexically and fuses keyword and vector search otherwise.
+
+    Attributes:
+        data_store (LocalVectorDataStore): The data store, created with `lexical_index=True`.
+        name_fields (tuple[str, ...]): The metadata fields whose values, when fully contained in a query, make the
+            query a lexical hit.
+        rrf_k (int): The rank offset of the reciprocal rank fusion.
+        candidate_factor (int): The number of candidates per requested chunk fetched from each search before fusion.
+        lexical_hits (int): The number of queries answered without embedding.
+        hybrid_queries (int): The number of queries answered by fusing both searches.
+    """
+
+    def __init__(
+        self,
+        data_store: LocalVectorDataStore,
+        name_fields: tuple[str, ...] = ("name",),
+        rrf_k: int = DEFAULT_RRF_K,
+        candidate_factor: int = DEFAULT_CANDIDATE_FACTOR,
+    ):
+        """Initialize the retriever.
+
+        Args:
+            data_store (LocalVectorDataStore): The data store, created with `lexical_index=True`.
+            name_fields (tuple[str, ...], optional): The metadata fields whose values, when fully contained in a
+                query, make the query a lexical hit. Defaults to ("name",).
+            rrf_k (int, optional): The rank offset of the reciprocal rank fusion. Defaults to 60.
+            candidate_factor (int, optional): The number of candidates per requested chunk fetched from each search
+                before fusion. Defaults to 4.
+        """
+        super().__init__()
+        self.data_store = data_store
+        self.name_fields = name_fields
+        self.rrf_k = rrf_k
+        self.candidate_factor = candidate_factor
+        self.lexical_hits = 0
+        self.hybrid_queries = 0
+
+    async def retrieve(self, query: str, top_k: int = DEFAULT_TOP_K) -> list[Chunk]:
+        """Retrieve the chunks most relevant to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): The number of chunks to retrieve. Defaults to 5.
+
+        Returns:
+            list[Chunk]: The retrieved chunks, most relevant first.
+        """
+        return (await self.retrieve_batch([query], top_k))[0]
+
+    async def retrieve_batch(self, queries: list[str], top_k: int = DEFAULT_TOP_K) -> list[list[Chunk]]:
+        """Retrieve the chunks most relevant to each of several queries.
+
+        The queries that are not lexical hits are embedded in a single request and searched together.
+
+        Args:
+            queries (list[str]): The query texts.
+            top_k (int, optional): The number of chunks to retrieve per query. Defaults to 5.
+
+        Returns:
+            list[list[Chunk]]: The retrieved chunks of each query, most relevant first.
+        """
+        results: list[list[Chunk]] = []
+        keyword_rankings: dict[int, list[Chunk]] = {}
+        for index, query in enumerate(queries):
+            keyword_chunks = self.data_store.query_by_keywords(query, top_k * self.candidate_factor)
+            query_terms = set(tokenize(query))
+            named_chunks = [chunk for chunk in keyword_chunks if self._is_named(chunk, query_terms)]
+            # Named chunks first, then the best other keyword matches, so a lexical hit still returns top_k chunks
+            named_ids = {chunk.id for chunk in named_chunks}
+            others = [chunk for chunk in keyword_chunks if chunk.id not in named_ids]
+            results.append((named_chunks + others)[:top_k])
+            if not named_chunks:
+                keyword_rankings[index] = keyword_chunks
+
+        self.lexical_hits += len(queries) - len(keyword_rankings)
+        self.hybrid_queries += len(keyword_rankings)
+        vector_rankings = await self.data_store.query_batch(
+            [queries[index] for index in keyword_rankings], top_k * self.candidate_factor
+        )
+        for (index, keyword_chunks), vector_chunks in zip(keyword_rankings.items(), vector_rankings):
+            results[index] = reciprocal_rank_fusion([vector_chunks, keyword_chunks], top_k, self.rrf_k)
+        return results
+
+    async def _run(self, query: str, top_k: int = DEFAULT_TOP_K, **kwargs) -> list[Chunk]:
+        """Retrieve the chunks most relevant to a query, as a pipeline step.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): The number of chunks to retrieve. Defaults to 5.
+            **kwargs: Ignored, accepted for compatibility with other retrievers.
+
+        Returns:
+            list[Chunk]: The retrieved chunks, most relevant first.
+        """
+        return await self.retrieve(query, top_k)
+
+    def _is_named(self, chunk: Chunk, query_terms: set[str]) -> bool:
+        for field in self.name_fields:
+            value = chunk.metadata.get(field)
+            name_terms = set(tokenize(value)) if isinstance(value, str) else set()
+            if name_terms and name_terms <= query_terms:
+                return True
+        return False
@@ -0,0 +1,41 @@
+"""Example script to index a CSV file into an in-process local vector store.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import asyncio
+import csv
+import os
+
+from dotenv import load_dotenv
+from gllm_core.schema import Chunk
+from gllm_inference.em_invoker import OpenAIEMInvoker
+
+from local_vector_store import LocalVectorDataStore
+
+load_dotenv()
+
+# Initialize vector store with memory-mapped files, no database process needed
+vector_store = LocalVectorDataStore(
+    collection_name="documents",
+    persist_directory="data",  # 👈 where the data is located
+    embedding=OpenAIEMInvoker(model_name=os.getenv("EMBEDDING_MODEL")),
+)
+
+
+# Load documents from CSV file
+async def load_csv_data():
+    with open("data/imaginary_animals.csv", "r") as f:
+        reader = csv.DictReader(f)
+        chunks = [
+            Chunk(content=row["description"], metadata={"name": row["name"]})
+            for row in reader
+        ]
+
+    await vector_store.add_chunks(chunks)
+    print(f"Successfully indexed {len(chunks)} documents from CSV file")
+
+
+if __name__ == "__main__":
+    asyncio.run(load_csv_data())
@@ -0,0 +1,655 @@
+"""In-process vector data store persisted as memory-mapped files.
+
+`LocalVectorDataStore` exposes the same `add_chunks` and `query` methods as `ChromaVectorDataStore`, so it can be
+passed to `BasicVectorRetriever` without running a separate database process. Small collections are searched exactly
+with a single NumPy matrix-vector product and a partial sort. Once a collection grows past `exact_search_threshold`,
+an HNSW graph is built and maintained incrementally, and queries become approximate.
+
+With `quantization` set to "int8" or "pq", queries instead scan compact quantized codes of the embeddings and re-rank
+the best `top_k * rerank_factor` candidates with their float vectors. The quantizer is trained on the first query,
+or explicitly with `train_quantizer`, and chunks added afterwards are encoded as they are added.
+
+With `lexical_index` enabled, the content and string metadata of every chunk are also kept in an in-memory BM25
+inverted index, which `query_by_keywords` searches without embedding the query. The index is updated as chunks are
+added and deleted, and rebuilt from the chunk log when the collection is loaded.
+
+Queries can be restricted with a metadata filter. The metadata fields listed in `metadata_index_fields` get in-memory
+posting lists, so the candidate rows of a filter are found before any vector is scored. When fewer candidates than
+`exact_search_threshold` remain, only they are scored, exactly, so selective filters get cheaper, not more expensive,
+as the collection grows. Larger candidate sets are searched with the regular index, masked to the candidates.
+
+`query_batch` answers many queries with a single embedding request. Whenever the search is exact, all the queries
+are then scored with one matrix-matrix product instead of one matrix-vector product each.
+
+Files of a collection, under `{persist_directory}/{collection_name}/`:
+    - `chunks.jsonl`: the append-only log of added chunks (row, ID, content, metadata) and deletions. Records of
+      rows beyond the committed size of `meta.json` were written by an interrupted `add_chunks`: they are ignored on
+      load, and the rows they name are overwritten by the next `add_chunks`, whose records then take precedence.
+    - `vectors.f32`: the memory-mapped float32 matrix of L2-normalized embeddings, one row per added chunk.
+    - `hnsw.i32`: the memory-mapped bottom layer of the HNSW graph.
+    - `codes.bin`: the memory-mapped quantized codes of the embeddings, one row per added chunk.
+    - `quantizer.npz`: the trained quantizer parameters.
+    - `meta.json`: the embedding dimension, the number of committed rows, the number of encoded rows, and the upper
+      layers of the HNSW graph.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/index-your-data-with-vector-data-store
+"""
+
+import json
+import os
+from typing import Any
+
+import numpy as np
+from gllm_core.schema import Chunk
+from gllm_inference.em_invoker import OpenAIEMInvoker
+
+from bm25 import BM25Index
+from hnsw import DEFAULT_EF_CONSTRUCTION, DEFAULT_EF_SEARCH, DEFAULT_M, HNSWIndex
+from metadata_index import MetadataIndex
+from quantization import SCAN_BLOCK_SIZE, ProductQuantizer, ScalarQuantizer, load_quantizer
+
+DEFAULT_TOP_K = 5
+DEFAULT_EXACT_SEARCH_THRESHOLD = 20_000
+INITIAL_CAPACITY = 1_024
+DEFAULT_RERANK_FACTOR = 20
+PQ_SUBVECTOR_DIM = 4
+QUANTIZER_TRAIN_SIZE = 10_000
+QUANTIZATION_TYPES = ("int8", "pq")
+MAX_BATCH_SCORES = 1 << 24
+
+
+def open_memmap(path: str, dtype: np.dtype, columns: int, capacity: int, fill: int = 0) -> np.memmap:
+    """Open a row-major memory-mapped matrix, growing its file to `capacity` rows if needed.
+
+    Args:
+        path (str): The path of the backing file.
+        dtype (np.dtype): The element type.
+        columns (int): The number of columns.
+        capacity (int): The number of rows to map.
+        fill (int, optional): The value of the rows added when the file grows. Defaults to 0.
+
+    Returns:
+        np.memmap: The writable memory-mapped matrix.
+    """
+    row_bytes = np.dtype(dtype).itemsize * columns
+    existing_rows = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+    if existing_rows < capacity:
+        with open(path, "ab") as f:
+            f.truncate(capacity * row_bytes)
+
+    matrix = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity, columns))
+    if fill and existing_rows < capacity:
+        matrix[existing_rows:] = fill
+    return matrix
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize vectors along their last axis.
+
+    Args:
+        vectors (np.ndarray): The vectors to normalize.
+
+    Returns:
+        np.ndarray: The normalized float32 vectors. Zero vectors are left unchanged.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class LocalVectorDataStore:
+    """A vector data store that searches memory-mapped embeddings in-process.
+
+    Scores are cosine similarities, so higher is better.
+
+    Attributes:
+        collection_name (str): The name of the collection.
+        persist_directory (str): The directory where collections are stored.
+        embedding (OpenAIEMInvoker): The EM invoker used to embed chunks and queries.
+        exact_search_threshold (int): The collection size from which the HNSW graph is used.
+        quantization (str | None): The quantization of the searched embeddings, "int8", "pq", or None.
+        rerank_factor (int): The number of candidates per requested chunk re-ranked with the float vectors.
+        lexical_index (BM25Index | None): The keyword index of the chunks, if enabled.
+        metadata_index (MetadataIndex | None): The secondary indexes of the metadata fields, if any.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        persist_directory: str,
+        embedding: OpenAIEMInvoker,
+        exact_search_threshold: int = DEFAULT_EXACT_SEARCH_THRESHOLD,
+        hnsw_m: int = DEFAULT_M,
+        ef_construction: int = DEFAULT_EF_CONSTRUCTION,
+        ef_search: int = DEFAULT_EF_SEARCH,
+        quantization: str | None = None,
+        pq_subvectors: int | None = None,
+        rerank_factor: int = DEFAULT_RERANK_FACTOR,
+        lexical_index: bool = False,
+        metadata_index_fields: tuple[str, ...] = (),
+    ):
+        """Initialize the data store, loading the collection from disk if it exists.
+
+        Args:
+            collection_name (str): The name of the collection.
+            persist_directory (str): The directory where collections are stored.
+            embedding (OpenAIEMInvoker): The EM invoker used to embed chunks and queries.
+            exact_search_threshold (int, optional): The collection size from which the HNSW graph is used.
+                Defaults to 20,000.
+            hnsw_m (int, optional): The number of neighbors per node of the HNSW graph. Defaults to 16.
+            ef_construction (int, optional): The HNSW candidate list size while inserting. Defaults to 100.
+            ef_search (int, optional): The HNSW candidate list size while searching. Defaults to 64.
+            quantization (str | None, optional): The quantization of the searched embeddings. "int8" keeps one
+                byte per dimension, i.e. 4x smaller than float32. "pq" keeps one byte per sub-vector, i.e. 16x smaller
+                with the default sub-vectors. The HNSW graph is not used when set. Defaults to None.
+            pq_subvectors (int | None, optional): The number of product quantization sub-vectors. Must divide the
+                embedding dimension. Defaults to None, in which case one sub-vector per 4 dimensions is used.
+            rerank_factor (int, optional): The number of candidates per requested chunk re-ranked with the float
+                vectors after a quantized scan. Defaults to 20.
+            lexical_index (bool, optional): Whether to keep a BM25 keyword index of the chunks. Defaults to False.
+            metadata_index_fields (tuple[str, ...], optional): The metadata fields to index for filtered queries.
+                Filters on other fields are evaluated chunk by chunk. Defaults to ().
+
+        Raises:
+            ValueError: If the quantization is not supported.
+        """
+        if quantization not in (None, *QUANTIZATION_TYPES):
+            raise ValueError(f"Unsupported quantization {quantization!r}, expected one of {QUANTIZATION_TYPES}.")
+
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        self.embedding = embedding
+        self.exact_search_threshold = exact_search_threshold
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.lexical_index = BM25Index() if lexical_index else None
+        self.metadata_index = MetadataIndex(metadata_index_fields) if metadata_index_fields else None
+        self._pq_subvectors = pq_subvectors
+        self._hnsw_params = {"m": hnsw_m, "ef_construction": ef_construction, "ef_search": ef_search}
+
+        self._directory = os.path.join(persist_directory, collection_name)
+        os.makedirs(self._directory, exist_ok=True)
+        self._ids: list[str] = []
+        self._contents: list[str] = []
+        self._metadata: list[dict[str, Any]] = []
+        self._rows: dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._dim: int | None = None
+        self._vectors: np.memmap | None = None
+        self._hnsw: HNSWIndex | None = None
+        self._hnsw_size = 0
+        self._quantizer: ScalarQuantizer | ProductQuantizer | None = None
+        self._codes: np.memmap | None = None
+        self._codes_size = 0
+        self._load()
+
+    def __len__(self) -> int:
+        """The number of chunks in the collection."""
+        return len(self._rows)
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """The number of bytes per chunk read by a full scan: the quantized code size, or the float32 vector size."""
+        if self._quantizer is not None:
+            return self._quantizer.code_size
+        return 4 * (self._dim or 0)
+
+    async def add_chunks(self, chunks: list[Chunk], **kwargs: Any) -> list[str]:
+        """Embed chunks and add them to the collection.
+
+        A chunk whose ID already exists replaces the existing chunk.
+
+        Args:
+            chunks (list[Chunk]): The chunks to add.
+            **kwargs (Any): Ignored, accepted for compatibility with other vector data stores.
+
+        Returns:
+            list[str]: The IDs of the added chunks.
+        """
+        if not chunks:
+            return []
+
+        embeddings = normalize(await self.embedding.invoke([chunk.content for chunk in chunks]))
+        self.delete_by_ids([chunk.id for chunk in chunks if chunk.id in self._rows])
+        self._ensure_capacity(self._size + len(chunks), embeddings.shape[1])
+
+        start = self._size
+        self._vectors[start : start + len(chunks)] = embeddings
+        self._vectors.flush()
+        with open(self._path("chunks.jsonl"), "a", encoding="utf-8") as f:
+            for offset, chunk in enumerate(chunks):
+                record = {"row": start + offset, "id": chunk.id, "content": chunk.content, "metadata": chunk.metadata}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._append(start + offset, record)
+
+        self._size += len(chunks)
+        self._update_hnsw()
+        self._update_codes()
+        self._save_meta()
+        return [chunk.id for chunk in chunks]
+
+    async def query(
+        self,
+        query: str,
+        top_k: int = DEFAULT_TOP_K,
+        retrieval_params: dict[str, Any] | None = None,
+    ) -> list[Chunk]:
+        """Retrieve the chunks most similar to a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): The number of chunks to retrieve. Defaults to 5.
+            retrieval_params (dict[str, Any] | None, optional): Additional parameters. Supports "filter", a metadata
+                filter in the format of `delete_chunks`. Defaults to None.
+
+        Returns:
+            list[Chunk]: The retrieved chunks, most similar first.
+        """
+        where = (retrieval_params or {}).get("filter")
+        return self.query_by_vector(await self.embedding.invoke(query), top_k, where)
+
+    async def query_batch(
+        self,
+        queries: list[str],
+        top_k: int = DEFAULT_TOP_K,
+        retrieval_params: dict[str, Any] | None = None,
+    ) -> list[list[Chunk]]:
+        """Retrieve the chunks most similar to each of several queries, embedding them in a single request.
+
+        Args:
+            queries (list[str]): The query texts.
+            top_k (int, optional): The number of chunks to retrieve per query. Defaults to 5.
+            retrieval_params (dict[str, Any] | None, optional): Additional parameters, as in `query`. Defaults to None.
+
+        Returns:
+            list[list[Chunk]]: The retrieved chunks of each query, most similar first.
+        """
+        if not queries:
+            return []
+
+        where = (retrieval_params or {}).get("filter")
+        return self.query_by_vectors(await self.embedding.invoke(queries), top_k, where)
+
+    def query_by_vectors(
+        self,
+        vectors: list[list[float]] | np.ndarray,
+        top_k: int = DEFAULT_TOP_K,
+        where: dict[str, Any] | None = None,
+    ) -> list[list[Chunk]]:
+        """Retrieve the chunks most similar to each of several embeddings.
+
+        When the search is exact, the queries are scored together with matrix-matrix products. Otherwise, each
+        query is searched on its own with `query_by_vector`.
+
+        Args:
+            vectors (list[list[float]] | np.ndarray): The query embeddings.
+            top_k (int, optional): The number of chunks to retrieve per query. Defaults to 5.
+            where (dict[str, Any] | None, optional): A metadata filter in the format of `delete_chunks`. Defaults to
+                None, in which case every chunk is a candidate.
+
+        Returns:
+            list[list[Chunk]]: The retrieved chunks of each query, most similar first.
+        """
+        queries = normalize(vectors)
+        if not self._rows:
+            return [[] for _ in queries]
+
+        if where:
+            rows = self._filter_rows(where)
+            if len(rows) >= self.exact_search_threshold:
+                return [self.query_by_vector(query, top_k, where) for query in queries]
+            matrix = self._vectors[rows]
+        elif self.quantization is None and self._hnsw is None:
+            rows = np.flatnonzero(self._alive[: self._size])
+            matrix = self._vectors[: self._size]
+        else:
+            return [self.query_by_vector(query, top_k) for query in queries]
+
+        if len(rows) == 0:
+            return [[] for _ in queries]
+
+        top_k = min(top_k, len(rows))
+        block_size = max(1, MAX_BATCH_SCORES // len(matrix))
+        results = []
+        for start in range(0, len(queries), block_size):
+            scores = queries[start : start + block_size] @ matrix.T
+            if not where:
+                scores[:, ~self._alive[: self._size]] = -np.inf
+            top = np.argpartition(scores, -top_k, axis=1)[:, -top_k:]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+            if where:
+                top = rows[top]
+            results.extend(
+                [self._to_chunk(int(row), float(score)) for row, score in zip(row_top, row_scores)]
+                for row_top, row_scores in zip(top, top_scores)
+            )
+        return results
+
+    def query_by_vector(
+        self,
+        vector: list[float] | np.ndarray,
+        top_k: int = DEFAULT_TOP_K,
+        where: dict[str, Any] | None = None,
+    ) -> list[Chunk]:
+        """Retrieve the chunks most similar to an embedding.
+
+        Args:
+            vector (list[float] | np.ndarray): The query embedding.
+            top_k (int, optional): The number of chunks to retrieve. Defaults to 5.
+            where (dict[str, Any] | None, optional): A metadata filter in the format of `delete_chunks`. Defaults to
+                None, in which case every chunk is a candidate.
+
+        Returns:
+            list[Chunk]: The retrieved chunks, most similar first.
+        """
+        if not self._rows:
+            return []
+
+        query = normalize(vector)
+        vectors = self._vectors[: self._size]
+        mask = self._alive[: self._size]
+        num_candidates = len(self._rows)
+        if where:
+            rows = self._filter_rows(where)
+            if len(rows) < self.exact_search_threshold:
+                scores = vectors[rows] @ query
+                return [self._to_chunk(int(rows[index]), float(scores[index])) for index in _top(scores, top_k)]
+            mask = np.zeros(self._size, dtype=bool)
+            mask[rows] = True
+            num_candidates = len(rows)
+
+        top_k = min(top_k, num_candidates)
+        if self.quantization is not None:
+            if self._quantizer is None:
+                self.train_quantizer()
+            approximate_scores = self._quantizer.scores(query, self._codes[: self._size])
+            candidates = np.sort(self._top_rows(approximate_scores, top_k * self.rerank_factor, mask))
+            candidates = candidates[mask[candidates]]
+            scores = vectors[candidates] @ query
+            order = np.argsort(-scores)[:top_k]
+            return [self._to_chunk(int(candidates[index]), float(scores[index])) for index in order]
+
+        if self._hnsw is not None:
+            # Widen the candidate list by the inverse selectivity of the filter so that enough candidates pass it.
+            ef = min(self._size, self._hnsw.ef_search * self._size // num_candidates)
+            results = self._hnsw.search(query, top_k, vectors, ef=ef, accept=lambda rows: mask[rows])
+            return [self._to_chunk(row, score) for score, row in results]
+
+        scores = vectors @ query
+        top_rows = self._top_rows(scores, top_k, mask)
+        return [self._to_chunk(int(row), float(scores[row])) for row in top_rows]
+
+    def train_quantizer(self) -> None:
+        """Train the quantizer on a sample of the stored embeddings and encode every stored embedding.
+
+        This happens automatically on the first query. Call it again to retrain after the collection has changed a lot.
+        """
+        if self.quantization is None or not self._rows:
+            return
+
+        rows = np.flatnonzero(self._alive[: self._size])
+        if len(rows) > QUANTIZER_TRAIN_SIZE:
+            rows = np.sort(np.random.default_rng(0).choice(rows, QUANTIZER_TRAIN_SIZE, replace=False))
+        sample = np.asarray(self._vectors[rows])
+        if self.quantization == "int8":
+            self._quantizer = ScalarQuantizer.train(sample)
+        else:
+            self._quantizer = ProductQuantizer.train(sample, self._pq_subvectors or self._dim // PQ_SUBVECTOR_DIM)
+
+        tmp_path = self._path("quantizer.tmp.npz")
+        np.savez(tmp_path, **self._quantizer.state())
+        os.replace(tmp_path, self._path("quantizer.npz"))
+        if os.path.exists(self._path("codes.bin")):
+            os.remove(self._path("codes.bin"))
+        self._open_codes(len(self._vectors))
+        self._codes_size = 0
+        self._update_codes()
+        self._save_meta()
+
+    def query_by_keywords(self, query: str, top_k: int = DEFAULT_TOP_K) -> list[Chunk]:
+        """Retrieve the chunks that best match the words of a query, without embedding it.
+
+        Args:
+            query (str): The query text.
+            top_k (int, optional): The number of chunks to retrieve. Defaults to 5.
+
+        Returns:
+            list[Chunk]: The chunks containing at least one query word, best BM25 score first.
+
+        Raises:
+            ValueError: If the store was created without `lexical_index`.
+        """
+        if self.lexical_index is None:
+            raise ValueError("The lexical index is disabled, create the store with `lexical_index=True`.")
+        return [self._to_chunk(row, score) for score, row in self.lexical_index.search(query, top_k)]
+
+    async def query_by_id(self, id_: str | list[str]) -> list[Chunk]:
+        """Retrieve chunks by ID.
+
+        Args:
+            id_ (str | list[str]): The ID or IDs of the chunks.
+
+        Returns:
+            list[Chunk]: The chunks that exist, in the order of the given IDs.
+        """
+        ids = [id_] if isinstance(id_, str) else id_
+        return [self._to_chunk(self._rows[chunk_id]) for chunk_id in ids if chunk_id in self._rows]
+
+    async def delete_chunks(self, where: dict[str, Any] | None = None, **kwargs: Any) -> None:
+        """Delete the chunks whose metadata match a filter.
+
+        Args:
+            where (dict[str, Any] | None, optional): The metadata filter, mapping each field to a value or to
+                `{"$in": [values]}`. Defaults to None, in which case every chunk is deleted.
+            **kwargs (Any): Ignored, accepted for compatibility with other vector data stores.
+        """
+        self.delete_by_ids([self._ids[row] for row in self._filter_rows(where or {})])
+
+    def delete_by_ids(self, ids: list[str]) -> None:
+        """Delete chunks by ID. Unknown IDs are ignored.
+
+        Args:
+            ids (list[str]): The IDs of the chunks to delete.
+        """
+        ids = [chunk_id for chunk_id in ids if chunk_id in self._rows]
+        if not ids:
+            return
+
+        with open(self._path("chunks.jsonl"), "a", encoding="utf-8") as f:
+            for chunk_id in ids:
+                f.write(json.dumps({"delete": chunk_id}) + "\n")
+                self._remove(chunk_id)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory, name)
+
+    def _append(self, row: int, record: dict[str, Any]) -> None:
+        self._ids.append(record["id"])
+        self._contents.append(record["content"])
+        self._metadata.append(record["metadata"])
+        self._rows[record["id"]] = row
+        self._alive[row] = True
+        if self.metadata_index is not None:
+            self.metadata_index.add(row, record["metadata"])
+        if self.lexical_index is not None:
+            texts = [record["content"], *(value for value in record["metadata"].values() if isinstance(value, str))]
+            self.lexical_index.add(row, "\n".join(texts))
+
+    def _remove(self, chunk_id: str) -> None:
+        row = self._rows.pop(chunk_id)
+        self._alive[row] = False
+        if self.lexical_index is not None:
+            self.lexical_index.remove(row)
+
+    def _filter_rows(self, where: dict[str, Any]) -> np.ndarray:
+        rows, remaining = self.metadata_index.lookup(where) if self.metadata_index is not None else (None, where)
+        if rows is None:
+            rows = np.flatnonzero(self._alive[: self._size])
+        else:
+            rows = rows[self._alive[rows]]
+        if remaining:
+            rows = rows[np.fromiter((_matches(self._metadata[row], remaining) for row in rows), bool, len(rows))]
+        return rows
+
+    @staticmethod
+    def _top_rows(scores: np.ndarray, top_k: int, mask: np.ndarray) -> np.ndarray:
+        scores[~mask] = -np.inf
+        return _top(scores, top_k)
+
+    def _to_chunk(self, row: int, score: float | None = None) -> Chunk:
+        return Chunk(id=self._ids[row], content=self._contents[row], metadata=self._metadata[row], score=score)
+
+    def _ensure_capacity(self, size: int, dim: int) -> None:
+        if self._vectors is not None and size <= len(self._vectors):
+            return
+
+        self._dim = dim
+        capacity = max(INITIAL_CAPACITY, len(self._alive))
+        while capacity < size:
+            capacity *= 2
+        self._open_files(capacity)
+
+    def _open_files(self, capacity: int) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = open_memmap(self._path("vectors.f32"), np.float32, self._dim, capacity)
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        if self._hnsw is not None:
+            self._hnsw.neighbors.flush()
+            self._hnsw.neighbors = open_memmap(self._path("hnsw.i32"), np.int32, self._hnsw.m0, capacity, fill=-1)
+        if self._codes is not None:
+            self._codes.flush()
+            self._open_codes(capacity)
+
+    def _open_codes(self, capacity: int) -> None:
+        self._codes = open_memmap(
+            self._path("codes.bin"), self._quantizer.code_dtype, self._quantizer.code_size, capacity
+        )
+
+    def _update_codes(self) -> None:
+        if self._quantizer is None:
+            return
+
+        for start in range(self._codes_size, self._size, SCAN_BLOCK_SIZE):
+            end = min(start + SCAN_BLOCK_SIZE, self._size)
+            self._codes[start:end] = self._quantizer.encode(np.asarray(self._vectors[start:end]))
+        self._codes_size = self._size
+        self._codes.flush()
+
+    def _update_hnsw(self) -> None:
+        if self._hnsw is None:
+            if self.quantization is not None or self._size < self.exact_search_threshold:
+                return
+            neighbors = open_memmap(
+                self._path("hnsw.i32"), np.int32, 2 * self._hnsw_params["m"], len(self._vectors), fill=-1
+            )
+            self._hnsw = HNSWIndex(neighbors, **self._hnsw_params)
+            self._hnsw_size = 0
+
+        vectors = self._vectors[: self._size]
+        for row in range(self._hnsw_size, self._size):
+            self._hnsw.add(row, vectors)
+        self._hnsw_size = self._size
+        self._hnsw.neighbors.flush()
+
+    def _save_meta(self) -> None:
+        meta: dict[str, Any] = {"dim": self._dim, "size": self._size, "codes_size": self._codes_size}
+        if self._hnsw is not None:
+            meta["hnsw"] = {
+                "size": self._hnsw_size,
+                "entry_point": self._hnsw.entry_point,
+                "upper_layers": [list(layer.items()) for layer in self._hnsw.upper_layers],
+            }
+
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def _load(self) -> None:
+        # Without meta.json, no row was committed: any chunk records were left by an interrupted first add_chunks
+        if not os.path.exists(self._path("meta.json")):
+            return
+
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self._dim = meta["dim"]
+        self._size = meta["size"]
+        capacity = max(INITIAL_CAPACITY, self._size)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._vectors = open_memmap(self._path("vectors.f32"), np.float32, self._dim, capacity)
+
+        records, deleted = self._replay_log()
+        for row in range(self._size):
+            self._append(row, records[row])
+        for row in deleted:
+            self._remove(records[row]["id"])
+
+        if "hnsw" in meta:
+            neighbors = open_memmap(self._path("hnsw.i32"), np.int32, 2 * self._hnsw_params["m"], capacity, fill=-1)
+            upper_layers = [dict(layer) for layer in meta["hnsw"]["upper_layers"]]
+            self._hnsw = HNSWIndex(
+                neighbors, upper_layers=upper_layers, entry_point=meta["hnsw"]["entry_point"], **self._hnsw_params
+            )
+            self._hnsw_size = meta["hnsw"]["size"]
+            self._update_hnsw()
+
+        if self.quantization is not None and os.path.exists(self._path("quantizer.npz")):
+            with np.load(self._path("quantizer.npz")) as state:
+                quantizer = load_quantizer(dict(state))
+            if isinstance(quantizer, ScalarQuantizer) == (self.quantization == "int8"):
+                self._quantizer = quantizer
+                self._open_codes(capacity)
+                self._codes_size = meta.get("codes_size", 0)
+                self._update_codes()
+
+    def _replay_log(self) -> tuple[dict[int, dict[str, Any]], set[int]]:
+        # Each committed row gets its latest add record, so the records of an interrupted add_chunks, at rows beyond
+        # the committed size, are ignored or replaced by those of the next add_chunks. Records without a row predate
+        # row logging and are numbered in log order.
+        records: dict[int, dict[str, Any]] = {}
+        rows: dict[str, int] = {}
+        deleted: set[int] = set()
+        next_row = 0
+        with open(self._path("chunks.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if "delete" in record:
+                    row = rows.pop(record["delete"], None)
+                    if row is not None:
+                        deleted.add(row)
+                    continue
+
+                row = record.get("row", next_row)
+                next_row = row + 1
+                if row >= self._size:
+                    continue
+                if row in records and rows.get(records[row]["id"]) == row:
+                    del rows[records[row]["id"]]
+                records[row] = record
+                rows[record["id"]] = row
+                deleted.discard(row)
+        return records, deleted
+
+
+def _top(scores: np.ndarray, top_k: int) -> np.ndarray:
+    top_k = min(top_k, len(scores))
+    if top_k == 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top[np.argsort(-scores[top])]
+
+
+def _matches(metadata: dict[str, Any], where: dict[str, Any]) -> bool:
+    for field, condition in where.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
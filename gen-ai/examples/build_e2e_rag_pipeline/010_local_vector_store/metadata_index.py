@@ -0,0 +1,82 @@
+"""Secondary indexes on chunk metadata fields for filtered vector queries.
+
+Each indexed `(field, value)` pair maps to a posting list of the rows holding that value. Rows are only ever appended
+to a collection, so the posting lists are sorted by construction and turn into NumPy arrays with a single memory copy.
+Resolving a filter costs time proportional to the size of its posting lists, not to the size of the collection.
+Rows of deleted chunks stay in the posting lists and are masked out by the caller.
+"""
+
+from array import array
+from typing import Any
+
+import numpy as np
+
+
+class MetadataIndex:
+    """Sorted row posting lists of the values of selected metadata fields.
+
+    Attributes:
+        fields (tuple[str, ...]): The indexed metadata fields.
+        postings (dict[str, dict[Any, array]]): The rows holding each value of each indexed field, in ascending order.
+    """
+
+    def __init__(self, fields: tuple[str, ...]):
+        """Initialize an empty index.
+
+        Args:
+            fields (tuple[str, ...]): The metadata fields to index. Only hashable values are indexed.
+        """
+        self.fields = fields
+        self.postings: dict[str, dict[Any, array]] = {field: {} for field in fields}
+
+    def add(self, row: int, metadata: dict[str, Any]) -> None:
+        """Index the metadata of a row. Rows must be added in ascending order.
+
+        Args:
+            row (int): The row.
+            metadata (dict[str, Any]): The metadata of the chunk stored in the row.
+        """
+        for field in self.fields:
+            value = metadata.get(field)
+            if value is not None and _is_hashable(value):
+                self.postings[field].setdefault(value, array("q")).append(row)
+
+    def lookup(self, where: dict[str, Any]) -> tuple[np.ndarray | None, dict[str, Any]]:
+        """Resolve the indexed conditions of a metadata filter.
+
+        Args:
+            where (dict[str, Any]): The metadata filter, mapping each field to a value or to `{"$in": [values]}`.
+
+        Returns:
+            tuple[np.ndarray | None, dict[str, Any]]: The sorted rows matching every indexed condition, or None if no
+                condition is indexed, and the remaining conditions on fields that are not indexed.
+        """
+        rows = None
+        remaining = {}
+        for field, condition in where.items():
+            if field not in self.postings:
+                remaining[field] = condition
+                continue
+
+            values = condition["$in"] if isinstance(condition, dict) and "$in" in condition else [condition]
+            lists = [self._rows(field, value) for value in values]
+            if len(lists) == 1:
+                matches = lists[0]
+            else:
+                matches = np.unique(np.concatenate([np.zeros(0, dtype=np.int64), *lists]))
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        return rows, remaining
+
+    def _rows(self, field: str, value: Any) -> np.ndarray:
+        posting = self.postings[field].get(value) if _is_hashable(value) else None
+        if not posting:
+            return np.zeros(0, dtype=np.int64)
+        return np.frombuffer(posting, dtype=np.int64).copy()
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
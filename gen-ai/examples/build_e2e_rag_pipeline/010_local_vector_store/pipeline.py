@@ -0,0 +1,60 @@
+"""Example script to build and run a RAG pipeline on an in-process local vector store.
+
+References:
+    [1] https://gdplabs.gitbook.io/sdk/how-to-guides/build-end-to-end-rag-pipeline/your-first-rag-pipeline
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from gllm_generation.response_synthesizer import ResponseSynthesizer
+from gllm_inference.em_invoker.openai_em_invoker import OpenAIEMInvoker
+from gllm_pipeline.steps import step
+
+from hybrid_retriever import HybridRetriever
+from local_vector_store import LocalVectorDataStore
+
+load_dotenv()
+
+# Create components
+em_invoker = OpenAIEMInvoker(os.getenv("EMBEDDING_MODEL"))
+data_store = LocalVectorDataStore(
+    collection_name="documents",
+    persist_directory="data",
+    embedding=em_invoker,
+    lexical_index=True,  # 👈 keep a BM25 keyword index next to the vectors
+    metadata_index_fields=("name",),  # 👈 index metadata fields used in filters
+)
+retriever = HybridRetriever(data_store)
+response_synthesizer = ResponseSynthesizer.stuff_preset(os.getenv("LANGUAGE_MODEL"))
+
+# Create the pipeline
+retrieve_step = step(
+    component=retriever,
+    input_map={"query": "user_query", "top_k": "top_k"},
+    output_state="chunks",
+)
+synthesize_step = step(
+    component=response_synthesizer,
+    input_map={"query": "user_query", "chunks": "chunks"},
+    output_state="response",
+)
+e2e_pipeline = retrieve_step | synthesize_step
+
+# Run the pipeline
+
+async def main():
+    state = {"user_query": "Give me nocturnal creatures from the dataset"}  # Replace with your actual query
+    config = {"top_k": 5}
+    result = await e2e_pipeline.invoke(state, config)
+    print(f"Pipeline result: {result['response']}")
+
+    # Search only some creatures: the `name` index finds their rows before any vector is scored
+    name_filter = {"name": {"$in": ["Shadowpede", "Gloombat"]}}
+    chunks = await data_store.query(state["user_query"], top_k=2, retrieval_params={"filter": name_filter})
+    print(f"Filtered retrieval: {[chunk.metadata['name'] for chunk in chunks]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,209 @@
+"""Scalar and product quantization of stored embeddings.
+
+Both quantizers compress L2-normalized float32 vectors into small integer codes and score a query against the codes
+without decompressing them, so a full scan only touches the codes:
+    - `ScalarQuantizer` maps each dimension to an int8 code using a per-dimension range, i.e. 4x smaller.
+    - `ProductQuantizer` splits vectors into sub-vectors and replaces each one with the ID of its nearest centroid
+      in a per-subspace codebook of up to 256 centroids, i.e. `4 * dim / num_subvectors` times smaller.
+
+The approximate scores are only used to shortlist candidates, which are then re-ranked with the float vectors.
+
+References:
+    [1] Jégou, H., Douze, M., & Schmid, C. (2011). Product quantization for nearest neighbor search.
+        https://ieeexplore.ieee.org/document/5432202
+"""
+
+import numpy as np
+
+PQ_CENTROIDS = 256
+PQ_TRAIN_ITERATIONS = 15
+SCAN_BLOCK_SIZE = 65_536
+
+
+class ScalarQuantizer:
+    """An int8 scalar quantizer with a per-dimension range.
+
+    Attributes:
+        low (np.ndarray): The lowest value of each dimension.
+        scale (np.ndarray): The width of one quantization step of each dimension.
+    """
+
+    code_dtype = np.int8
+
+    def __init__(self, low: np.ndarray, scale: np.ndarray):
+        """Initialize the quantizer.
+
+        Args:
+            low (np.ndarray): The lowest value of each dimension.
+            scale (np.ndarray): The width of one quantization step of each dimension.
+        """
+        self.low = low
+        self.scale = scale
+
+    @classmethod
+    def train(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        """Fit the per-dimension range on sample vectors.
+
+        Args:
+            vectors (np.ndarray): The training vectors.
+
+        Returns:
+            ScalarQuantizer: The trained quantizer.
+        """
+        low = vectors.min(axis=0)
+        scale = (vectors.max(axis=0) - low) / 255
+        return cls(low.astype(np.float32), np.where(scale == 0, 1, scale).astype(np.float32))
+
+    @property
+    def code_size(self) -> int:
+        """The number of code bytes per vector."""
+        return len(self.low)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Quantize vectors.
+
+        Args:
+            vectors (np.ndarray): The vectors to quantize.
+
+        Returns:
+            np.ndarray: The int8 codes, one row per vector.
+        """
+        codes = np.clip(np.rint((vectors - self.low) / self.scale), 0, 255) - 128
+        return codes.astype(np.int8)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate the inner products between a query and quantized vectors.
+
+        The scores are shifted by a constant that only depends on the query, which does not change their order.
+
+        Args:
+            query (np.ndarray): The query vector.
+            codes (np.ndarray): The codes of the vectors.
+
+        Returns:
+            np.ndarray: The approximate scores.
+        """
+        weights = query * self.scale
+        return np.concatenate(
+            [
+                codes[start : start + SCAN_BLOCK_SIZE].astype(np.float32) @ weights
+                for start in range(0, len(codes), SCAN_BLOCK_SIZE)
+            ]
+        )
+
+    def state(self) -> dict[str, np.ndarray]:
+        """The arrays needed to rebuild the quantizer."""
+        return {"low": self.low, "scale": self.scale}
+
+
+class ProductQuantizer:
+    """A product quantizer with one codebook of up to 256 centroids per subspace.
+
+    Attributes:
+        codebooks (np.ndarray): The centroids, of shape (num_subvectors, num_centroids, subvector_dim).
+    """
+
+    code_dtype = np.uint8
+
+    def __init__(self, codebooks: np.ndarray):
+        """Initialize the quantizer.
+
+        Args:
+            codebooks (np.ndarray): The centroids, of shape (num_subvectors, num_centroids, subvector_dim).
+        """
+        self.codebooks = codebooks
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, num_subvectors: int, seed: int = 0) -> "ProductQuantizer":
+        """Fit one k-means codebook per subspace on sample vectors.
+
+        Args:
+            vectors (np.ndarray): The training vectors. Their dimension must be divisible by `num_subvectors`.
+            num_subvectors (int): The number of subspaces, i.e. the number of code bytes per vector.
+            seed (int, optional): The random seed of the centroid initialization. Defaults to 0.
+
+        Returns:
+            ProductQuantizer: The trained quantizer.
+
+        Raises:
+            ValueError: If the vector dimension is not divisible by `num_subvectors`.
+        """
+        if vectors.shape[1] % num_subvectors:
+            raise ValueError(f"Dimension {vectors.shape[1]} is not divisible by {num_subvectors} subvectors.")
+
+        rng = np.random.default_rng(seed)
+        num_centroids = min(PQ_CENTROIDS, len(vectors))
+        subvectors = vectors.reshape(len(vectors), num_subvectors, -1).transpose(1, 0, 2)
+        codebooks = []
+        for points in subvectors:
+            centroids = points[rng.choice(len(points), num_centroids, replace=False)].copy()
+            for _ in range(PQ_TRAIN_ITERATIONS):
+                assignments = _nearest(points, centroids)
+                counts = np.bincount(assignments, minlength=num_centroids)
+                sums = np.stack(
+                    [np.bincount(assignments, weights=column, minlength=num_centroids) for column in points.T], axis=1
+                )
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+            codebooks.append(centroids)
+        return cls(np.stack(codebooks).astype(np.float32))
+
+    @property
+    def code_size(self) -> int:
+        """The number of code bytes per vector."""
+        return len(self.codebooks)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Quantize vectors.
+
+        Args:
+            vectors (np.ndarray): The vectors to quantize.
+
+        Returns:
+            np.ndarray: The uint8 centroid IDs, one row per vector and one column per subspace.
+        """
+        subvectors = vectors.reshape(len(vectors), self.code_size, -1)
+        codes = [_nearest(subvectors[:, index], codebook) for index, codebook in enumerate(self.codebooks)]
+        return np.stack(codes, axis=1).astype(np.uint8)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate the inner products between a query and quantized vectors with a lookup table.
+
+        Args:
+            query (np.ndarray): The query vector.
+            codes (np.ndarray): The codes of the vectors.
+
+        Returns:
+            np.ndarray: The approximate scores.
+        """
+        lookup = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.code_size, -1)).ravel()
+        offsets = np.arange(self.code_size, dtype=np.intp) * self.codebooks.shape[1]
+        return np.concatenate(
+            [
+                lookup[codes[start : start + SCAN_BLOCK_SIZE] + offsets].sum(axis=1)
+                for start in range(0, len(codes), SCAN_BLOCK_SIZE)
+            ]
+        )
+
+    def state(self) -> dict[str, np.ndarray]:
+        """The arrays needed to rebuild the quantizer."""
+        return {"codebooks": self.codebooks}
+
+
+def load_quantizer(state: dict[str, np.ndarray]) -> ScalarQuantizer | ProductQuantizer:
+    """Rebuild a quantizer from the arrays returned by its `state` method.
+
+    Args:
+        state (dict[str, np.ndarray]): The quantizer arrays.
+
+    Returns:
+        ScalarQuantizer | ProductQuantizer: The quantizer.
+    """
+    if "codebooks" in state:
+        return ProductQuantizer(state["codebooks"])
+    return ScalarQuantizer(state["low"], state["scale"])
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids**2).sum(axis=1) - 2 * points @ centroids.T
+    return distances.argmin(axis=1)
@@ -0,0 +1,89 @@
+"""Tests of the local vector store persistence.
+
+Run them with:
+    uv run python -m unittest test_local_vector_store
+"""
+
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from gllm_core.schema import Chunk
+
+from local_vector_store import LocalVectorDataStore
+
+DIM = 8
+
+
+class HashEMInvoker:
+    """An EM invoker stand-in that derives a fixed random vector from each text."""
+
+    async def invoke(self, content: str | list[str]) -> list[float] | list[list[float]]:
+        """Return the vector of each text."""
+        texts = [content] if isinstance(content, str) else content
+        vectors = [self.vector(text).tolist() for text in texts]
+        return vectors[0] if isinstance(content, str) else vectors
+
+    @staticmethod
+    def vector(text: str) -> np.ndarray:
+        """Return the vector of a text."""
+        seed = int.from_bytes(text.encode("utf-8")[:8].ljust(8, b"\0"), "little")
+        return np.random.default_rng(seed).normal(size=DIM)
+
+
+class CrashRecoveryTest(unittest.TestCase):
+    """Reloading a collection after `add_chunks` was interrupted before committing."""
+
+    def setUp(self):
+        """Create a fresh persist directory."""
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self):
+        """Remove the persist directory."""
+        self._directory.cleanup()
+
+    def open_store(self) -> LocalVectorDataStore:
+        """Open the collection."""
+        return LocalVectorDataStore("documents", self.directory, HashEMInvoker())
+
+    def add_then_crash(self, store: LocalVectorDataStore, chunks: list[Chunk]) -> None:
+        """Add chunks, crashing after the chunk log is written but before the size is committed."""
+        with mock.patch.object(store, "_save_meta", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(store.add_chunks(chunks))
+
+    def assert_consistent(self, store: LocalVectorDataStore, contents: list[str]) -> None:
+        """Check that the store holds exactly the given contents, each on its own vector."""
+        self.assertEqual(len(store), len(contents))
+        for content in contents:
+            top = store.query_by_vector(HashEMInvoker.vector(content), top_k=1)
+            self.assertEqual([chunk.content for chunk in top], [content])
+
+    def test_crash_after_commit(self):
+        """Records of an interrupted add are replaced by those of the next add."""
+        store = self.open_store()
+        asyncio.run(store.add_chunks([Chunk(content="alpha"), Chunk(content="beta")]))
+        self.add_then_crash(store, [Chunk(content="stale one"), Chunk(content="stale two")])
+
+        store = self.open_store()
+        self.assert_consistent(store, ["alpha", "beta"])
+        asyncio.run(store.add_chunks([Chunk(content="gamma")]))
+
+        self.assert_consistent(self.open_store(), ["alpha", "beta", "gamma"])
+
+    def test_crash_on_fresh_store(self):
+        """Records of an interrupted first add, without any committed size, are ignored."""
+        self.add_then_crash(self.open_store(), [Chunk(content="stale one"), Chunk(content="stale two")])
+
+        store = self.open_store()
+        self.assertEqual(len(store), 0)
+        asyncio.run(store.add_chunks([Chunk(content="alpha")]))
+
+        self.assert_consistent(self.open_store(), ["alpha"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 """Router Pattern (Hierarchical Routing)
 
 This example demonstrates a router that classifies queries and routes to specialized
-agents using gllm_pipeline switch step.
+agents using gllm_pipeline switch step. The router agent is only called when the
+decision cache and the keyword classifier of TieredRouter cannot decide.
 
 Usage (from repo root):
     uv run router/main.py
@@ -15,6 +16,7 @@ from dotenv import load_dotenv
 from glaip_sdk import Agent
 from gllm_pipeline.steps import step, switch
 from pydantic import BaseModel
+from tiered_router import KeywordClassifier, TieredRouter
 
 load_dotenv(override=True)
 
@@ -72,9 +74,25 @@ general = Agent(
     model="openai/gpt-5-mini",
 )
 
+# Answer obvious and repeated queries without calling the router agent
+classifier = KeywordClassifier(
+    {
+        "spanish": {"spanish": 0.9, "español": 0.9, "spain": 0.8, "hola": 0.6, "gracias": 0.6, "amor": 0.5},
+        "japanese": {"japanese": 0.9, "japan": 0.8, "日本語": 0.9, "arigatou": 0.6, "konnichiwa": 0.6, "sushi": 0.4},
+        "other": {"german": 0.9, "french": 0.9, "italian": 0.9, "korean": 0.9, "chinese": 0.9, "portuguese": 0.9},
+    }
+)
+tiered_router = TieredRouter(
+    agent=router.to_component(),
+    classifier=classifier,
+    labels=["spanish", "japanese", "other"],
+    default_label="other",
+    confidence_threshold=0.75,
+)
+
 # Create pipeline steps
 route_step = step(
-    component=router.to_component(),
+    component=tiered_router,
     input_state_map={"query": "user_query"},
     output_state="route_label",
 )
@@ -128,6 +146,7 @@ async def main() -> None:
         "How do you say 'love' in Spanish?",
         "What is the meaning of 'arigatou' in English?",
         "How do you say 'hello' in German?",
+        "what is the meaning of 'arigatou' in english",  # a repeated query, served by the decision cache
     ]
 
     # Process each query
@@ -137,6 +156,7 @@ async def main() -> None:
         result = await pipeline.invoke(state)
         print(f"Answer: {result['final_answer']}")
 
+    print(f"\nRouting: {tiered_router.stats}")
     print("\nDemo completed")
 
 
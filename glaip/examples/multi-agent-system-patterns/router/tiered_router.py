@@ -0,0 +1,188 @@
+"""Tiered routing component that only calls the router agent when cheaper tiers are unsure.
+
+Routing every query through an LLM agent costs a full model call just to pick a label. `TieredRouter` tries three
+tiers in order and stops at the first one that decides:
+    1. Decision cache: an LRU cache of previous decisions, keyed by the normalized query.
+    2. Keyword classifier: weighted keywords per label, combined into a confidence score. It decides when the
+       confidence reaches the threshold.
+    3. Router agent: the fallback for everything else. Its decisions are cached too.
+
+The number of decisions made by each tier is counted in `TieredRouter.stats`.
+"""
+
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from gllm_core.schema import Component
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.75
+DEFAULT_CACHE_SIZE = 1024
+TIERS = ("cache", "classifier", "agent")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so that trivially different queries share a cache entry.
+
+    Args:
+        query: The query to normalize.
+
+    Returns:
+        The NFKC-normalized, lowercased query with collapsed whitespace and without trailing punctuation.
+    """
+    query = unicodedata.normalize("NFKC", query).lower()
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!.。？！ ")
+
+
+@dataclass
+class TierStats:
+    """Number of routing decisions made by each tier.
+
+    Attributes:
+        decisions: The number of decisions per tier.
+    """
+
+    decisions: dict[str, int] = field(default_factory=lambda: dict.fromkeys(TIERS, 0))
+
+    @property
+    def total(self) -> int:
+        """The total number of decisions."""
+        return sum(self.decisions.values())
+
+    @property
+    def hit_rates(self) -> dict[str, float]:
+        """The fraction of decisions made by each tier."""
+        return {tier: count / self.total if self.total else 0.0 for tier, count in self.decisions.items()}
+
+    def __str__(self) -> str:
+        """Summarize the statistics."""
+        rates = ", ".join(f"{tier} {rate:.0%}" for tier, rate in self.hit_rates.items())
+        return f"{self.total} decision(s): {rates}"
+
+
+class KeywordClassifier:
+    """Classifies queries by weighted keywords.
+
+    The confidence of a label combines the weights of its matched keywords as independent pieces of evidence,
+    1 - (1 - w1) * (1 - w2) * ..., and the confidence of the prediction is the margin over the runner-up label.
+
+    Attributes:
+        keywords: The keywords of each label, mapped to their weight between 0 and 1. A keyword matches a whole word
+            of the normalized query, or any substring if it contains no ASCII letter, e.g. Japanese script.
+    """
+
+    def __init__(self, keywords: dict[str, dict[str, float]]):
+        """Initialize the classifier.
+
+        Args:
+            keywords: The keywords of each label, mapped to their weight between 0 and 1.
+        """
+        self.keywords = keywords
+        self._patterns = {
+            label: [(self._pattern(keyword), weight) for keyword, weight in label_keywords.items()]
+            for label, label_keywords in keywords.items()
+        }
+
+    def classify(self, query: str) -> tuple[str | None, float]:
+        """Classify a query.
+
+        Args:
+            query: The normalized query.
+
+        Returns:
+            The most likely label, or None if no keyword matched, and the confidence of the prediction.
+        """
+        scores = {}
+        for label, patterns in self._patterns.items():
+            miss = 1.0
+            for pattern, weight in patterns:
+                if pattern.search(query):
+                    miss *= 1.0 - weight
+            scores[label] = 1.0 - miss
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] == 0.0:
+            return None, 0.0
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], ranked[0][1] - runner_up
+
+    @staticmethod
+    def _pattern(keyword: str) -> re.Pattern:
+        keyword = normalize_query(keyword)
+        if re.search(r"[a-z]", keyword):
+            return re.compile(rf"\b{re.escape(keyword)}\b")
+        return re.compile(re.escape(keyword))
+
+
+class TieredRouter(Component):
+    """A router component answering from a decision cache, then a keyword classifier, then a router agent.
+
+    Attributes:
+        agent: The router agent component, called with `query` when the cheaper tiers are unsure.
+        classifier: The keyword classifier.
+        labels: The valid labels.
+        default_label: The label used when the agent answers with an invalid label.
+        confidence_threshold: The minimum classifier confidence to skip the agent.
+        cache_size: The maximum number of cached decisions.
+        stats: The number of decisions made by each tier.
+    """
+
+    def __init__(
+        self,
+        agent: Component,
+        classifier: KeywordClassifier,
+        labels: list[str],
+        default_label: str,
+        confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        """Initialize the router.
+
+        Args:
+            agent: The router agent component, e.g. `router.to_component()`.
+            classifier: The keyword classifier.
+            labels: The valid labels.
+            default_label: The label used when the agent answers with an invalid label.
+            confidence_threshold: The minimum classifier confidence to skip the agent. Defaults to 0.75.
+            cache_size: The maximum number of cached decisions. Defaults to 1024.
+        """
+        super().__init__()
+        self.agent = agent
+        self.classifier = classifier
+        self.labels = labels
+        self.default_label = default_label
+        self.confidence_threshold = confidence_threshold
+        self.cache_size = cache_size
+        self.stats = TierStats()
+        self._cache: OrderedDict[str, str] = OrderedDict()
+
+    async def _run(self, query: str, **kwargs: Any) -> str:
+        """Route a query.
+
+        Args:
+            query: The user query.
+            **kwargs: Passed to the router agent.
+
+        Returns:
+            The route label.
+        """
+        key = normalize_query(query)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats.decisions["cache"] += 1
+            return self._cache[key]
+
+        label, confidence = self.classifier.classify(key)
+        if label is not None and confidence >= self.confidence_threshold:
+            self.stats.decisions["classifier"] += 1
+        else:
+            answer = str(await self.agent.run(query=query, **kwargs)).strip().lower()
+            label = answer if answer in self.labels else self.default_label
+            self.stats.decisions["agent"] += 1
+
+        self._cache[key] = label
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return label